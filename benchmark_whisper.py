@@ -0,0 +1,126 @@
+"""
+Whisper設定のベンチマーク（モデルサイズ・compute_type・cpu_threads・バッチサイズの組み合わせを計測）
+
+実時間比（RTF）・最大メモリ・参照テキストに対するWERを表示し、
+このハードウェアで最適な設定を data/whisper_tuning.json に保存する。
+保存した設定は文字おこし時の既定値（compute_type・スレッド数・バッチサイズ、WER計測時はモデルサイズも）になる。
+"""
+import argparse
+import os
+import sys
+import tempfile
+from lib.utils import setup_logging
+from lib.whisper_tuner import (
+    hardware_profile, candidate_grid, run_benchmark, choose_best, save_tuning, write_synthetic_audio
+)
+from config.settings import WHISPER_BENCHMARK_SECONDS
+
+MODEL_SIZES = ["tiny", "base", "small", "medium", "large", "large-v2", "large-v3"]
+
+
+def default_threads():
+    """コア数までの2のべき乗（例: 8コアなら 2 4 8）"""
+    cpu_count = os.cpu_count() or 1
+    threads = []
+    count = 2
+    while count < cpu_count:
+        threads.append(count)
+        count *= 2
+    return threads + [cpu_count]
+
+
+def format_result(result):
+    if result.error:
+        return (f"{result.model_size:<9} {result.compute_type:<13} {result.cpu_threads:>7} {result.batch_size:>5}  "
+                f"失敗: {result.error[:60]}")
+    wer = f"{result.wer:.3f}" if result.wer is not None else "-"
+    rss = f"{result.peak_rss_mb:.0f}" if result.peak_rss_mb is not None else "-"
+    return (f"{result.model_size:<9} {result.compute_type:<13} {result.cpu_threads:>7} {result.batch_size:>5} "
+            f"{result.rtf:>7.3f} {rss:>8} {wer:>6} {result.load_seconds:>7.1f}")
+
+
+def create_argument_parser():
+    parser = argparse.ArgumentParser(
+        description="Whisper設定のベンチマークと自動調整",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用例:
+  # 生成した音声で速度・メモリを計測（WERなし）
+  python benchmark_whisper.py --models tiny base small
+
+  # 手持ちの音声と書き起こしでWERも計測
+  python benchmark_whisper.py --audio sample.wav --reference sample.txt --models base small medium
+        """
+    )
+    parser.add_argument("--audio", help="計測に使う音声・動画ファイル（未指定時は音声を生成）")
+    parser.add_argument("--reference", help="音声の正解テキストファイル（指定時はWERを計算）")
+    parser.add_argument("--language", default="ja", help="音声の言語 (デフォルト: ja)")
+    parser.add_argument("--seconds", type=int, default=WHISPER_BENCHMARK_SECONDS,
+                        help=f"生成する音声の長さ（秒） (デフォルト: {WHISPER_BENCHMARK_SECONDS})")
+    parser.add_argument("--models", nargs="+", choices=MODEL_SIZES, default=["tiny", "base", "small"],
+                        help="計測するモデルサイズ (デフォルト: tiny base small)")
+    parser.add_argument("--compute-types", nargs="+",
+                        help="計測するcompute_type (デフォルト: CPUは int8 float32、GPUは float16 int8_float16)")
+    parser.add_argument("--threads", nargs="+", type=int,
+                        help="計測するcpu_threads (デフォルト: コア数までの2のべき乗)")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 4, 8],
+                        help="計測するバッチサイズ、1は逐次処理 (デフォルト: 1 4 8)")
+    parser.add_argument("--no-save", action="store_true", help="計測結果を既定値として保存しない")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        default="WARNING", help="ログレベル (デフォルト: WARNING)")
+    return parser
+
+
+def main():
+    args = create_argument_parser().parse_args()
+    setup_logging(args.log_level)
+
+    profile = hardware_profile()
+    device = profile['device']
+    compute_types = args.compute_types or (["float16", "int8_float16"] if device == "cuda" else ["int8", "float32"])
+    # GPUではcpu_threadsは推論速度にほぼ影響しないため1通りのみ
+    threads = args.threads or ([profile['cpu_count']] if device == "cuda" else default_threads())
+
+    reference = None
+    if args.reference:
+        with open(args.reference, 'r', encoding='utf-8') as f:
+            reference = f.read()
+
+    candidates = candidate_grid(args.models, compute_types, threads, sorted(set(args.batch_sizes)))
+    print(f"ハードウェア: {profile['key']}")
+    print(f"組み合わせ: {len(candidates)}通り")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        audio_path = args.audio
+        if not audio_path:
+            audio_path = write_synthetic_audio(os.path.join(tmp_dir, "benchmark.wav"), args.seconds)
+            print(f"計測用音声を生成: {args.seconds}秒（WERは --audio と --reference 指定時のみ）")
+        elif not os.path.exists(audio_path):
+            print(f"❌ 音声ファイルが見つかりません: {audio_path}")
+            return 1
+
+        print()
+        print(f"{'model':<9} {'compute':<13} {'threads':>7} {'batch':>5} {'RTF':>7} {'RSS(MB)':>8} {'WER':>6} {'load(s)':>7}")
+        print("-" * 70)
+        results = run_benchmark(audio_path, candidates, reference, args.language, device,
+                                progress_callback=lambda result: print(format_result(result), flush=True))
+
+    best = choose_best(results)
+    if not best:
+        print("\n❌ 全ての組み合わせで計測に失敗しました")
+        return 1
+
+    print("\n🏆 最適な設定:")
+    print(format_result(best))
+    if args.no_save:
+        return 0
+
+    tuning = save_tuning(results)
+    print("✅ 既定値として保存しました（文字おこし時に自動で使用されます）")
+    if not tuning['best']:
+        print("   WER未計測のため既定のモデルサイズは変更しません（compute_type・スレッド数・バッチサイズのみ）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""
+メディア保存領域の整理（削除された実行フォルダからの参照を外し、どこからも参照されない動画を削除）
+
+実行フォルダ（output/query/...）を削除した後に実行すると、その分のディスク容量が解放される。
+"""
+import argparse
+import sys
+from lib.utils import setup_logging
+from lib.artifact_store import ArtifactStore
+
+
+def format_usage(store):
+    count, total, refs = store.usage()
+    return f"{count}件 {total / 1024 / 1024:.1f}MB（参照 {refs}件）"
+
+
+def create_argument_parser():
+    parser = argparse.ArgumentParser(
+        description="メディア保存領域の整理",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用例:
+  # 削除される件数と容量を確認
+  python clean_artifacts.py --dry-run
+
+  # 参照のない動画を削除
+  python clean_artifacts.py
+        """
+    )
+    parser.add_argument("--dry-run", action="store_true", help="削除せずに件数と容量のみ表示")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        default="WARNING", help="ログレベル (デフォルト: WARNING)")
+    return parser
+
+
+def main():
+    args = create_argument_parser().parse_args()
+    setup_logging(args.log_level)
+
+    store = ArtifactStore()
+    print(f"保存中: {format_usage(store)}")
+    removed, freed = store.collect_garbage(dry_run=args.dry_run)
+    if args.dry_run:
+        print(f"削除対象: {removed}件 {freed / 1024 / 1024:.1f}MB")
+        return 0
+    print(f"✅ 削除: {removed}件 {freed / 1024 / 1024:.1f}MB")
+    print(f"保存中: {format_usage(store)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,8 @@
-"""Claude用CSSセレクタ（2025年最新UI対応）"""
+"""Claude用CSSセレクタ（2025年最新UI対応）
+
+各リストは優先順。実際に一致したセレクタは lib.selector_resolver が記憶する。
+*_FALLBACK_SELECTORS は別の要素にも一致しうる広いセレクタで、記憶せず毎回最後に試す。
+"""
 
 # テキスト入力エリア
 TEXT_INPUT_SELECTORS = [
@@ -8,6 +12,9 @@ TEXT_INPUT_SELECTORS = [
     'div[role="textbox"]',
     'div[aria-label*="メッセージ"]'
 ]
+TEXT_INPUT_FALLBACK_SELECTORS = [
+    'input[type="text"]'
+]
 
 # 送信ボタン
 SEND_BUTTON_SELECTORS = [
@@ -15,7 +22,9 @@ SEND_BUTTON_SELECTORS = [
     'button[aria-label*="送信"]',
     'button[aria-label*="Send"]',
     'button[data-testid="send-button"]',
-    'svg[data-icon="send"]',
+    'svg[data-icon="send"]'
+]
+SEND_BUTTON_FALLBACK_SELECTORS = [
     'button:has(svg)',
     'button[disabled="false"]:last-of-type'
 ]
@@ -26,8 +35,20 @@ FILE_INPUT = 'input[type="file"]'
 
 # レスポンス
 RESPONSE_CONTAINER_SELECTORS = [
+    'div[data-message-author="assistant"]',
+    'div[data-is-streaming="false"]',
+    'div[data-testid="conversation-turn"]'
+]
+RESPONSE_FALLBACK_SELECTORS = [
+    'div[role="article"]'
+]
+
+# レスポンス待機（従来版）で走査するセレクタ（最後は最終手段）
+RESPONSE_WAIT_SELECTORS = [
     'div[data-is-streaming="false"]',
     'div[data-message-author="assistant"]',
     'div[role="article"]',
-    'div[data-testid="conversation-turn"]'
-]
\ No newline at end of file
+    'div[data-testid="conversation-turn"]',
+    'div:contains("Claude")',
+    'p, div'
+]
@@ -39,3 +39,123 @@ LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
 # データベース設定
 USE_DATABASE = True
 DATABASE_PATH = "data/scraper.db"
+
+# コメント分析設定（プロンプト予算・サンプリング）
+COMMENT_PROMPT_MAX_CHARS = 30000  # コメント部分の最大文字数
+COMMENT_TOP_LIKED = 30  # 必ず含める高評価コメント数
+COMMENT_RESERVOIR_PER_BUCKET = 60  # 投稿時期バケットごとのサンプル保持数
+COMMENT_MAX_TEXT_LENGTH = 300  # 1コメントあたりの最大文字数
+COMMENT_DEDUP_KEYS = 50000  # ほぼ同一コメント判定で記憶する正規化キー数（古いものから忘れる）
+
+# 定期ジョブの差分分析設定
+SCHEDULER_STATE_PATH = "data/scheduler_state.json"  # ジョブごとのチャットURL・要約・既読ツイート
+INCREMENTAL_SUMMARY_MAX_CHARS = 2000  # 保存する前回要約の最大文字数
+INCREMENTAL_MAX_SEEN = 5000  # ジョブごとに記憶する既読ツイート数
+INCREMENTAL_MAX_TWEETS = 100  # 差分プロンプトに含める新規ツイート数
+
+# ローカル集計設定（LLM前処理）
+LOCAL_ANALYSIS_TOP_N = 15  # 頻出語・ハッシュタグ等の表示件数
+LOCAL_ANALYSIS_NGRAM_SIZES = (2, 3, 4)  # 文字n-gramの長さ
+
+# 代表ツイート選定設定（TF-IDFクラスタリング）
+ANALYSIS_PROMPT_MAX_CHARS = 20000  # ツイート本文部分の最大文字数
+SELECTOR_MAX_CLUSTERS = 40  # 最大クラスタ数
+SELECTOR_HASH_DIM = 2 ** 16  # 文字n-gramのハッシュ次元数
+SELECTOR_NGRAM_SIZES = (2, 3)  # 文字n-gramの長さ
+SELECTOR_TEXT_LENGTH = 280  # 1ツイートあたりの最大文字数
+
+# セレクタ解決キャッシュ（サイト・UI要素ごとに前回成功したセレクタを保存）
+SELECTOR_CACHE_PATH = "data/selector_cache.json"
+
+# 音声取得設定（Whisper入力用）
+AUDIO_SAMPLE_RATE = 16000  # Whisperの入力サンプルレート
+AUDIO_FORMAT = "flac"  # 変換後の音声形式（可逆圧縮）
+
+# Whisperモデルキャッシュ設定
+WHISPER_CACHE_MEMORY_MB = 4000  # 読み込み済みモデルの合計メモリ上限（推定値）
+WHISPER_STATE_PATH = "data/whisper_state.json"  # 最後に使用したモデル設定
+
+# 文字おこし方式設定
+TRANSCRIPTION_MODE = "sequential"  # sequential: 単一モデル / parallel: 無音区間で分割して複数プロセス / batched: バッチ推論 / streaming: ダウンロードと同時に処理
+PARALLEL_CHUNK_SECONDS = 300  # 分割チャンクの目安長（秒）
+PARALLEL_CPU_THREADS = 4  # ワーカー1プロセスあたりのCPUスレッド数
+PARALLEL_MAX_WORKERS = None  # ワーカー数（None: CPUコア数 / スレッド数）
+TRANSCRIPTION_BATCH_SIZE = None  # batched方式のバッチサイズ（None: 空きメモリから自動決定）
+TRANSCRIPTION_MAX_BATCH_SIZE = 16  # 自動決定時の上限
+
+# 文字おこしキャッシュ設定
+TRANSCRIPTION_CACHE_ENABLED = True
+TRANSCRIPTION_CACHE_PATH = "data/transcription_cache.db"  # メディアID・音声ハッシュ別の文字おこし結果
+
+# ストリーミング文字おこし設定（ダウンロード中に文字おこしを開始）
+STREAM_WINDOW_SECONDS = 60  # 1回に文字おこしする音声窓の長さ（秒）
+STREAM_SPLIT_SEARCH_SECONDS = 10  # 窓の末尾で区切り（最も静かな位置）を探す範囲（秒）
+STREAM_BUFFER_SECONDS = 600  # 文字おこし待ちで保持する音声の上限（秒、16kHzで10分≈38MB）。超えるとffmpeg・yt-dlpの読み込みを待たせる
+
+# 翻訳設定
+TRANSLATION_BACKEND = "google"  # google / echo（翻訳せずそのまま返す。動作確認用）
+TRANSLATION_BATCH_CHARS = 4500  # 1リクエストあたりの最大文字数（Google翻訳の上限5000未満）
+TRANSLATION_MAX_WORKERS = 4  # 同時リクエスト数
+TRANSLATION_RATE_PER_SECOND = 2.0  # 1秒あたりの最大リクエスト数
+TRANSLATION_CACHE_PATH = "data/translation_cache.db"  # (原文, 翻訳先言語) ごとの翻訳結果
+
+# メディアダウンロード設定
+DOWNLOAD_MAX_WORKERS = 4  # 同時ダウンロード数（全体）
+DOWNLOAD_PER_HOST_LIMIT = 2  # 同一サイトへの同時ダウンロード数
+DOWNLOAD_CONCURRENT_FRAGMENTS = 4  # HLS/DASHの断片を並列取得する数
+DOWNLOAD_SOCKET_TIMEOUT = 30  # 通信が止まってから失敗とみなす秒数（ダウンロード全体の時間制限はなし）
+DOWNLOAD_RETRIES = 10  # 通信エラー時の再試行回数（途中までのファイルから再開）
+DOWNLOAD_PARTIAL_DIR = "data/downloads"  # 途中のダウンロードの置き場所（URL・種類・画質・区間ごとに固定し、実行フォルダが変わっても再開。完了後に実行フォルダへ移動）
+YTDLP_INFO_TTL = 300  # 取得したメディア情報を再利用する秒数（フォーマットURLの署名期限 expire が先ならそこまで）
+YTDLP_INFO_CACHE_SIZE = 32  # 保持するメディア情報の件数（超えたら最も古く使われたものから破棄）
+
+# 一括メディア処理設定（ダウンロード → 文字おこし → 翻訳・保存を段階ごとに並行処理）
+BATCH_DOWNLOAD_WORKERS = 4  # 同時に取得する件数（サイト別の上限はダウンロード設定に従う）
+BATCH_TRANSCRIBE_WORKERS = 1  # 同時に文字おこしする件数（Whisperモデルは共有）
+BATCH_TRANSLATE_WORKERS = 2  # 同時に翻訳・保存する件数
+BATCH_QUEUE_SIZE = 4  # 段階間で待機できる件数（文字おこしより先にダウンロードしすぎない）
+BATCH_MAX_ITEMS = 200  # プレイリスト・チャンネルから展開する最大件数
+
+# 字幕トラック設定（投稿者の字幕・自動生成字幕があれば音声を取得せずに使用）
+CAPTION_TRACKS_ENABLED = True
+CAPTION_ALLOW_AUTOMATIC = True  # 自動生成字幕も使う（別言語から自動翻訳された字幕は使わない）
+CAPTION_MIN_CHARS = 50  # これより短い字幕トラックは使わない
+CAPTION_FETCH_TIMEOUT = 15  # 字幕ファイル取得のタイムアウト（秒）
+
+# 範囲指定・スキム（抜粋）文字おこし設定
+SKIM_WINDOW_COUNT = 12  # スキム時に文字おこしする区間数（全体に等間隔で配置）
+SKIM_WINDOW_SECONDS = 30  # スキム時の1区間の長さ（秒）
+
+# Whisper自動調整設定（benchmark_whisper.py の計測結果をハードウェアごとに保存し既定値に使用）
+WHISPER_TUNING_PATH = "data/whisper_tuning.json"
+WHISPER_BENCHMARK_SECONDS = 60  # 音声ファイル未指定時に生成する計測用音声の長さ（秒）
+WHISPER_TUNING_WER_TOLERANCE = 0.02  # 最良のWERからこの幅以内で最も速い設定を選ぶ
+
+# 言語判定設定（全体を自動判定せず、数か所の短い区間だけで判定してから文字おこし）
+TRANSCRIPTION_LANGUAGE = "auto"  # auto: 区間判定 / "ja", "en" 等: 固定
+LANGUAGE_PROBE_WINDOWS = 3  # 判定に使う区間数（全体に等間隔で配置）
+LANGUAGE_PROBE_SECONDS = 30  # 1区間の長さ（秒、Whisperの判定単位）
+LANGUAGE_PROBE_MIN_PROBABILITY = 0.5  # 平均確率がこれ未満なら既定の言語で処理
+LANGUAGE_PROBE_FALLBACK = "ja"  # 判定できない場合の言語
+
+# YouTube処理の段階別時間制限（秒）。各段階は依存先がそろい次第並行して実行
+# ダウンロード・文字おこしは通信停止の検出（DOWNLOAD_SOCKET_TIMEOUT）に任せて制限しない
+STAGE_METADATA_TIMEOUT = 30  # 動画情報の取得
+STAGE_CAPTIONS_TIMEOUT = 60  # 字幕トラックの取得
+STAGE_PAGE_TIMEOUT = 90  # ページ表示とDOM字幕の取得
+STAGE_COMMENTS_TIMEOUT = 300  # コメント取得（文字おこし・保存は待たずに進む）
+
+# YouTubeコメント取得設定（スクロールせず continuation をページ内で直接取得）
+YOUTUBE_COMMENT_BATCH = 8  # 1回に並行取得する continuation 数
+YOUTUBE_COMMENT_MAX_REPLIES = 100  # 1スレッドあたりの返信の最大取得数（0: 返信を取得しない）
+YOUTUBE_COMMENT_MAX_REQUESTS = 2000  # 1動画あたりの取得リクエスト上限
+
+# ツイート動画の直接取得（ブラウザの通信から m3u8/mp4 のURLを取得、失敗時はyt-dlp）
+TWEET_CAPTURE_ENABLED = True
+TWEET_CAPTURE_WAIT = 8  # 動画の通信が現れるまで待つ最大秒数
+HLS_SEGMENT_WORKERS = 8  # HLSセグメントの並列ダウンロード数
+
+# メディア保存領域（同じ内容の動画は1つだけ保存し、実行ごとのフォルダからはハードリンク/参照記録で参照）
+ARTIFACT_STORE_ENABLED = True
+ARTIFACT_STORE_DIR = "data/artifacts"
+ARTIFACT_STORE_DB_PATH = "data/artifacts.db"  # 内容ハッシュ・参照・取得元の索引
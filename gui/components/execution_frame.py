@@ -93,7 +93,10 @@ class ExecutionFrame:
             return
         
         try:
-            if URLValidator.is_youtube_url(url_text):
+            if URLValidator.is_media_batch(url_text):
+                self.main_app.log_message("📚 一括メディア処理として処理します")
+                self.main_app.media_handler.process_media()
+            elif URLValidator.is_youtube_url(url_text):
                 self.main_app.log_message("🎥 YouTube動画として処理します")
                 self.main_app.media_handler.process_media()
             elif URLValidator.is_tweet_url(url_text):
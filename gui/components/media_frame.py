@@ -4,6 +4,8 @@
 import tkinter as tk
 from tkinter import ttk
 from ..utils.ui_helpers import UIHelpers
+from lib.whisper_tuner import default_model_size
+from config.settings import TRANSCRIPTION_MODE
 
 class MediaFrame:
     def __init__(self, parent, main_app):
@@ -24,11 +26,17 @@ class MediaFrame:
         # Whisperモデル選択（第2行）
         self.create_whisper_model_selection()
         
+        # 文字おこし範囲（第3行）
+        self.create_time_range_options()
+        
         # Claudeチャット URL
         self.create_claude_url_input()
         
         # グリッド設定
         self.frame.columnconfigure(1, weight=1)
+        
+        # 前回使用したWhisperモデルをバックグラウンドで事前読み込み
+        self._warm_up_whisper()
     
     def create_media_options_row1(self):
         """動画処理オプション第1行作成"""
@@ -66,6 +74,15 @@ class MediaFrame:
             variable=self.force_whisper_var
         )
         self.force_whisper_checkbox.grid(row=0, column=3, sticky=tk.W, padx=(20, 0))
+
+        # オフ時は音声のみ取得（16kHzモノラル）で文字おこし
+        self.keep_video_var = tk.BooleanVar(value=False)
+        self.keep_video_checkbox = ttk.Checkbutton(
+            media_options_frame1, 
+            text="💾 動画を保存", 
+            variable=self.keep_video_var
+        )
+        self.keep_video_checkbox.grid(row=0, column=4, sticky=tk.W, padx=(20, 0))
     
     def create_whisper_model_selection(self):
         """Whisperモデル選択作成"""
@@ -73,7 +90,7 @@ class MediaFrame:
         media_options_frame2.grid(row=1, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
 
         ttk.Label(media_options_frame2, text="Whisperモデル:").grid(row=0, column=0, sticky=tk.W, padx=(0, 10))
-        self.whisper_model_var = tk.StringVar(value="base")
+        self.whisper_model_var = tk.StringVar(value=default_model_size())  # 計測済みならその最適値
         whisper_combo = ttk.Combobox(
             media_options_frame2, 
             textvariable=self.whisper_model_var, 
@@ -105,12 +122,53 @@ class MediaFrame:
             state="readonly"
         )
         quality_combo.grid(row=0, column=4, sticky=tk.W)
+
+        # 文字おこし方式（parallel: 無音区間で分割して複数プロセス / batched: バッチ推論 / streaming: DLと同時に処理）
+        ttk.Label(media_options_frame2, text="処理方式:").grid(row=0, column=5, sticky=tk.W, padx=(20, 10))
+        self.transcription_mode_var = tk.StringVar(value=TRANSCRIPTION_MODE)
+        mode_combo = ttk.Combobox(
+            media_options_frame2, 
+            textvariable=self.transcription_mode_var,
+            values=["sequential", "parallel", "batched", "streaming"], 
+            width=10, 
+            state="readonly"
+        )
+        mode_combo.grid(row=0, column=6, sticky=tk.W)
+    
+    def create_time_range_options(self):
+        """文字おこし範囲（開始・終了）とスキム設定作成"""
+        range_frame = ttk.Frame(self.frame)
+        range_frame.grid(row=2, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
+
+        # 空欄なら先頭から／末尾まで（例: 90, 1:30, 01:02:03）
+        ttk.Label(range_frame, text="範囲 開始:").grid(row=0, column=0, sticky=tk.W, padx=(0, 10))
+        self.range_start_var = tk.StringVar()
+        ttk.Entry(range_frame, textvariable=self.range_start_var, width=10).grid(row=0, column=1, sticky=tk.W)
+
+        ttk.Label(range_frame, text="終了:").grid(row=0, column=2, sticky=tk.W, padx=(10, 10))
+        self.range_end_var = tk.StringVar()
+        ttk.Entry(range_frame, textvariable=self.range_end_var, width=10).grid(row=0, column=3, sticky=tk.W)
+
+        # 範囲内の等間隔の区間だけを文字おこし（概要把握用）
+        self.skim_var = tk.BooleanVar(value=False)
+        self.skim_checkbox = ttk.Checkbutton(
+            range_frame, 
+            text="⏩ スキム（抜粋）", 
+            variable=self.skim_var
+        )
+        self.skim_checkbox.grid(row=0, column=4, sticky=tk.W, padx=(20, 0))
+
+        ttk.Label(
+            range_frame, 
+            text="（空欄: 全体 / 例: 1:30, 01:02:03）", 
+            foreground="gray"
+        ).grid(row=0, column=5, sticky=tk.W, padx=(10, 0))
     
     def create_claude_url_input(self):
         """AI分析設定作成"""
         # AI選択フレーム
         ai_selection_frame = ttk.Frame(self.frame)
-        ai_selection_frame.grid(row=2, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
+        ai_selection_frame.grid(row=3, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
         
         # AI選択ラベルとラジオボタン
         ttk.Label(ai_selection_frame, text="AI分析:").grid(row=0, column=0, sticky=tk.W, padx=(0, 10))
@@ -140,6 +198,21 @@ class MediaFrame:
         model = self.whisper_model_var.get()
         info_text = UIHelpers.create_model_info_text(model)
         self.model_info_label.config(text=info_text)
+        self._warm_up_whisper(model)
+
+    def _warm_up_whisper(self, model_size=None):
+        """Whisperモデルの事前読み込み（次の文字おこしを即時開始するため）"""
+        try:
+            from lib.whisper_registry import get_registry
+            registry = get_registry()
+            if model_size is None:
+                last = registry.last_used()
+                if last:
+                    self.whisper_model_var.set(last["model_size"])
+                    self.model_info_label.config(text=UIHelpers.create_model_info_text(last["model_size"]))
+            registry.warm_up_async(model_size)
+        except Exception:
+            pass  # 事前読み込みは失敗しても処理に影響しない
     
     def _on_ai_service_change(self):
         """AI サービス変更時の処理"""
@@ -165,6 +238,11 @@ class MediaFrame:
             'use_timestamps': self.timestamp_var.get(),
             'download_video': self.download_video_var.get(),
             'force_whisper': self.force_whisper_var.get(),
+            'keep_video': self.keep_video_var.get(),
+            'transcription_mode': self.transcription_mode_var.get(),
+            'range_start': self.range_start_var.get().strip(),
+            'range_end': self.range_end_var.get().strip(),
+            'skim': self.skim_var.get(),
             'whisper_model': self.whisper_model_var.get(),
             'audio_quality': self.audio_quality_var.get(),
             'ai_service': getattr(self, 'ai_service_var', tk.StringVar(value="claude")).get(),  # 追加
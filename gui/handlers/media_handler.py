@@ -7,6 +7,7 @@ from tkinter import messagebox
 from ..utils.validators import URLValidator
 from ..utils.ui_helpers import UIHelpers
 from lib.database_manager import DatabaseManager
+from lib.time_ranges import parse_timecode
 from config.settings import USE_DATABASE, DATABASE_PATH
 
 class MediaHandler:
@@ -23,6 +24,20 @@ class MediaHandler:
             self.main_app.log_message("❌ 動画URLを入力してください")
             return
         
+        # 文字おこし範囲の検証
+        try:
+            self._get_time_range()
+        except ValueError as e:
+            self.main_app.log_message(f"❌ {e}")
+            return
+        
+        # 複数URL・プレイリスト・チャンネルは一括処理（別スレッドで実行）
+        if URLValidator.is_media_batch(url_text):
+            self._set_running_state(True)
+            urls = URLValidator.split_urls(url_text)
+            threading.Thread(target=self._start_media_batch, args=(urls,), daemon=True).start()
+            return
+        
         # URL検証
         if not (URLValidator.is_tweet_url(url_text) or URLValidator.is_youtube_url(url_text)):
             self.main_app.log_message("❌ 有効なツイートURL または YouTubeURL を入力してください")
@@ -65,10 +80,74 @@ class MediaHandler:
         finally:
             self._set_running_state(False)
 
+    def _start_media_batch(self, urls):
+        """一括メディア処理（ダウンロード・文字おこし・翻訳を並行し、各件の結果をログに表示）"""
+        try:
+            settings = self._get_media_settings(" ".join(urls))
+            self._setup_environment()
+            
+            self.main_app.log_message(f"📚 一括メディア処理開始: 入力{len(urls)}件")
+            self.main_app.log_message(f"Whisperモデル: {settings['whisper_model']}")
+            if not settings['download_video']:
+                self.main_app.log_message("一括処理ではDOM字幕を使わず、全件Whisperで文字おこしします")
+            self._update_status_progress("一括処理中...", 0)
+            
+            from workflows.batch_media_transcription import BatchMediaTranscriptionWorkflow
+            workflow = BatchMediaTranscriptionWorkflow()
+            finished = []
+            
+            def on_progress(item):
+                if item.status == "done":
+                    finished.append(item)
+                    self.main_app.log_message(f"✅ [{item.index + 1}] {item.url} → {item.text_file}")
+                    self._save_media_to_db(item.url, item.media_path, item.text_file,
+                                           item.transcription_text, item.translation, None)
+                elif item.status == "failed":
+                    finished.append(item)
+                    self.main_app.log_message(f"❌ [{item.index + 1}] {item.url}: {item.error}")
+                else:
+                    return
+                self.main_app.root.after(0, self._update_status_progress, f"一括処理中... {len(finished)}件完了", 0)
+            
+            items, summary_file = workflow.execute(
+                urls,
+                translate=settings['translate'],
+                target_language="en",
+                whisper_model=settings['whisper_model'],
+                audio_quality=settings['audio_quality'],
+                use_timestamps=settings['use_timestamps'],
+                keep_video=settings['keep_video'],
+                force_whisper=settings['force_whisper'],
+                transcription_mode=settings['transcription_mode'],
+                progress_callback=on_progress,
+                start=settings['start'],
+                end=settings['end'],
+                skim=settings['skim']
+            )
+            
+            succeeded = [item for item in items if item.status == "done"]
+            self.main_app.log_message("=" * 40)
+            self.main_app.log_message(f"📊 一括処理完了: 成功 {len(succeeded)}件 / 失敗 {len(items) - len(succeeded)}件")
+            if summary_file:
+                self.main_app.log_message(f"結果一覧: {summary_file}")
+            
+            if succeeded:
+                last = succeeded[-1]
+                self.main_app.root.after(0, lambda: self.main_app.results_frame.set_result(
+                    last.text_file, video_file_path=last.media_path
+                ))
+            self.main_app.root.after(0, self._update_status_progress, "完了!" if succeeded else "失敗", 100 if succeeded else 0)
+            
+        except Exception as e:
+            self.main_app.root.after(0, self._handle_error, f"一括メディア処理エラー: {e}")
+        finally:
+            self.main_app.root.after(0, self._set_running_state, False)
+
     def _get_media_settings(self, url_text):
         """メディア処理設定取得"""
         media_data = self.main_app.media_frame.get_settings()
         settings_data = self.main_app.settings_frame
+        start, end = self._get_time_range()
         
         return {
             'url_text': url_text,
@@ -78,10 +157,20 @@ class MediaHandler:
             'audio_quality': media_data['audio_quality'],
             'download_video': media_data['download_video'],
             'force_whisper': media_data['force_whisper'],
+            'keep_video': media_data['keep_video'],
+            'transcription_mode': media_data['transcription_mode'],
+            'start': start,
+            'end': end,
+            'skim': media_data['skim'],
             'claude_chat_url': media_data['claude_chat_url'],
             'comment_count': int(settings_data.count_var.get())
         }
 
+    def _get_time_range(self):
+        """文字おこし範囲（開始秒, 終了秒）。形式が正しくなければ ValueError"""
+        media_data = self.main_app.media_frame.get_settings()
+        return parse_timecode(media_data['range_start']), parse_timecode(media_data['range_end'])
+
     def _setup_environment(self):
         """環境設定"""
         import sys
@@ -112,7 +201,12 @@ class MediaHandler:
                 progress_callback=None, 
                 comment_count=settings['comment_count'], 
                 download_video=settings['download_video'],
-                force_whisper=settings['force_whisper']
+                force_whisper=settings['force_whisper'],
+                keep_video=settings['keep_video'],
+                transcription_mode=settings['transcription_mode'],
+                start=settings['start'],
+                end=settings['end'],
+                skim=settings['skim']
             )
             
             self._update_status_progress("", 100)
@@ -152,35 +246,7 @@ class MediaHandler:
         comments_file_path = self._detect_comments_file(text_file, url_text)
         
         # DB保存
-        if USE_DATABASE:
-            try:
-                db = DatabaseManager(DATABASE_PATH)
-                
-                # プラットフォーム判定
-                platform = "youtube" if URLValidator.is_youtube_url(url_text) else "twitter"
-                
-                # メディア処理設定取得
-                settings = self._get_current_media_settings()
-                
-                # メディア処理結果をDB保存
-                media_id = db.save_media_processing(
-                    url=url_text,
-                    platform=platform,
-                    video_file_path=video_path,
-                    transcription_file_path=text_file,
-                    transcription_text=transcription_text,
-                    translation_text=translation,
-                    whisper_model=settings.get('whisper_model'),
-                    use_timestamps=settings.get('use_timestamps'),
-                    audio_quality=settings.get('audio_quality'),
-                    video_info=None,  # 後で動画情報も保存可能
-                    comments_file_path=comments_file_path
-                )
-                
-                self.main_app.log_message(f"DB保存完了: メディアID={media_id}")
-                
-            except Exception as e:
-                self.main_app.log_message(f"DB保存エラー: {e}")
+        self._save_media_to_db(url_text, video_path, text_file, transcription_text, translation, comments_file_path)
         
         # 結果設定（既存のコード）
         self.main_app.results_frame.set_result(
@@ -190,13 +256,46 @@ class MediaHandler:
         )
         
         # 完了ログとメッセージ（既存のコード）
-        platform = "YouTube" if URLValidator.is_youtube_url(url_text) else "Twitter"
         self.main_app.log_message(f"全処理完了: {text_file}")
         self._update_status_progress("完了!", 100)
         
         if comments_file_path:
             self.main_app.log_message("コメント分析ボタンが有効になりました")
 
+    def _save_media_to_db(self, url_text, video_path, text_file, transcription_text, translation,
+                          comments_file_path):
+        """メディア処理結果をDB保存"""
+        if not USE_DATABASE:
+            return
+        try:
+            db = DatabaseManager(DATABASE_PATH)
+            
+            # プラットフォーム判定
+            platform = "youtube" if URLValidator.is_youtube_url(url_text) else "twitter"
+            
+            # メディア処理設定取得
+            settings = self._get_current_media_settings()
+            
+            # メディア処理結果をDB保存
+            media_id = db.save_media_processing(
+                url=url_text,
+                platform=platform,
+                video_file_path=video_path,
+                transcription_file_path=text_file,
+                transcription_text=transcription_text,
+                translation_text=translation,
+                whisper_model=settings.get('whisper_model'),
+                use_timestamps=settings.get('use_timestamps'),
+                audio_quality=settings.get('audio_quality'),
+                video_info=None,  # 後で動画情報も保存可能
+                comments_file_path=comments_file_path
+            )
+            
+            self.main_app.log_message(f"DB保存完了: メディアID={media_id}")
+            
+        except Exception as e:
+            self.main_app.log_message(f"DB保存エラー: {e}")
+
     def _get_current_media_settings(self):
         """現在のメディア設定を取得"""
         try:
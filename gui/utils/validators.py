@@ -28,6 +28,36 @@ class URLValidator:
         ]
         return any(pattern in text.lower() for pattern in youtube_patterns)
     
+    @staticmethod
+    def is_youtube_collection_url(text):
+        """YouTubeのプレイリスト・チャンネルURLかどうか判定"""
+        if not text:
+            return False
+        collection_patterns = [
+            'youtube.com/playlist?',
+            'youtube.com/@',
+            'youtube.com/channel/',
+            'youtube.com/c/',
+            'youtube.com/user/'
+        ]
+        return any(pattern in text.lower() for pattern in collection_patterns)
+    
+    @staticmethod
+    def split_urls(text):
+        """空白・改行・カンマ区切りのURL一覧"""
+        return [url for url in re.split(r'[\s,]+', text or "") if url]
+    
+    @staticmethod
+    def is_media_batch(text):
+        """一括メディア処理の対象（複数の動画URL、またはプレイリスト・チャンネル）かどうか判定"""
+        urls = URLValidator.split_urls(text)
+        if not urls or not all(url.startswith(('http://', 'https://')) for url in urls):
+            return False
+        if not all(URLValidator.is_tweet_url(url) or URLValidator.is_youtube_url(url)
+                   or URLValidator.is_youtube_collection_url(url) for url in urls):
+            return False
+        return len(urls) > 1 or URLValidator.is_youtube_collection_url(urls[0])
+    
     @staticmethod
     def validate_query(query):
         """クエリの基本検証"""
@@ -62,7 +92,13 @@ class URLValidator:
                 url_type_label.config(text="種別: 自動判定", foreground="blue")
                 return
             
-            if URLValidator.is_youtube_url(url_text):
+            if URLValidator.is_media_batch(url_text):
+                count = len(URLValidator.split_urls(url_text))
+                if count > 1:
+                    url_type_label.config(text=f"種別: 一括メディア処理（{count}件）", foreground="red")
+                else:
+                    url_type_label.config(text="種別: YouTubeプレイリスト/チャンネル", foreground="red")
+            elif URLValidator.is_youtube_url(url_text):
                 url_type_label.config(text="種別: YouTube動画", foreground="red")
             elif URLValidator.is_tweet_url(url_text):
                 url_type_label.config(text="種別: ツイート", foreground="green")
@@ -0,0 +1,209 @@
+"""取得済みメディアの内容アドレス保存（同じ内容のファイルは1つだけ保存し、実行ごとのフォルダからは参照する）"""
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from lib.transcription_cache import audio_sha256, media_key_for_url
+from config.settings import ARTIFACT_STORE_DIR, ARTIFACT_STORE_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+REF_SUFFIX = ".ref.json"
+
+
+def artifact_source_key(media_url, kind, quality="best"):
+    """取得元のキー（メディアID × 種類 × 画質、メディアIDが判別できなければ None）"""
+    media_key = media_key_for_url(media_url)
+    return f"{media_key}|{kind}|{quality}" if media_key else None
+
+
+class ArtifactStore:
+    """メディアファイルを SHA-256 ごとに1つだけ保存し、実行ごとのフォルダへハードリンクで配置
+
+    ハードリンクを作れない場合（別ドライブ等）は、実行フォルダに <ファイル名>.ref.json の参照記録を置き、
+    保存先のファイルを直接使う。artifacts は内容ごとの保存先、refs は実行フォルダからの参照、
+    sources は取得元（メディアID・種類・画質）ごとの内容で、同じ取得を繰り返すときはダウンロードも書き込みもしない。
+    参照が1つもない内容は collect_garbage() で削除する。
+    """
+
+    def __init__(self, root=ARTIFACT_STORE_DIR, db_path=ARTIFACT_STORE_DB_PATH):
+        self.root = root
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS artifacts (
+                    sha256 TEXT PRIMARY KEY,
+                    store_path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at DATETIME NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS refs (
+                    path TEXT PRIMARY KEY,
+                    sha256 TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    created_at DATETIME NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS sources (
+                    source_key TEXT PRIMARY KEY,
+                    sha256 TEXT NOT NULL,
+                    created_at DATETIME NOT NULL
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS refs_sha256 ON refs (sha256)")
+
+    @contextmanager
+    def _connect(self):
+        """コミットして閉じる接続"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def ingest(self, path, source_key=None):
+        """ファイルを保存領域へ移し、元の場所には参照を置く（以後使うパスを返す）
+
+        同じ内容が保存済みなら新しいファイルは削除して既存のものを参照する。
+        """
+        sha256 = audio_sha256(path)
+        ext = os.path.splitext(path)[1]
+        with self._lock:
+            with self._connect() as conn:
+                row = conn.execute("SELECT store_path FROM artifacts WHERE sha256 = ?", (sha256,)).fetchone()
+            if row and os.path.exists(row[0]):
+                store_path = row[0]
+                os.remove(path)
+                logger.info(f"保存済みのメディアと同じ内容のため共有します: {os.path.basename(path)}（{sha256[:12]}）")
+            else:
+                store_path = os.path.join(self.root, sha256[:2], f"{sha256}{ext}")
+                os.makedirs(os.path.dirname(store_path), exist_ok=True)
+                shutil.move(path, store_path)
+                with self._connect() as conn:
+                    conn.execute("INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?)",
+                                 (sha256, store_path, os.path.getsize(store_path), self._now()))
+            if source_key:
+                with self._connect() as conn:
+                    conn.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?)", (source_key, sha256, self._now()))
+            return self._place(sha256, store_path, path)
+
+    def checkout(self, source_key, output_dir, basename):
+        """同じ取得元の保存済みファイルを実行フォルダに配置（なければ None）"""
+        if not source_key:
+            return None
+        with self._lock:
+            with self._connect() as conn:
+                row = conn.execute('''
+                    SELECT artifacts.sha256, artifacts.store_path FROM sources
+                    JOIN artifacts ON artifacts.sha256 = sources.sha256
+                    WHERE sources.source_key = ?
+                ''', (source_key,)).fetchone()
+            if not row or not os.path.exists(row[1]):
+                return None
+            sha256, store_path = row
+            os.makedirs(output_dir, exist_ok=True)
+            path = os.path.join(output_dir, basename + os.path.splitext(store_path)[1])
+            return self._place(sha256, store_path, path)
+
+    def release(self, path):
+        """実行フォルダの参照を外す（内容は collect_garbage() で削除）"""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM refs WHERE path = ?", (os.path.abspath(path),))
+        if os.path.exists(path + REF_SUFFIX):
+            os.remove(path + REF_SUFFIX)
+
+    def collect_garbage(self, dry_run=False):
+        """消えた参照を整理し、参照のない内容を削除（(削除件数, 解放バイト数) を返す）"""
+        with self._lock:
+            with self._connect() as conn:
+                refs = conn.execute('''
+                    SELECT refs.path, refs.sha256, refs.kind, artifacts.store_path FROM refs
+                    JOIN artifacts ON artifacts.sha256 = refs.sha256
+                ''').fetchall()
+                artifacts = conn.execute("SELECT sha256, store_path, size FROM artifacts").fetchall()
+
+            stale = {path for path, _, kind, store_path in refs if not self._is_live(path, kind, store_path)}
+            referenced = {sha256 for path, sha256, _, _ in refs if path not in stale}
+            orphans = [(sha256, store_path, size) for sha256, store_path, size in artifacts if sha256 not in referenced]
+            freed = sum(size for _, _, size in orphans)
+
+            if not dry_run:
+                for _, store_path, _ in orphans:
+                    if os.path.exists(store_path):
+                        os.remove(store_path)
+                    try:
+                        os.rmdir(os.path.dirname(store_path))  # 空になった振り分けフォルダ
+                    except OSError:
+                        pass
+                with self._connect() as conn:
+                    conn.executemany("DELETE FROM refs WHERE path = ?", [(path,) for path in stale])
+                    for sha256, _, _ in orphans:
+                        conn.execute("DELETE FROM artifacts WHERE sha256 = ?", (sha256,))
+                        conn.execute("DELETE FROM sources WHERE sha256 = ?", (sha256,))
+
+        logger.info(f"メディア保存領域の整理: 参照切れ {len(stale)}件、削除 {len(orphans)}件（{freed / 1024 / 1024:.1f}MB）"
+                    + ("（確認のみ）" if dry_run else ""))
+        return len(orphans), freed
+
+    def usage(self):
+        """(保存している内容の数, 合計バイト数, 参照数)"""
+        with self._lock, self._connect() as conn:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM artifacts").fetchone()
+            refs = conn.execute("SELECT COUNT(*) FROM refs").fetchone()[0]
+        return count, total, refs
+
+    def _place(self, sha256, store_path, path):
+        """path に保存先へのハードリンクを作成（できなければ参照記録を置いて保存先のパスを返す）"""
+        if os.path.exists(path):
+            os.remove(path)
+        try:
+            os.link(store_path, path)
+            kind, usable = "link", path
+        except OSError:
+            with open(path + REF_SUFFIX, 'w', encoding='utf-8') as f:
+                json.dump({'sha256': sha256, 'store_path': os.path.abspath(store_path)}, f, ensure_ascii=False)
+            kind, usable = "record", store_path
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO refs VALUES (?, ?, ?, ?)",
+                         (os.path.abspath(path), sha256, kind, self._now()))
+        return usable
+
+    def _is_live(self, path, kind, store_path):
+        """参照がまだ有効か（実行フォルダが削除・ファイルが置き換えられていないか）"""
+        if kind == "record":
+            return os.path.exists(path + REF_SUFFIX)
+        try:
+            return os.path.samefile(path, store_path)
+        except OSError:
+            return False
+
+    def _now(self):
+        return datetime.now().isoformat(timespec='seconds')
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store():
+    """プロセス共通のメディア保存領域（開けなければ None）"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            try:
+                _store = ArtifactStore()
+            except Exception as e:
+                logger.warning(f"メディア保存領域を開けません: {e}")
+                _store = False
+        return _store or None
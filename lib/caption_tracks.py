@@ -0,0 +1,228 @@
+"""yt-dlpで取得できる字幕トラック（投稿者の字幕・自動生成字幕）を文字おこしセグメントに変換"""
+import glob
+import html
+import json
+import logging
+import os
+import re
+import subprocess
+import tempfile
+import urllib.request
+from collections import namedtuple
+from xml.etree import ElementTree
+from config.settings import CAPTION_ALLOW_AUTOMATIC, CAPTION_MIN_CHARS, CAPTION_FETCH_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# automatic: 自動生成字幕かどうか
+CaptionTrack = namedtuple("CaptionTrack", ["language", "automatic", "segments"])
+
+# 優先する字幕形式（json3は自動生成字幕でも行の重複がない）
+_FORMAT_PREFERENCE = ("json3", "vtt")
+_VTT_TIMING = re.compile(
+    r'(?:(\d+):)?(\d{2}):(\d{2})[.,](\d{3})\s+-->\s+(?:(\d+):)?(\d{2}):(\d{2})[.,](\d{3})'
+)
+_VTT_TAG = re.compile(r'<[^>]+>')
+_MIN_CUE_SECONDS = 0.05  # 自動生成字幕の切り替え用の極短キューは除く
+
+
+def _seconds(hours, minutes, secs, millis):
+    return int(hours or 0) * 3600 + int(minutes) * 60 + int(secs) + int(millis) / 1000
+
+
+def parse_json3(content):
+    """YouTubeのjson3字幕をセグメント一覧に変換"""
+    segments = []
+    for event in json.loads(content).get('events') or []:
+        text = "".join(seg.get('utf8', '') for seg in event.get('segs') or []).replace("\n", " ").strip()
+        if not text or 'tStartMs' not in event:
+            continue
+        start = event['tStartMs'] / 1000
+        end = start + event.get('dDurationMs', 0) / 1000
+        segments.append({'start': round(start, 2), 'end': round(end, 2), 'text': text})
+    return segments
+
+
+def parse_vtt(content):
+    """WebVTT字幕をセグメント一覧に変換
+
+    自動生成字幕は前のキューの行を繰り返しながら1行ずつ流れるため、
+    直前のキューにない行だけをそのキューの本文とする。
+    """
+    segments = []
+    previous_lines = []
+    for block in re.split(r'\n\s*\n', content.replace('\r\n', '\n')):
+        lines = block.strip().split('\n')
+        timing_index = next((i for i, line in enumerate(lines) if _VTT_TIMING.search(line)), None)
+        if timing_index is None:
+            continue
+        match = _VTT_TIMING.search(lines[timing_index])
+        start = _seconds(*match.group(1, 2, 3, 4))
+        end = _seconds(*match.group(5, 6, 7, 8))
+
+        text_lines = [_VTT_TAG.sub('', line).strip() for line in lines[timing_index + 1:]]
+        text_lines = [line for line in text_lines if line]
+        new_lines = [line for line in text_lines if line not in previous_lines]
+        if text_lines:
+            previous_lines = text_lines
+        if not new_lines or end - start < _MIN_CUE_SECONDS:
+            continue
+        segments.append({'start': round(start, 2), 'end': round(end, 2), 'text': " ".join(new_lines)})
+    return segments
+
+
+def parse_timedtext_xml(content):
+    """YouTubeのtimedtext XML（srv1の<text start dur>、srv3の<p t d>）をセグメント一覧に変換"""
+    segments = []
+    root = ElementTree.fromstring(content)
+    for node in root.iter():
+        if node.tag == "text":
+            start = float(node.get('start', 0))
+            end = start + float(node.get('dur', 0))
+        elif node.tag == "p" and node.get('t') is not None:
+            start = int(node.get('t')) / 1000
+            end = start + int(node.get('d', 0)) / 1000
+        else:
+            continue
+        text = html.unescape("".join(node.itertext())).replace("\n", " ").strip()
+        if text:
+            segments.append({'start': round(start, 2), 'end': round(end, 2), 'text': text})
+    return segments
+
+
+def parse_caption(content, ext):
+    if ext == "json3":
+        return parse_json3(content)
+    if ext in ("srv1", "srv3", "xml"):
+        return parse_timedtext_xml(content)
+    return parse_vtt(content)
+
+
+def choose_player_track(tracks, language=None, allow_automatic=CAPTION_ALLOW_AUTOMATIC):
+    """プレーヤー情報の captionTracks から使う字幕を選ぶ（投稿者の字幕を優先、なければ None）
+
+    language 未指定時は自動生成字幕の言語（＝話されている言語）に合わせる。
+    自動生成字幕は元の音声言語のものだけがあり、自動翻訳はURLの指定で作られるため対象外。
+    """
+    automatic = [track for track in tracks if track.get('kind') == "asr"]
+    manual = [track for track in tracks if track.get('kind') != "asr"]
+    if not language:
+        language = automatic[0].get('languageCode', '').split("-")[0] if automatic else None
+    if not language:
+        return manual[0] if manual else None
+
+    def matches(track):
+        code = track.get('languageCode', '')
+        return code == language or code.startswith(f"{language}-")
+
+    for track in manual:
+        if matches(track):
+            return track
+    if allow_automatic:
+        for track in automatic:
+            if matches(track):
+                return track
+    return None
+
+
+class CaptionFetcher:
+    """指定言語の字幕トラックを探して取得（投稿者の字幕を優先、次に自動生成字幕）"""
+
+    def __init__(self, client=None, allow_automatic=CAPTION_ALLOW_AUTOMATIC,
+                 min_chars=CAPTION_MIN_CHARS, timeout=CAPTION_FETCH_TIMEOUT):
+        self.client = client
+        self.allow_automatic = allow_automatic
+        self.min_chars = min_chars
+        self.timeout = timeout
+
+    def fetch(self, media_url, language="ja"):
+        """使える字幕トラック（なければ None）"""
+        try:
+            if self.client:
+                track = self._fetch_in_process(media_url, language)
+            else:
+                track = self._fetch_with_cli(media_url, language)
+        except Exception as e:
+            logger.warning(f"字幕トラック取得エラー: {e}")
+            return None
+
+        if not track:
+            logger.info(f"字幕トラックなし（{language}）")
+            return None
+        if sum(len(segment['text']) for segment in track.segments) < self.min_chars:
+            logger.info("字幕トラックの内容が短すぎるため使用しません")
+            return None
+
+        kind = "自動生成字幕" if track.automatic else "字幕"
+        logger.info(f"{kind}トラックを使用: {track.language}（{len(track.segments)}セグメント）")
+        return track
+
+    def _fetch_in_process(self, media_url, language):
+        """取得済みのメディア情報から字幕のURLを選び、直接ダウンロード"""
+        info = self.client.extract(media_url)
+        for automatic, tracks in self._candidates(info, language):
+            by_ext = {track.get('ext'): track for track in tracks if track.get('url')}
+            for ext in _FORMAT_PREFERENCE:
+                if ext in by_ext:
+                    with urllib.request.urlopen(by_ext[ext]['url'], timeout=self.timeout) as response:
+                        content = response.read().decode('utf-8', errors='replace')
+                    segments = parse_caption(content, ext)
+                    if segments:
+                        return CaptionTrack(language, automatic, segments)
+        return None
+
+    def _candidates(self, info, language):
+        """(自動生成か, 字幕形式の一覧) を優先順に"""
+        subtitles = info.get('subtitles') or {}
+        for key in self._matching_keys(subtitles, language):
+            yield False, subtitles[key]
+
+        if not self.allow_automatic:
+            return
+        automatic = info.get('automatic_captions') or {}
+        # 元の音声言語の自動字幕だけを使う（他言語からの自動翻訳は精度が低い）
+        if f"{language}-orig" in automatic:
+            yield True, automatic[f"{language}-orig"]
+        elif (info.get('language') or "").split("-")[0] == language and language in automatic:
+            yield True, automatic[language]
+
+    def _matching_keys(self, tracks, language):
+        """言語コードが一致するトラック（ja, ja-JP 等。live_chatは除く）"""
+        return [key for key in tracks
+                if key != "live_chat" and (key == language or key.startswith(f"{language}-"))]
+
+    def _fetch_with_cli(self, media_url, language):
+        """yt-dlp CLIで字幕ファイルのみを書き出して読み込む（投稿者の字幕 → 自動生成字幕）"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            attempts = [(False, "--write-subs", f"{language},{language}-.*")]
+            if self.allow_automatic:
+                attempts.append((True, "--write-auto-subs", f"{language}-orig,{language}"))
+
+            for automatic, flag, sub_langs in attempts:
+                cmd = [
+                    "yt-dlp",
+                    "--skip-download",
+                    flag,
+                    "--sub-langs", sub_langs,
+                    "--sub-format", "/".join(_FORMAT_PREFERENCE),
+                    "--no-playlist",
+                    "--output", os.path.join(tmp_dir, "caption.%(ext)s"),
+                    media_url
+                ]
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+                if result.returncode != 0:
+                    logger.debug(f"yt-dlp字幕取得エラー: {result.stderr.strip()[:200]}")
+                    continue
+
+                # caption.<言語>.<形式>（-orig を優先）
+                files = sorted(glob.glob(os.path.join(tmp_dir, "caption.*")),
+                               key=lambda path: "-orig." not in path)
+                for path in files:
+                    ext = path.rsplit(".", 1)[-1]
+                    if ext not in _FORMAT_PREFERENCE:
+                        continue
+                    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                        segments = parse_caption(f.read(), ext)
+                    if segments:
+                        return CaptionTrack(language, automatic, segments)
+        return None
@@ -5,14 +5,39 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from config.claude_selectors import *
+from lib.comment_sampler import CommentSampler, format_comment_stats
+from lib.tweet_analytics import TweetAnalytics, format_analytics_summary
+from lib.tweet_selector import TweetSelector
+from lib.selector_resolver import SelectorResolver
+from config.settings import SELECTOR_TEXT_LENGTH
 
 logger = logging.getLogger(__name__)
 
+# ファイル分析でプロンプトの指定がない場合の依頼文
+DEFAULT_FILE_ANALYSIS_PROMPT = "このファイルの内容を分析してください。主要なポイントと傾向をまとめてください。"
+
+
+def _first_enabled(elements):
+    """表示中かつ有効な最初の要素"""
+    for element in elements:
+        if element.is_displayed() and element.is_enabled():
+            return element
+    return None
+
+
+def _latest_response(elements):
+    """最新の応答要素（十分な長さのテキストを持つ場合のみ）"""
+    latest = elements[-1]
+    text = latest.text.strip()
+    return latest if text and len(text) > 10 else None
+
+
 class ClaudeAutomation:
     def __init__(self, chrome_connector):
         self.chrome = chrome_connector
         self.driver = chrome_connector.driver
         self.fast_wait = WebDriverWait(self.driver, 10)
+        self.selectors = SelectorResolver(self.driver, "claude.ai")
         
     def analyze_tweets(self, tweets, prompt_template=None):
         """ツイートデータをClaudeで分析"""
@@ -59,8 +84,11 @@ class ClaudeAutomation:
     
     def _create_analysis_prompt(self, tweets, template=None):
         """分析用プロンプトを作成"""
+        # ローカル集計（頻出語・ハッシュタグ・エンゲージメント分布・時間帯）
+        summary = format_analytics_summary(TweetAnalytics().analyze(tweets))
+        
         if template:
-            return template.format(tweets=tweets)
+            return template.format(tweets=tweets, summary=summary)
         
         # デフォルトプロンプト
         prompt = "以下のツイートデータを分析してください。\n\n"
@@ -68,10 +96,21 @@ class ClaudeAutomation:
         prompt += "1. 全体的な傾向\n"
         prompt += "2. エンゲージメントの高いツイートの特徴\n"
         prompt += "3. 主要なトピック\n\n"
-        prompt += "【データ】\n"
+        prompt += f"【全体の集計（{len(tweets)}件）】\n{summary}\n\n"
         
-        for i, tweet in enumerate(tweets[:10], 1):  # 最初の10件のみ
-            prompt += f"{i}. {tweet.get('text', '')}\n"
+        # 予算内に収まらない場合はトピック別クラスタの代表 + 高反応ツイートを選定
+        selected, clusters = TweetSelector().select(tweets)
+        if len(selected) < len(tweets):
+            prompt += f"【データ（{len(tweets)}件からトピック別に{len(selected)}件を抽出）】\n"
+            prompt += "トピック構成: " + ", ".join(
+                f"トピック{c['id']}: {c['size']}件" for c in clusters
+            ) + "\n\n"
+        else:
+            prompt += "【データ】\n"
+        
+        for i, tweet in enumerate(selected, 1):
+            label = f"[トピック{tweet['cluster']}] " if len(selected) < len(tweets) else ""
+            prompt += f"{i}. {label}{tweet.get('text', '')[:SELECTOR_TEXT_LENGTH]}\n"
             prompt += f"   いいね: {tweet.get('likes', 0)}, リポスト: {tweet.get('reposts', 0)}\n\n"
         
         return prompt
@@ -82,37 +121,16 @@ class ClaudeAutomation:
             print(f"💬 メッセージ送信開始: {message[:50]}...")
             print(f"🌐 現在のURL: {self.driver.current_url}")
             
-            # 1. テキスト入力エリアを探す
+            # 1. テキスト入力エリアを探す（前回成功したセレクタを優先）
             print("🔍 テキスト入力エリアを探しています...")
             
-            text_input_selectors = [
-                'div[contenteditable="true"]',
-                'textarea',
-                'div[data-testid="chat-input"]',
-                'div[role="textbox"]',
-                'div[aria-label*="メッセージ"]',
-                'input[type="text"]'
-            ]
-            
-            text_input = None
-            for selector in text_input_selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    for element in elements:
-                        if element.is_displayed():
-                            text_input = element
-                            print(f"✅ テキスト入力エリア発見: {selector}")
-                            break
-                    if text_input:
-                        break
-                except Exception as e:
-                    print(f"❌ セレクタ '{selector}' でエラー: {e}")
-                    continue
+            text_input = self.selectors.find('text_input', TEXT_INPUT_SELECTORS, fallbacks=TEXT_INPUT_FALLBACK_SELECTORS)
             
             if not text_input:
                 print("❌ テキスト入力エリアが見つかりません")
                 print("🔍 手動確認: Claudeのチャット画面が表示されていますか？")
                 return None
+            print("✅ テキスト入力エリア発見")
             
             # 2. メッセージを高速・確実に入力（改良版）
             print("⌨️ メッセージを高速入力中...")
@@ -127,28 +145,9 @@ class ClaudeAutomation:
             # 3. 送信ボタンを探す
             print("🔍 送信ボタンを探しています...")
             
-            send_button_selectors = [
-                'button[type="submit"]',
-                'button[aria-label*="送信"]',
-                'button[aria-label*="Send"]',
-                'button[data-testid="send-button"]',
-                'button:has(svg)',
-                'button[disabled="false"]:last-of-type'
-            ]
-            
-            send_button = None
-            for selector in send_button_selectors:
-                try:
-                    buttons = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    for button in buttons:
-                        if button.is_displayed() and button.is_enabled():
-                            send_button = button
-                            print(f"✅ 送信ボタン発見: {selector}")
-                            break
-                    if send_button:
-                        break
-                except:
-                    continue
+            send_button = self.selectors.find(
+                'send_button', SEND_BUTTON_SELECTORS, pick=_first_enabled, fallbacks=SEND_BUTTON_FALLBACK_SELECTORS
+            )
             
             # 送信ボタンが見つからない場合、Enterキーで送信を試す
             if not send_button:
@@ -157,19 +156,11 @@ class ClaudeAutomation:
                     from selenium.webdriver.common.keys import Keys
                     text_input.send_keys(Keys.RETURN)
                     print("✅ Enterキーで送信しました")
-                    # Enterキー送信後、送信ボタンを再取得
+                    # Enterキー送信後、送信ボタンを再取得（応答中は無効なため有効判定なし・別のキーで記憶）
                     time.sleep(1)
-                    for selector in send_button_selectors:
-                        try:
-                            buttons = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                            for button in buttons:
-                                if button.is_displayed():
-                                    send_button = button
-                                    break
-                            if send_button:
-                                break
-                        except:
-                            continue
+                    send_button = self.selectors.find(
+                        'send_button_after_enter', SEND_BUTTON_SELECTORS, fallbacks=SEND_BUTTON_FALLBACK_SELECTORS
+                    )
                 except Exception as e:
                     print(f"❌ Enterキー送信エラー: {e}")
                     return None
@@ -278,24 +269,13 @@ class ClaudeAutomation:
             print("🔍 最新応答を取得中...")
             
             # 最新の応答を取得
-            response_selectors = [
-                'div[data-message-author="assistant"]',
-                'div[data-is-streaming="false"]',
-                'div[role="article"]',
-                'div[data-testid="conversation-turn"]'
-            ]
-            
-            for selector in response_selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    if elements:
-                        latest_element = elements[-1]  # 最新の応答
-                        response_text = latest_element.text.strip()
-                        if response_text and len(response_text) > 10:
-                            print(f"✅ 最新応答取得: {response_text[:100]}...")
-                            return response_text
-                except Exception as e:
-                    continue
+            latest_element = self.selectors.find(
+                'response', RESPONSE_CONTAINER_SELECTORS, pick=_latest_response, fallbacks=RESPONSE_FALLBACK_SELECTORS
+            )
+            if latest_element is not None:
+                response_text = latest_element.text.strip()
+                print(f"✅ 最新応答取得: {response_text[:100]}...")
+                return response_text
             
             print("❌ 最新応答の取得に失敗")
             return None
@@ -309,19 +289,9 @@ class ClaudeAutomation:
         try:
             print("⏳ レスポンス待機開始...")
             
-            # 複数の方法でレスポンスを探す
-            response_selectors = [
-                'div[data-is-streaming="false"]',
-                'div[data-message-author="assistant"]',
-                'div[role="article"]',
-                'div[data-testid="conversation-turn"]',
-                'div:contains("Claude")',
-                'p, div'  # 最後の手段
-            ]
-            
             start_time = time.time()
             while time.time() - start_time < timeout:
-                for selector in response_selectors:
+                for selector in RESPONSE_WAIT_SELECTORS:
                     try:
                         elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
                         
@@ -423,7 +393,7 @@ class ClaudeAutomation:
                 return None, None
             
             # 分析プロンプト送信
-            prompt = analysis_prompt or "このファイルの内容を分析してください。主要なポイントと傾向をまとめてください。"
+            prompt = analysis_prompt or DEFAULT_FILE_ANALYSIS_PROMPT
             
             response = self._send_message(prompt)
             
@@ -436,7 +406,27 @@ class ClaudeAutomation:
         except Exception as e:
             logger.error(f"ファイルアップロード分析エラー: {e}")
             return None, None
-        
+
+    def send_followup(self, chat_url, message):
+        """既存チャットにフォローアップメッセージを送信"""
+        logger.info(f"フォローアップ送信開始: {chat_url}")
+
+        try:
+            if not chat_url or not self.navigate_to_specific_chat(chat_url):
+                return None, None
+
+            response = self._send_message_with_retry(message, max_retries=1)
+            if not response:
+                return None, None
+
+            current_url = self.driver.current_url
+            logger.info(f"フォローアップ完了、URL: {current_url}")
+            return response, current_url
+
+        except Exception as e:
+            logger.error(f"フォローアップ送信エラー: {e}")
+            return None, None
+
 
     def navigate_to_specific_chat(self, chat_url=None):
         """指定されたClaudeチャットルームに移動"""
@@ -551,24 +541,28 @@ class ClaudeAutomation:
         """YouTubeコメントを分析（再試行機能付き）"""
         logger.info(f"コメント分析開始: {comments_jsonl_path}")
         
+        # コメントファイルをストリーミング集計・サンプリング（ファイルサイズに依存しないメモリ使用量）
+        try:
+            sample = CommentSampler().sample_file(comments_jsonl_path)
+        except Exception as e:
+            logger.error(f"コメント読み込みエラー: {e}")
+            return None, None
+        
+        if not sample['stats']['total']:
+            logger.warning("コメントが見つかりません")
+            return None, None
+        
+        # コメント分析プロンプト作成
+        prompt = self._create_comments_analysis_prompt(
+            sample['top_comments'] + sample['sampled_comments'], stats=sample['stats']
+        )
+        
         for retry_count in range(max_retries + 1):
             try:
                 if retry_count > 0:
                     logger.info(f"コメント分析再試行: {retry_count}/{max_retries}")
                     time.sleep(5)  # 再試行前に待機
                 
-                # コメントファイル読み込み
-                import json
-                comments = []
-                with open(comments_jsonl_path, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        if line.strip():
-                            comments.append(json.loads(line))
-                
-                if not comments:
-                    logger.warning("コメントが見つかりません")
-                    return None, None
-                
                 # Claudeページに移動
                 if chat_url:
                     if not self.navigate_to_specific_chat(chat_url):
@@ -576,9 +570,6 @@ class ClaudeAutomation:
                 elif not self._navigate_to_claude():
                     return None, None
                 
-                # コメント分析プロンプト作成
-                prompt = self._create_comments_analysis_prompt(comments)
-                
                 # メッセージ送信（タイムアウト対策）
                 response = self._send_message_with_retry(prompt, max_retries=1)
                 
@@ -601,7 +592,7 @@ class ClaudeAutomation:
         logger.error("コメント分析: 全ての再試行が失敗しました")
         return None, None
 
-    def _create_comments_analysis_prompt(self, comments):
+    def _create_comments_analysis_prompt(self, comments, stats=None):
         """コメント分析用プロンプトを作成"""
         prompt = (
             "以下のYouTubeコメントを分析してください。\n\n"
@@ -615,17 +606,28 @@ class ClaudeAutomation:
             "    - 簡潔で分かりやすく\n"
             "    - 具体的な数値や例を含めて\n"
             "    - 実用的な洞察を提供\n\n"
-            "    【コメントデータ】\n"
         )
         
+        # 全件から算出した集計値（サンプルは高評価上位 + 投稿時期別の層化抽出）
+        if stats:
+            prompt += "    【全体の集計（全件）】\n"
+            prompt += format_comment_stats(stats) + "\n\n"
+            prompt += "    ※以下のコメントは高評価上位と投稿時期別の無作為抽出です\n\n"
+        
+        prompt += "    【コメントデータ】\n"
+        
         # コメントを整形して追加
         for i, comment in enumerate(comments, 1):
             author = comment.get('author', '')
             text = comment.get('text', '')
             likes = comment.get('likes', 0)
             published = comment.get('published', '')
+            similar = comment.get('similar', 0)
             
-            prompt += f"{i}. {author} ({published}) - いいね:{likes}\n"
+            prompt += f"{i}. {author} ({published}) - いいね:{likes}"
+            if similar:
+                prompt += f" - 同様のコメント:{similar}件"
+            prompt += "\n"
             prompt += f"   「{text}」\n\n"
         
-        return prompt
\ No newline at end of file
+        return prompt
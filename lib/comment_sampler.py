@@ -0,0 +1,323 @@
+"""YouTubeコメントのストリーミング集計・層化サンプリング"""
+import heapq
+import json
+import logging
+import random
+import re
+import unicodedata
+from collections import OrderedDict
+from config.settings import (
+    COMMENT_PROMPT_MAX_CHARS, COMMENT_TOP_LIKED, COMMENT_RESERVOIR_PER_BUCKET,
+    COMMENT_MAX_TEXT_LENGTH, COMMENT_DEDUP_KEYS
+)
+
+logger = logging.getLogger(__name__)
+
+# 投稿時期バケット（上限時間, ラベル）
+TIME_BUCKETS = [
+    (1, "1時間以内"),
+    (24, "1日以内"),
+    (24 * 7, "1週間以内"),
+    (24 * 31, "1か月以内"),
+    (24 * 365, "1年以内"),
+    (float("inf"), "1年以上"),
+]
+UNKNOWN_BUCKET = "不明"
+
+# いいね数分布（下限値, ラベル）
+LIKE_BUCKETS = [
+    (0, "0"),
+    (1, "1-9"),
+    (10, "10-99"),
+    (100, "100-999"),
+    (1000, "1000-9999"),
+    (10000, "10000+"),
+]
+
+# 相対時刻表記 → 時間換算
+_AGE_UNITS = [
+    (r'(\d+)\s*(秒|seconds?)', 1 / 3600),
+    (r'(\d+)\s*(分|minutes?)', 1 / 60),
+    (r'(\d+)\s*(時間|hours?)', 1),
+    (r'(\d+)\s*(日|days?)', 24),
+    (r'(\d+)\s*(週間|weeks?)', 24 * 7),
+    (r'(\d+)\s*(か月|ヶ月|カ月|months?)', 24 * 30),
+    (r'(\d+)\s*(年|years?)', 24 * 365),
+]
+
+# 各コメントの整形オーバーヘッド（著者名・いいね数など）の概算文字数
+_LINE_OVERHEAD = 40
+
+
+def parse_like_count(value):
+    """いいね数表記（123 / 1.2K / 1.2万）を整数に変換"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    if not value:
+        return 0
+    text = str(value).strip().replace(',', '')
+    match = re.search(r'([\d.]+)\s*([KkMm万億]?)', text)
+    if not match:
+        return 0
+    try:
+        number = float(match.group(1))
+    except ValueError:
+        return 0
+    multiplier = {
+        'k': 1000, 'm': 1000000, '万': 10000, '億': 100000000
+    }.get(match.group(2).lower(), 1)
+    return int(number * multiplier)
+
+
+def parse_age_hours(published):
+    """「3日前」「2 weeks ago」などの相対時刻を経過時間（時間）に変換"""
+    if not published:
+        return None
+    text = str(published).lower()
+    for pattern, hours in _AGE_UNITS:
+        match = re.search(pattern, text)
+        if match:
+            return int(match.group(1)) * hours
+    return None
+
+
+def time_bucket_label(published):
+    """投稿時期バケットのラベルを取得"""
+    age = parse_age_hours(published)
+    if age is None:
+        return UNKNOWN_BUCKET
+    for limit, label in TIME_BUCKETS:
+        if age <= limit:
+            return label
+    return TIME_BUCKETS[-1][1]
+
+
+def normalize_for_dedup(text):
+    """ほぼ同一コメント判定用に正規化（表記ゆれ・記号・連続文字を吸収）"""
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    text = re.sub(r'[\s\W_]+', '', text)
+    text = re.sub(r'(.)\1{2,}', r'\1\1', text)  # wwwww → ww
+    return text[:200]
+
+
+class CommentSampler:
+    """コメントJSONLをストリーミングで読み、上位いいね + 時期別リザーバーで代表サンプルを作る
+
+    保持するのは上位いいね件数 + バケット数×リザーバー容量 + 重複判定用の正規化キー（上限あり）のみで、
+    メモリ使用量はファイルサイズに依存しない。集計値は全件から正確に算出する。
+    """
+
+    def __init__(self, max_chars=COMMENT_PROMPT_MAX_CHARS, top_liked=COMMENT_TOP_LIKED,
+                 reservoir_size=COMMENT_RESERVOIR_PER_BUCKET,
+                 max_text_length=COMMENT_MAX_TEXT_LENGTH, dedup_keys=COMMENT_DEDUP_KEYS, seed=None):
+        self.max_chars = max_chars
+        self.top_liked = top_liked
+        self.reservoir_size = reservoir_size
+        self.max_text_length = max_text_length
+        self.dedup_keys = dedup_keys
+        self.random = random.Random(seed)
+        self._reset()
+
+    def _reset(self):
+        """集計状態を初期化"""
+        self.top_heap = []  # (likes, seq, item) の最小ヒープ
+        self.reservoirs = {}  # bucket -> [item, ...]
+        self.bucket_seen = {}  # bucket -> リザーバーへ提示した件数
+        self.retained = {}  # 正規化キー -> item（保持中サンプルの重複判定用）
+        self.seen_keys = OrderedDict()  # 既出の正規化キー（サンプルから外れた後も重複判定に使う）
+        self.seq = 0
+        self.stats = {
+            'total': 0,
+            'invalid_lines': 0,
+            'duplicates': 0,
+            'like_total': 0,
+            'like_max': 0,
+            'like_histogram': {label: 0 for _, label in LIKE_BUCKETS},
+            'time_histogram': {label: 0 for _, label in TIME_BUCKETS + [(None, UNKNOWN_BUCKET)]},
+            'reply_count': 0,
+        }
+
+    def iter_comments(self, comments_jsonl_path):
+        """JSONLを1行ずつ読み出す"""
+        with open(comments_jsonl_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    self.stats['invalid_lines'] += 1
+
+    def sample_file(self, comments_jsonl_path):
+        """ファイルからサンプルと集計値を作成"""
+        self._reset()
+        for comment in self.iter_comments(comments_jsonl_path):
+            self.add(comment)
+        return self.result()
+
+    def add(self, comment):
+        """コメントを1件取り込む"""
+        likes = parse_like_count(comment.get('likes', 0))
+        bucket = time_bucket_label(comment.get('published', ''))
+
+        # 集計（全件・正確）
+        stats = self.stats
+        stats['total'] += 1
+        stats['like_total'] += likes
+        stats['like_max'] = max(stats['like_max'], likes)
+        stats['time_histogram'][bucket] += 1
+        for lower, label in reversed(LIKE_BUCKETS):
+            if likes >= lower:
+                stats['like_histogram'][label] += 1
+                break
+        if comment.get('is_reply'):
+            stats['reply_count'] += 1
+
+        item = {
+            'author': comment.get('author', ''),
+            'text': comment.get('text', ''),
+            'likes': likes,
+            'published': comment.get('published', ''),
+            'bucket': bucket,
+            'key': normalize_for_dedup(comment.get('text', '')),
+            'similar': 0,
+        }
+
+        # ほぼ同一コメントは保持中の代表に集約
+        duplicate = self._mark_seen(item['key'])
+        existing = self.retained.get(item['key']) if item['key'] else None
+        if existing is not None:
+            stats['duplicates'] += 1
+            existing['similar'] += 1
+            if likes > existing['likes']:
+                existing['likes'] = likes
+            return
+        if duplicate:
+            stats['duplicates'] += 1
+
+        self.seq += 1
+        if self.top_liked > 0:
+            entry = (likes, self.seq, item)
+            if len(self.top_heap) < self.top_liked:
+                heapq.heappush(self.top_heap, entry)
+                self._retain(item)
+                return
+            if likes > self.top_heap[0][0]:
+                _, _, evicted = heapq.heapreplace(self.top_heap, entry)
+                self._retain(item)
+                self._release(evicted)
+                self._offer_to_reservoir(evicted)
+                return
+
+        # 代表がサンプルから外れた既出コメントはリザーバーへ再投入しない（同じ内容で埋まるのを防ぐ）
+        if not duplicate:
+            self._offer_to_reservoir(item)
+
+    def _mark_seen(self, key):
+        """正規化キーを記録し、既出ならTrueを返す（上限を超えたら古いキーから忘れる）"""
+        if not key:
+            return False
+        if key in self.seen_keys:
+            self.seen_keys.move_to_end(key)
+            return True
+        self.seen_keys[key] = None
+        if len(self.seen_keys) > self.dedup_keys:
+            self.seen_keys.popitem(last=False)
+        return False
+
+    def _retain(self, item):
+        if item['key']:
+            self.retained[item['key']] = item
+
+    def _release(self, item):
+        if item['key'] and self.retained.get(item['key']) is item:
+            del self.retained[item['key']]
+
+    def _offer_to_reservoir(self, item):
+        """時期バケット別のリザーバーサンプリング（Algorithm R）"""
+        bucket = item['bucket']
+        reservoir = self.reservoirs.setdefault(bucket, [])
+        seen = self.bucket_seen.get(bucket, 0) + 1
+        self.bucket_seen[bucket] = seen
+
+        if len(reservoir) < self.reservoir_size:
+            reservoir.append(item)
+            self._retain(item)
+            return
+
+        index = self.random.randrange(seen)
+        if index < self.reservoir_size:
+            self._release(reservoir[index])
+            reservoir[index] = item
+            self._retain(item)
+
+    def result(self):
+        """予算内に収めた代表コメントと集計値を返す"""
+        budget = self.max_chars
+        top = [entry[2] for entry in sorted(self.top_heap, key=lambda e: (-e[0], e[1]))]
+
+        selected_top = []
+        for item in top:
+            cost = self._cost(item)
+            if cost > budget:
+                break
+            selected_top.append(item)
+            budget -= cost
+
+        # ロングテールは時期バケットの実件数に比例して予算を配分
+        tail_counts = {b: n for b, n in self.bucket_seen.items() if self.reservoirs.get(b)}
+        tail_total = sum(tail_counts.values())
+        selected_tail = []
+        if tail_total and budget > 0:
+            for bucket, count in sorted(tail_counts.items(), key=lambda kv: -kv[1]):
+                quota = budget * count / tail_total
+                reservoir = sorted(self.reservoirs[bucket], key=lambda i: -i['likes'])
+                for item in reservoir:
+                    cost = self._cost(item)
+                    if cost > quota:
+                        continue
+                    selected_tail.append(item)
+                    quota -= cost
+
+        stats = dict(self.stats)
+        stats['like_mean'] = round(stats['like_total'] / stats['total'], 2) if stats['total'] else 0
+        stats['sampled'] = len(selected_top) + len(selected_tail)
+
+        logger.info(
+            f"コメントサンプリング: 全{stats['total']}件 → 上位{len(selected_top)}件 + "
+            f"層化サンプル{len(selected_tail)}件（重複集約 {stats['duplicates']}件）"
+        )
+        return {
+            'top_comments': [self._export(i) for i in selected_top],
+            'sampled_comments': [self._export(i) for i in selected_tail],
+            'stats': stats,
+        }
+
+    def _cost(self, item):
+        return min(len(item['text']), self.max_text_length) + len(item['author']) + _LINE_OVERHEAD
+
+    def _export(self, item):
+        text = item['text']
+        if len(text) > self.max_text_length:
+            text = text[:self.max_text_length] + "…"
+        return {
+            'author': item['author'],
+            'text': text,
+            'likes': item['likes'],
+            'published': item['published'],
+            'bucket': item['bucket'],
+            'similar': item['similar'],
+        }
+
+
+def format_comment_stats(stats):
+    """集計値をプロンプト用テキストに整形"""
+    lines = [
+        f"総コメント数: {stats['total']}件（うち返信 {stats['reply_count']}件）",
+        f"いいね: 合計 {stats['like_total']} / 平均 {stats['like_mean']} / 最大 {stats['like_max']}",
+        "いいね分布: " + ", ".join(f"{k}: {v}" for k, v in stats['like_histogram'].items()),
+        "投稿時期分布: " + ", ".join(f"{k}: {v}" for k, v in stats['time_histogram'].items() if v),
+        f"ほぼ同一のコメント: {stats['duplicates']}件（代表コメントに集約）",
+        f"プロンプト掲載: {stats['sampled']}件",
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,329 @@
+"""メディアダウンロードの一元管理（並列キュー・サイト別同時数制限・途中再開・チェックサム検証）"""
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+from lib.transcription_cache import audio_sha256, media_key_for_url
+from lib.ytdlp_client import YtDlpClient, QUALITY_MAX_HEIGHT
+from config.settings import (
+    DOWNLOAD_MAX_WORKERS, DOWNLOAD_PER_HOST_LIMIT, DOWNLOAD_CONCURRENT_FRAGMENTS,
+    DOWNLOAD_SOCKET_TIMEOUT, DOWNLOAD_RETRIES, DOWNLOAD_PARTIAL_DIR
+)
+
+logger = logging.getLogger(__name__)
+
+# section: (開始秒, 終了秒) 指定時はその区間だけを取得
+DownloadRequest = namedtuple("DownloadRequest", ["url", "output_dir", "basename", "kind", "quality", "section"],
+                             defaults=(None,))
+DownloadResult = namedtuple("DownloadResult", ["request", "path", "error"])
+
+# yt-dlp CLIでのフォールバック時に試すフォーマット（優先順）
+CLI_FORMATS = {
+    "video": {
+        "best": [
+            "best[height<=720]/best[height<=480]/best",  # 主要フォーマット
+            "best[ext=mp4]/mp4/best",                    # MP4優先
+            "bestvideo+bestaudio/best",                  # 分離ストリーム
+            "worst"                                       # 最後の手段
+        ],
+        "good": [
+            "best[height<=720]/best[height<=480]/best",
+            "best[ext=mp4]/mp4/best"
+        ],
+        "medium": [
+            "best[height<=480]/best",
+            "worst[ext=mp4]/worst"
+        ],
+    },
+    "audio": {
+        "best": ["bestaudio/best"],
+    },
+}
+
+# 同じサイトとして同時数を数えるホスト
+_HOST_ALIASES = {
+    "youtu.be": "youtube.com",
+    "youtube-nocookie.com": "youtube.com",
+    "x.com": "twitter.com",
+}
+
+# ダウンロード途中・作業用のファイル（.ref.json はメディア保存領域への参照記録）
+_INCOMPLETE_SUFFIXES = (".part", ".ytdl", ".temp", ".sha256", ".ref.json")
+
+
+def host_key(url):
+    """同時数制限の単位となるサイト名"""
+    host = (urlparse(url).hostname or "").lower()
+    for prefix in ("www.", "m.", "mobile.", "music."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    return _HOST_ALIASES.get(host, host)
+
+
+def partial_key(request):
+    """途中のダウンロードを置くフォルダ名（同じメディア・種類・画質・区間なら実行が変わっても同じ）"""
+    source = f"{media_key_for_url(request.url) or request.url}|{request.kind}|{request.quality}|{request.section}"
+    return hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+
+def checksum_path(path):
+    return path + ".sha256"
+
+
+def write_checksum(path):
+    """ダウンロード完了したファイルのSHA-256を横に保存（sha256sum互換の形式）"""
+    digest = audio_sha256(path)
+    with open(checksum_path(path), 'w', encoding='utf-8') as f:
+        f.write(f"{digest}  {os.path.basename(path)}\n")
+    return digest
+
+
+def verify_checksum(path):
+    """保存済みのSHA-256と一致するか（記録がなければ None）"""
+    try:
+        with open(checksum_path(path), 'r', encoding='utf-8') as f:
+            expected = f.read().split()[0]
+    except (OSError, IndexError):
+        return None
+    return audio_sha256(path) == expected
+
+
+class DownloadManager:
+    """ダウンロードをキューに積み、全体とサイトごとの同時数を守りながら並列に処理
+
+    1件ずつ待つ download() と、まとめて投入する submit() / download_all() がある。
+    同じサイトの順番待ちが空いたワーカーを塞がないよう、サイトの枠が空いたものだけを
+    ワーカーへ渡すため、YouTubeとTwitterのURLが混在していても回線を使い切れる。
+    """
+
+    def __init__(self, max_workers=DOWNLOAD_MAX_WORKERS, per_host_limit=DOWNLOAD_PER_HOST_LIMIT,
+                 concurrent_fragments=DOWNLOAD_CONCURRENT_FRAGMENTS,
+                 socket_timeout=DOWNLOAD_SOCKET_TIMEOUT, retries=DOWNLOAD_RETRIES,
+                 partial_dir=DOWNLOAD_PARTIAL_DIR):
+        self.partial_dir = partial_dir
+        self.per_host_limit = max(1, per_host_limit)
+        self.concurrent_fragments = max(1, concurrent_fragments)
+        self.socket_timeout = socket_timeout
+        self.retries = retries
+        self.executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="download")
+        self._lock = threading.Lock()
+        self._waiting = {}  # サイト → 順番待ちの (リクエスト, Future)
+        self._active = {}   # サイト → 実行中の件数
+        self._partial_locks = {}  # 途中のダウンロードのフォルダ → ロック（同じメディアの同時取得を防ぐ）
+        self._client = None
+
+    def client(self):
+        """プロセス内のyt-dlp（未インストール時は None でCLIを使用）"""
+        with self._lock:
+            if self._client is None:
+                try:
+                    self._client = YtDlpClient()
+                except ImportError:
+                    logger.info("yt_dlpモジュールが見つからないためCLIを使用します")
+                    self._client = False
+            return self._client or None
+
+    def submit(self, url, output_dir, basename, kind="video", quality="best", section=None):
+        """ダウンロードをキューに追加（結果は保存先パスを返す Future）"""
+        request = DownloadRequest(url, output_dir, basename, kind, quality, section)
+        future = Future()
+        with self._lock:
+            self._waiting.setdefault(host_key(url), deque()).append((request, future))
+        self._dispatch()
+        return future
+
+    def download(self, url, output_dir, basename, kind="video", quality="best", section=None):
+        """1件ダウンロードして保存先パスを返す（失敗時は例外）"""
+        return self.submit(url, output_dir, basename, kind, quality, section).result()
+
+    def download_all(self, requests):
+        """複数のダウンロードをまとめて投入し、完了したものから DownloadResult を返す
+
+        requests: DownloadRequest（または同じ並びのタプル）の一覧
+        """
+        futures = {self.submit(*request): DownloadRequest(*request) for request in requests}
+        for future in as_completed(futures):
+            try:
+                yield DownloadResult(futures[future], future.result(), None)
+            except Exception as e:
+                yield DownloadResult(futures[future], None, e)
+
+    def discard(self, path):
+        """不要になったダウンロードファイルをチェックサムの記録ごと削除"""
+        for target in (path, checksum_path(path)):
+            try:
+                os.remove(target)
+            except OSError:
+                pass
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+    def _dispatch(self):
+        """サイトの同時数に空きがあるものをワーカーへ渡す"""
+        with self._lock:
+            for host, waiting in list(self._waiting.items()):
+                while waiting and self._active.get(host, 0) < self.per_host_limit:
+                    request, future = waiting.popleft()
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    self._active[host] = self._active.get(host, 0) + 1
+                    self.executor.submit(self._run, host, request, future)
+                if not waiting:
+                    del self._waiting[host]
+
+    def _run(self, host, request, future):
+        try:
+            path = self._download(request)
+            if path:
+                future.set_result(path)
+            else:
+                future.set_exception(RuntimeError(f"ダウンロード失敗: {request.url}"))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._active[host] -= 1
+            self._dispatch()
+
+    def _download(self, request):
+        os.makedirs(request.output_dir, exist_ok=True)
+
+        existing = self._find_output(request)
+        if existing:
+            verified = verify_checksum(existing)
+            if verified:
+                logger.info(f"ダウンロード済み（チェックサム一致）: {existing}")
+                return existing
+            if verified is False:
+                logger.warning(f"チェックサム不一致のため再ダウンロード: {existing}")
+                self.discard(existing)
+
+        path = self._download_partial(request)
+        if not path:
+            return None
+
+        digest = write_checksum(path)
+        logger.info(f"ダウンロード完了: {path}（sha256: {digest[:12]}）")
+        return path
+
+    def _download_partial(self, request):
+        """実行をまたいで固定の場所へダウンロードし、完了したら出力先へ移動
+
+        出力先は実行ごとに変わるため、途中のファイル（.part）は DOWNLOAD_PARTIAL_DIR の
+        メディアごとのフォルダに置き、中断後の別の実行からも続きを取得できるようにする。
+        """
+        if not self.partial_dir:
+            return self._download_in_process(request) or self._download_with_cli(request)
+
+        staging_dir = os.path.join(self.partial_dir, partial_key(request))
+        with self._lock:
+            lock = self._partial_locks.setdefault(staging_dir, threading.Lock())
+        with lock:
+            staging = request._replace(output_dir=staging_dir, basename="media")
+            os.makedirs(staging_dir, exist_ok=True)
+            path = self._find_output(staging)
+            if path:
+                logger.info(f"前回完了したダウンロードを使用: {path}")
+            else:
+                if os.listdir(staging_dir):
+                    logger.info(f"途中のダウンロードから再開: {staging_dir}")
+                path = self._download_in_process(staging) or self._download_with_cli(staging)
+            if not path:
+                return None
+
+            output_path = os.path.join(request.output_dir, request.basename + os.path.splitext(path)[1])
+            shutil.move(path, output_path)
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            return output_path
+
+    def _download_in_process(self, request):
+        """取得済みのメディア情報を再利用してダウンロード（失敗時は None でCLIへ）"""
+        client = self.client()
+        if not client:
+            return None
+        try:
+            max_height = QUALITY_MAX_HEIGHT.get(request.quality, QUALITY_MAX_HEIGHT["best"])
+            path = client.download(
+                request.url, self._template(request), request.kind, max_height,
+                section=request.section,
+                continuedl=True,
+                concurrent_fragment_downloads=self.concurrent_fragments,
+                socket_timeout=self.socket_timeout,
+                retries=self.retries,
+                fragment_retries=self.retries,
+            )
+            if path:
+                return path
+            logger.warning("ダウンロード成功したがファイルが見つかりません")
+        except Exception as e:
+            logger.warning(f"プロセス内ダウンロード失敗（CLIで再試行）: {e}")
+        return None
+
+    def _download_with_cli(self, request):
+        formats = CLI_FORMATS.get(request.kind, CLI_FORMATS["video"])
+        format_options = formats.get(request.quality, formats["best"])
+
+        for i, format_option in enumerate(format_options):
+            logger.info(f"フォーマット試行 {i+1}/{len(format_options)}: {format_option}")
+
+            cmd = [
+                "yt-dlp",
+                "--format", format_option,
+                "--output", self._template(request),
+                "--no-playlist",
+                "--continue",
+                "--concurrent-fragments", str(self.concurrent_fragments),
+                "--socket-timeout", str(self.socket_timeout),
+                "--retries", str(self.retries),
+                "--fragment-retries", str(self.retries),
+            ]
+            if request.kind == "video":
+                cmd += ["--merge-output-format", "mp4"]
+            if request.section:
+                start, end = request.section
+                cmd += ["--download-sections", f"*{start or 0}-{end if end is not None else 'inf'}"]
+            cmd.append(request.url)
+
+            # 通信の停止は --socket-timeout で検出するため、全体の時間制限は設けない
+            result = subprocess.run(cmd, capture_output=True, text=True)
+
+            if result.returncode == 0:
+                path = self._find_output(request)
+                if path:
+                    return path
+                logger.warning(f"フォーマット{i+1}でダウンロード成功したがファイルが見つかりません")
+            else:
+                logger.warning(f"フォーマット{i+1}失敗: {result.stderr.strip()[:100]}...")
+
+        logger.error("全てのフォーマットでダウンロードに失敗しました")
+        return None
+
+    def _template(self, request):
+        return os.path.join(request.output_dir, f"{request.basename}.%(ext)s")
+
+    def _find_output(self, request):
+        """完了済みのダウンロードファイル（途中のファイルは除く）"""
+        if not os.path.isdir(request.output_dir):
+            return None
+        prefix = f"{request.basename}."
+        for file in sorted(os.listdir(request.output_dir)):
+            # 結合前の映像・音声（<名前>.f137.mp4 等）は拡張子の前にさらに区切りがある
+            if (file.startswith(prefix) and "." not in file[len(prefix):]
+                    and not file.endswith(_INCOMPLETE_SUFFIXES)):
+                return os.path.join(request.output_dir, file)
+        return None
+
+
+_manager = DownloadManager()
+
+
+def get_download_manager():
+    """プロセス共通のダウンロードマネージャー"""
+    return _manager
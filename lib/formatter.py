@@ -1,11 +1,15 @@
 """出力フォーマット処理"""
 import json
 import os
+import re
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
+# TXT出力の各ツイートの最終行
+_ENGAGEMENT_LINE = re.compile(r'^リプライ: (\d+) \| リポスト: (\d+) \| いいね: (\d+) \| 表示: (\d+)\s*$')
+
 class Formatter:
     def __init__(self, output_dir="output/query"):
         self.output_dir = output_dir
@@ -182,4 +186,63 @@ class Formatter:
         if format_type.lower() == "json":
             return self._save_analysis_json(tweets, analysis, query, filepath)
         else:
-            return self._save_analysis_txt(tweets, analysis, query, filepath)
\ No newline at end of file
+            return self._save_analysis_txt(tweets, analysis, query, filepath)
+
+    @staticmethod
+    def load_tweets(filepath):
+        """保存済みファイル（TXT/JSON）からツイート一覧を読み込む
+
+        TXTと同名のJSONがあればそちらを使う。TXTは「時刻:」「URL:」の見出しから
+        エンゲージメント行までを1件とするため、本文に空行を含むツイートも1件として読める。
+        """
+        try:
+            json_path = os.path.splitext(filepath)[0] + ".json"
+            if filepath.lower().endswith(".json") or os.path.exists(json_path):
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                return data.get("tweets", [])
+            
+            with open(filepath, 'r', encoding='utf-8') as f:
+                content = f.read()
+            
+            # ヘッダー（区切り線まで、分析結果付きは【取得データ】まで）を除去
+            if "【取得データ】\n" in content:
+                body = content.split("【取得データ】\n", 1)[1]
+            else:
+                parts = content.split("=" * 50 + "\n", 1)
+                body = parts[1] if len(parts) > 1 else content
+            lines = body.split("\n")
+            
+            # 見出しは先頭か、直前のツイートがエンゲージメント行で終わった後のみ（本文中の「時刻:」は無視）
+            starts = []
+            previous = ""
+            for i, line in enumerate(lines):
+                if (line.startswith("時刻:") and i + 1 < len(lines) and lines[i + 1].startswith("URL:")
+                        and (not starts or _ENGAGEMENT_LINE.match(previous))):
+                    starts.append(i)
+                if line.strip():
+                    previous = line
+            
+            tweets = []
+            for start, end in zip(starts, starts[1:] + [len(lines)]):
+                record = lines[start:end]
+                engagement = [i for i, line in enumerate(record) if _ENGAGEMENT_LINE.match(line)]
+                if len(record) < 4 or not engagement or engagement[-1] < 3:
+                    continue
+                
+                counts = _ENGAGEMENT_LINE.match(record[engagement[-1]]).groups()
+                tweet = {
+                    'datetime': record[0][len("時刻:"):].strip(),
+                    'url': record[1][len("URL:"):].strip(),
+                    'username': record[2].strip(),
+                    'text': "\n".join(record[3:engagement[-1]]).strip(),
+                }
+                for key, count in zip(('replies', 'reposts', 'likes', 'views'), counts):
+                    tweet[key] = int(count)
+                tweets.append(tweet)
+            
+            return tweets
+            
+        except Exception as e:
+            logger.error(f"ツイート読み込みエラー: {e}")
+            return []
@@ -0,0 +1,87 @@
+"""音声の言語判定（ファイル全体ではなく、全体に散らばる短い区間だけで判定）"""
+import logging
+import subprocess
+from collections import Counter, namedtuple
+import numpy as np
+from config.settings import (
+    AUDIO_SAMPLE_RATE, LANGUAGE_PROBE_WINDOWS, LANGUAGE_PROBE_SECONDS,
+    LANGUAGE_PROBE_MIN_PROBABILITY, LANGUAGE_PROBE_FALLBACK
+)
+
+logger = logging.getLogger(__name__)
+
+# source: probe（区間判定）/ stream（ストリーミングの最初の窓）/ cache / captions / specified（指定）/ fallback
+LanguageResult = namedtuple("LanguageResult", ["language", "probability", "source"])
+
+AUTO_LANGUAGES = (None, "", "auto")
+
+
+def is_auto(language):
+    """言語の自動判定が指定されているか"""
+    return language in AUTO_LANGUAGES
+
+
+def probe_offsets(duration, windows=LANGUAGE_PROBE_WINDOWS, seconds=LANGUAGE_PROBE_SECONDS):
+    """判定に使う区間の開始秒（冒頭のBGM等を避けるため全体を windows+1 等分した位置）"""
+    if not duration or duration <= seconds * windows:
+        return [0.0]
+    step = duration / (windows + 1)
+    return [round(step * (i + 1) - seconds / 2, 2) for i in range(windows)]
+
+
+def read_window(path, start, seconds=LANGUAGE_PROBE_SECONDS, sample_rate=AUDIO_SAMPLE_RATE):
+    """ffmpegで区間へシークして16kHzモノラルのfloat32配列を取得"""
+    cmd = [
+        "ffmpeg", "-loglevel", "error",
+        "-ss", f"{start:.3f}", "-t", f"{seconds:.3f}",
+        "-i", path,
+        "-vn", "-ac", "1", "-ar", str(sample_rate),
+        "-f", "s16le", "pipe:1"
+    ]
+    result = subprocess.run(cmd, capture_output=True, timeout=120)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode('utf-8', errors='replace').strip()[:200])
+    data = result.stdout[:len(result.stdout) - len(result.stdout) % 2]
+    return np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def detect_window(model, audio):
+    """1区間の (言語, 確率)。Whisperは推論前に言語を判定するため、セグメントは読み進めない"""
+    _, info = model.transcribe(audio, language=None, beam_size=1, vad_filter=False)
+    return info.language, float(info.language_probability or 0.0)
+
+
+def probe_language(model, path, duration=None, windows=LANGUAGE_PROBE_WINDOWS, seconds=LANGUAGE_PROBE_SECONDS,
+                   min_probability=LANGUAGE_PROBE_MIN_PROBABILITY, fallback=LANGUAGE_PROBE_FALLBACK):
+    """数か所の短い区間で言語を判定し、確率の合計が最も大きい言語を返す
+
+    確率は判定できた区間の平均。区間ごとに言語が割れた場合は確率が下がり、
+    min_probability 未満なら fallback の言語とする。
+    """
+    scores = Counter()
+    detected = 0
+    for start in probe_offsets(duration, windows, seconds):
+        try:
+            audio = read_window(path, start, seconds)
+            if len(audio) < AUDIO_SAMPLE_RATE:
+                continue
+            language, probability = detect_window(model, audio)
+        except Exception as e:
+            logger.warning(f"言語判定エラー（{start:.0f}秒〜）: {e}")
+            continue
+        logger.debug(f"言語判定 {start:.0f}秒〜: {language} ({probability:.2f})")
+        scores[language] += probability
+        detected += 1
+
+    if not scores:
+        logger.warning(f"言語を判定できません（{fallback}として処理）")
+        return LanguageResult(fallback, None, "fallback")
+
+    language, total = scores.most_common(1)[0]
+    probability = round(total / detected, 3)
+    if probability < min_probability:
+        logger.warning(f"言語判定の確度が低いため{fallback}として処理します（{language}: {probability:.2f}）")
+        return LanguageResult(fallback, probability, "fallback")
+
+    logger.info(f"言語判定: {language}（確率 {probability:.2f}、{detected}区間）")
+    return LanguageResult(language, probability, "probe")
@@ -0,0 +1,203 @@
+"""無音区間で分割した音声を複数プロセスで並列に文字おこし（CPU環境向け）"""
+import logging
+import multiprocessing
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from lib.utils import start_iterator
+from config.settings import (
+    AUDIO_SAMPLE_RATE, PARALLEL_CHUNK_SECONDS, PARALLEL_CPU_THREADS, PARALLEL_MAX_WORKERS
+)
+
+logger = logging.getLogger(__name__)
+
+# faster-whisperのSegmentと同じ属性名（start / end / text）で扱えるようにする
+TranscribedSegment = namedtuple("TranscribedSegment", ["start", "end", "text"])
+
+# 境界をまたいだ重複とみなす時間幅（秒）
+_DEDUP_TOLERANCE = 2.0
+_DEDUP_HISTORY = 3
+_NORMALIZE_PATTERN = re.compile(r'[\s\W_]+')
+
+# ワーカープロセス内で1度だけ読み込むモデル
+_worker_model = None
+
+
+def _init_worker(model_size, cpu_threads):
+    """ワーカー初期化: int8モデルを1つ読み込む"""
+    global _worker_model
+    from faster_whisper import WhisperModel
+    _worker_model = WhisperModel(
+        model_size, device="cpu", compute_type="int8", cpu_threads=cpu_threads, num_workers=1
+    )
+
+
+def _transcribe_chunk(index, audio, offset, language, options):
+    """1チャンクを文字おこしし、元音声上の時刻に補正して返す"""
+    segments, _ = _worker_model.transcribe(audio, language=language, **options)
+    return index, [
+        (float(segment.start) + offset, float(segment.end) + offset, segment.text.strip())
+        for segment in segments
+    ]
+
+
+def _normalize(text):
+    return _NORMALIZE_PATTERN.sub('', text.lower())
+
+
+class SegmentStitcher:
+    """分割処理した結果を連結する際、境界での重複を除去し時刻の重なりを補正
+
+    重複の除去は、新しいチャンク（窓）の先頭付近のセグメントを直前のチャンクの末尾と比べる場合に限る。
+    チャンク内で同じ言葉を繰り返すのは実際の発話なので残す。
+    """
+
+    def __init__(self):
+        self.last_end = 0.0
+        self.chunk = None
+        self.recent = []    # 現在のチャンクの末尾のセグメント（正規化済み）
+        self.boundary = []  # 直前のチャンクの末尾（新しいチャンクの先頭でのみ照合）
+        self.boundary_end = 0.0
+
+    def add(self, start, end, text, chunk=0):
+        """連結後のセグメント（重複・空なら None）
+
+        Args:
+            chunk: セグメントが属するチャンクの番号（または開始位置）。変わった所を境界とみなす
+        """
+        if chunk != self.chunk:
+            if self.recent:
+                self.boundary = self.recent
+                self.boundary_end = self.last_end
+            self.chunk = chunk
+            self.recent = []
+        if not text:
+            return None
+        normalized = _normalize(text)
+        if self.boundary:
+            if start < self.boundary_end + _DEDUP_TOLERANCE and normalized in self.boundary:
+                # 前のチャンクの末尾を順番どおりに繰り返している間だけ重複とみなす
+                self.boundary = self.boundary[self.boundary.index(normalized) + 1:]
+                return None
+            # 重複でないセグメントが出たら先頭部分は終わり
+            self.boundary = []
+        if end <= self.last_end:
+            return None
+        segment = TranscribedSegment(round(max(start, self.last_end), 2), round(end, 2), text)
+        self.last_end = segment.end
+        self.recent = (self.recent + [normalized])[-_DEDUP_HISTORY:]
+        return segment
+
+
+class ParallelTranscriber:
+    """VAD（無音検出）の区切りで音声をチャンク化し、プロセスプールで並列に文字おこし"""
+
+    def __init__(self, model_size="base", workers=PARALLEL_MAX_WORKERS,
+                 cpu_threads=PARALLEL_CPU_THREADS, chunk_seconds=PARALLEL_CHUNK_SECONDS,
+                 sample_rate=AUDIO_SAMPLE_RATE):
+        self.model_size = model_size
+        self.cpu_threads = max(1, cpu_threads)
+        self.workers = workers or max(1, (os.cpu_count() or 1) // self.cpu_threads)
+        self.chunk_seconds = chunk_seconds
+        self.sample_rate = sample_rate
+
+    def transcribe(self, audio_path, language="ja", **options):
+        """文字おこしを開始し、セグメントを時刻順に返すイテレータを返す
+
+        音声のデコード・チャンク分割に加え、プロセスプールの起動とモデルの読み込み、
+        最初のセグメントの取得までをこの呼び出し中に行う。ワーカーの初期化等に失敗した場合は
+        ここで例外になるため、呼び出し側は通常処理に切り替えられる。
+        """
+        from faster_whisper.audio import decode_audio
+
+        audio = decode_audio(audio_path, sampling_rate=self.sample_rate)
+        speech = self._speech_regions(audio)
+        chunks = self.plan_chunks(len(audio), speech)
+        workers = min(self.workers, len(chunks)) or 1
+
+        logger.info(
+            f"並列文字おこし: {len(audio) / self.sample_rate:.0f}秒 → {len(chunks)}チャンク "
+            f"/ {workers}プロセス × {self.cpu_threads}スレッド"
+        )
+        return start_iterator(self._run(audio, chunks, workers, language, options))
+
+    def plan_chunks(self, total_samples, speech):
+        """発話区間の間（無音）の中点で、目安長に近い位置を区切りに選ぶ
+
+        Args:
+            total_samples: 音声の総サンプル数
+            speech: 発話区間 [(開始, 終了), ...]（サンプル単位・時刻順）
+
+        Returns:
+            発話を含むチャンク [(開始, 終了), ...]
+        """
+        target = int(self.chunk_seconds * self.sample_rate)
+        gaps = [(speech[i][1] + speech[i + 1][0]) // 2 for i in range(len(speech) - 1)]
+
+        bounds = [0]
+        gap_index = 0
+        while total_samples - bounds[-1] > target * 1.5:
+            ideal = bounds[-1] + target
+            best = None
+            # 目安長の半分〜1.5倍の範囲で、目安に最も近い無音区間を探す
+            while gap_index < len(gaps) and gaps[gap_index] <= bounds[-1] + target * 1.5:
+                point = gaps[gap_index]
+                if point >= bounds[-1] + target * 0.5:
+                    if best is None or abs(point - ideal) < abs(best - ideal):
+                        best = point
+                gap_index += 1
+            # 適切な無音がなければ目安位置で強制分割
+            bounds.append(best if best is not None else ideal)
+        bounds.append(total_samples)
+
+        chunks = []
+        for start, end in zip(bounds, bounds[1:]):
+            # 発話を含まないチャンクは処理しない
+            if not speech or any(s < end and e > start for s, e in speech):
+                chunks.append((start, end))
+        return chunks
+
+    def _speech_regions(self, audio):
+        """faster-whisper内蔵のSilero VADで発話区間を検出"""
+        from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+        timestamps = get_speech_timestamps(audio, vad_options=VadOptions(min_silence_duration_ms=500))
+        return [(int(ts['start']), int(ts['end'])) for ts in timestamps]
+
+    def _run(self, audio, chunks, workers, language, options):
+        """チャンクを並列処理し、完了したものから順番どおりに連結して返す"""
+        # CTranslate2のスレッドを持つプロセスのforkは危険なためspawnを使う
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.model_size, self.cpu_threads)
+        ) as executor:
+            pending = {
+                executor.submit(
+                    _transcribe_chunk, index, audio[start:end], start / self.sample_rate, language, options
+                )
+                for index, (start, end) in enumerate(chunks)
+            }
+
+            finished = {}
+            next_index = 0
+            stitcher = SegmentStitcher()
+            try:
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        index, segments = future.result()
+                        finished[index] = segments
+
+                    while next_index in finished:
+                        for start, end, text in finished.pop(next_index):
+                            segment = stitcher.add(start, end, text, chunk=next_index)
+                            if segment is not None:
+                                yield segment
+                        next_index += 1
+            finally:
+                for future in pending:
+                    future.cancel()
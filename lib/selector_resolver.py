@@ -0,0 +1,114 @@
+"""UI要素セレクタの解決キャッシュ（前回成功したセレクタを優先）"""
+import json
+import logging
+import os
+import threading
+from selenium.webdriver.common.by import By
+from config.settings import SELECTOR_CACHE_PATH
+
+logger = logging.getLogger(__name__)
+
+_cache_lock = threading.Lock()
+_cache_data = None  # プロセス内で共有する {site: {element_name: selector}}
+
+
+def _load_cache(cache_path):
+    global _cache_data
+    if _cache_data is None:
+        _cache_data = {}
+        if os.path.exists(cache_path):
+            try:
+                with open(cache_path, 'r', encoding='utf-8') as f:
+                    _cache_data = json.load(f)
+            except Exception as e:
+                logger.warning(f"セレクタキャッシュ読み込みエラー（初期化します）: {e}")
+    return _cache_data
+
+
+def first_displayed(elements):
+    """表示中の最初の要素を選ぶ（デフォルトの判定）"""
+    for element in elements:
+        if element.is_displayed():
+            return element
+    return None
+
+
+class SelectorResolver:
+    """サイト・UI要素ごとに最後に成功したセレクタを記憶し、次回はそれを最初に試す
+
+    キャッシュが外れた場合のみ候補リスト全体を走査し、セレクタの変化をログに記録する。
+    別の要素にも一致しうる広いセレクタ（fallbacks）は記憶せず、候補で見つからない場合に毎回最後に試す。
+    """
+
+    def __init__(self, driver, site, cache_path=SELECTOR_CACHE_PATH):
+        self.driver = driver
+        self.site = site
+        self.cache_path = cache_path
+
+    def find(self, element_name, selectors, pick=first_displayed, fallbacks=()):
+        """要素を解決して返す（見つからなければ None）
+
+        fallbacks: 候補で見つからない場合に試す広いセレクタ（別の要素に一致しうるため記憶しない）
+        """
+        with _cache_lock:
+            cached = _load_cache(self.cache_path).get(self.site, {}).get(element_name)
+        if cached and cached not in selectors:
+            cached = None  # 候補から外れたセレクタ（以前の広いセレクタ等）は使わない
+
+        if cached:
+            element = self._try(cached, pick)
+            if element is not None:
+                logger.debug(f"セレクタキャッシュヒット: {self.site}/{element_name} = {cached}")
+                return element
+            logger.warning(f"セレクタ変化の可能性: {self.site}/{element_name} の '{cached}' が一致しません")
+
+        for selector in selectors:
+            if selector == cached:
+                continue
+            element = self._try(selector, pick)
+            if element is not None:
+                if cached:
+                    logger.warning(f"セレクタ変化を検出: {self.site}/{element_name} '{cached}' → '{selector}'")
+                else:
+                    logger.info(f"セレクタ解決: {self.site}/{element_name} = {selector}")
+                self._remember(element_name, selector)
+                return element
+
+        for selector in fallbacks:
+            element = self._try(selector, pick)
+            if element is not None:
+                logger.info(f"広いセレクタで解決（記憶しません）: {self.site}/{element_name} = {selector}")
+                return element
+
+        return None
+
+    def forget(self, element_name):
+        """キャッシュ済みセレクタを破棄"""
+        with _cache_lock:
+            cache = _load_cache(self.cache_path)
+            if cache.get(self.site, {}).pop(element_name, None) is not None:
+                self._save(cache)
+
+    def _try(self, selector, pick):
+        try:
+            elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
+            return pick(elements) if elements else None
+        except Exception as e:
+            logger.debug(f"セレクタ '{selector}' でエラー: {e}")
+            return None
+
+    def _remember(self, element_name, selector):
+        with _cache_lock:
+            cache = _load_cache(self.cache_path)
+            cache.setdefault(self.site, {})[element_name] = selector
+            self._save(cache)
+
+    def _save(self, cache):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            tmp_path = self.cache_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.warning(f"セレクタキャッシュ保存エラー: {e}")
@@ -0,0 +1,119 @@
+"""依存関係のある処理段階の並行実行（依存先がそろい次第開始し、時間制限を超えた段階は打ち切り扱い）"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StageTimeout(Exception):
+    pass
+
+
+class Stage:
+    def __init__(self, name, func, depends_on, timeout):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.timeout = timeout
+        self.status = "pending"  # pending / running / done / failed / timeout
+        self.result = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+
+class StageRunner:
+    """段階ごとにスレッドを起動し、依存先の終了（成功・失敗・打ち切り）を待ってから実行
+
+    func は依存先の結果を depends_on の順に引数として受け取る（失敗・打ち切りの依存先は None）。
+    時間制限を超えた段階は待たずに打ち切り扱いとして依存する段階へ進む。スレッド自体は
+    止められないため、打ち切り後に終わった結果は捨てる。全体の所要時間は各段階の合計ではなく、
+    最も長い依存の連なりで決まる。
+    """
+
+    def __init__(self, name="stages"):
+        self.name = name
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._started_at = None
+
+    def add(self, name, func, depends_on=(), timeout=None):
+        """段階を追加（依存先は追加済みの段階のみ指定でき、循環しない）"""
+        unknown = [dep for dep in depends_on if dep not in self._stages]
+        if unknown:
+            raise ValueError(f"未定義の依存先: {', '.join(unknown)}")
+        self._stages[name] = Stage(name, func, depends_on, timeout)
+        return self
+
+    def start(self):
+        """全段階のスレッドを起動（各段階は依存先の終了まで待機）"""
+        self._started_at = time.monotonic()
+        for stage in self._stages.values():
+            threading.Thread(target=self._run_stage, args=(stage,), name=f"{self.name}-{stage.name}",
+                             daemon=True).start()
+        return self
+
+    def wait(self, name):
+        """段階の終了を待って結果を返す（失敗・打ち切りなら None）"""
+        stage = self._stages[name]
+        stage.done.wait()
+        return stage.result if stage.status == "done" else None
+
+    def status(self, name):
+        return self._stages[name].status
+
+    def join(self):
+        """全段階の終了を待ち、段階ごとの所要時間をログに出して結果を返す"""
+        for stage in self._stages.values():
+            stage.done.wait()
+        total = time.monotonic() - self._started_at
+        summary = ", ".join(
+            f"{stage.name}: {stage.status} {stage.finished_at - stage.started_at:.1f}秒"
+            if stage.started_at is not None else f"{stage.name}: {stage.status}"
+            for stage in self._stages.values()
+        )
+        logger.info(f"段階別処理時間（全体 {total:.1f}秒）: {summary}")
+        return {name: (stage.result if stage.status == "done" else None) for name, stage in self._stages.items()}
+
+    def run(self):
+        return self.start().join()
+
+    def _run_stage(self, stage):
+        dependencies = [self._stages[name] for name in stage.depends_on]
+        for dependency in dependencies:
+            dependency.done.wait()
+        args = [dependency.result if dependency.status == "done" else None for dependency in dependencies]
+
+        with self._lock:
+            stage.status = "running"
+            stage.started_at = time.monotonic() - self._started_at
+
+        timer = None
+        if stage.timeout:
+            timer = threading.Timer(stage.timeout, self._finish, args=(stage, "timeout"),
+                                    kwargs={'error': StageTimeout(f"{stage.timeout}秒を超えました")})
+            timer.daemon = True
+            timer.start()
+        try:
+            self._finish(stage, "done", result=stage.func(*args))
+        except Exception as e:
+            self._finish(stage, "failed", error=e)
+        finally:
+            if timer:
+                timer.cancel()
+
+    def _finish(self, stage, status, result=None, error=None):
+        with self._lock:
+            if stage.done.is_set():
+                return  # 打ち切り後に終わった結果は捨てる
+            stage.status = status
+            stage.result = result
+            stage.error = error
+            stage.finished_at = time.monotonic() - self._started_at
+            stage.done.set()
+        if status == "failed":
+            logger.error(f"段階 {stage.name} でエラー: {error}")
+        elif status == "timeout":
+            logger.warning(f"段階 {stage.name} を打ち切りました（{error}）")
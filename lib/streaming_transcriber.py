@@ -0,0 +1,188 @@
+"""ダウンロードと文字おこしを並行させるストリーミング処理（yt-dlp → ffmpeg → Whisper）"""
+import logging
+import queue
+import subprocess
+import tempfile
+import threading
+import numpy as np
+from lib.parallel_transcriber import SegmentStitcher
+from config.settings import (
+    AUDIO_SAMPLE_RATE, STREAM_WINDOW_SECONDS, STREAM_SPLIT_SEARCH_SECONDS, STREAM_BUFFER_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+_READ_SIZE = 64 * 1024
+_FRAME_SECONDS = 0.02  # 区切り位置探索の音量計算単位
+_MIN_TAIL_SECONDS = 0.5  # これより短い末尾は文字おこししない
+
+
+class StreamingTranscriber:
+    """yt-dlpの出力をffmpegで16kHzモノラルPCMに変換しながら、窓ごとに文字おこし
+
+    窓の区切りは末尾付近で最も音量の小さい位置を選び、発話の途中で切れにくくする。
+    ffmpegの出力は別スレッドで読み続けるため、文字おこし中もダウンロードは止まらない。
+    ただし文字おこしが追いつかず buffer_seconds 分の音声がたまった場合は、読み込みを待たせて
+    メモリ使用量を抑える（ffmpeg・yt-dlpはパイプが空くまで停止する）。
+    """
+
+    def __init__(self, model, window_seconds=STREAM_WINDOW_SECONDS,
+                 search_seconds=STREAM_SPLIT_SEARCH_SECONDS, sample_rate=AUDIO_SAMPLE_RATE,
+                 buffer_seconds=STREAM_BUFFER_SECONDS):
+        self.model = model
+        self.sample_rate = sample_rate
+        self.window = int(window_seconds * sample_rate)
+        self.search = int(min(search_seconds, window_seconds / 2) * sample_rate)
+        # 1回の読み込みは最大 _READ_SIZE バイト（int16）なので、件数の上限で保持する音声の長さを抑える
+        self.queue_size = max(1, int(buffer_seconds * sample_rate * 2 / _READ_SIZE))
+        self.samples_received = 0
+        self.language = None
+        self.language_probability = None
+
+    def transcribe_url(self, media_url, language="ja", audio_path=None, **options):
+        """セグメントを時刻順に返すジェネレータ（audio_path指定時は音声も保存）
+
+        language が None / "auto" の場合は最初の窓で判定し、以降の窓はその言語で処理する。
+        """
+        self.language = None if language in (None, "", "auto") else language
+        ytdlp_log = tempfile.TemporaryFile()
+        ffmpeg_log = tempfile.TemporaryFile()
+        ytdlp, ffmpeg = self._start_pipeline(media_url, audio_path, ytdlp_log, ffmpeg_log)
+
+        chunks = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        reader = threading.Thread(target=self._drain, args=(ffmpeg.stdout, chunks, stop), daemon=True)
+        reader.start()
+
+        stitcher = SegmentStitcher()
+        pending = []
+        pending_samples = 0
+        offset = 0
+        try:
+            while True:
+                pcm = chunks.get()
+                if pcm is None:
+                    break
+                pending.append(pcm)
+                pending_samples += len(pcm)
+                if pending_samples < self.window:
+                    continue
+
+                buffer = np.concatenate(pending)
+                while len(buffer) >= self.window:
+                    cut = self._split_point(buffer)
+                    yield from self._transcribe_window(buffer[:cut], offset, stitcher, options)
+                    buffer = buffer[cut:]
+                    offset += cut
+                pending = [buffer]
+                pending_samples = len(buffer)
+
+            if pending_samples >= self.sample_rate * _MIN_TAIL_SECONDS:
+                yield from self._transcribe_window(
+                    np.concatenate(pending), offset, stitcher, options
+                )
+
+            ytdlp.wait()
+            ffmpeg.wait()
+            if ytdlp.returncode != 0 or ffmpeg.returncode != 0:
+                message = self._read_log(ytdlp_log) or self._read_log(ffmpeg_log)
+                raise RuntimeError(f"ストリーミング取得エラー: {message[:200]}")
+
+            logger.info(f"ストリーミング文字おこし完了: {self.samples_received / self.sample_rate:.0f}秒")
+        finally:
+            stop.set()
+            for process in (ytdlp, ffmpeg):
+                if process.poll() is None:
+                    process.kill()
+            ytdlp_log.close()
+            ffmpeg_log.close()
+
+    def _start_pipeline(self, media_url, audio_path, ytdlp_log, ffmpeg_log):
+        ytdlp = subprocess.Popen(
+            [
+                "yt-dlp",
+                "--format", "bestaudio/best",
+                "--no-playlist",
+                "--quiet", "--no-warnings",
+                "--output", "-",
+                media_url
+            ],
+            stdout=subprocess.PIPE, stderr=ytdlp_log
+        )
+
+        cmd = [
+            "ffmpeg", "-loglevel", "error",
+            "-i", "pipe:0",
+            "-vn", "-ac", "1", "-ar", str(self.sample_rate),
+            "-f", "s16le", "pipe:1"
+        ]
+        if audio_path:
+            # 同じ入力から保存用の音声ファイルも同時に書き出す
+            cmd += ["-y", "-vn", "-ac", "1", "-ar", str(self.sample_rate), audio_path]
+        ffmpeg = subprocess.Popen(cmd, stdin=ytdlp.stdout, stdout=subprocess.PIPE, stderr=ffmpeg_log)
+
+        # yt-dlpの出力はffmpegだけが読む（ffmpeg終了時にyt-dlpへSIGPIPEが届くように）
+        ytdlp.stdout.close()
+        return ytdlp, ffmpeg
+
+    def _drain(self, stream, chunks, stop):
+        """ffmpegのPCM出力を読み続けてfloat32配列としてキューへ（終端は None）
+
+        キューが満杯の間は読み込みを止める。文字おこし側が終了（stop）したら破棄して抜ける。
+        """
+        leftover = b''
+        try:
+            while not stop.is_set():
+                data = stream.read(_READ_SIZE)
+                if not data:
+                    break
+                data = leftover + data
+                usable = len(data) - len(data) % 2
+                leftover = data[usable:]
+                pcm = np.frombuffer(data[:usable], dtype=np.int16).astype(np.float32) / 32768.0
+                self.samples_received += len(pcm)
+                self._put(chunks, pcm, stop)
+        except Exception as e:
+            logger.warning(f"PCM読み込みエラー: {e}")
+        finally:
+            self._put(chunks, None, stop)
+
+    def _put(self, chunks, item, stop):
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _split_point(self, buffer):
+        """窓の末尾付近で最も静かなフレームの中央を区切りにする"""
+        frame = max(1, int(self.sample_rate * _FRAME_SECONDS))
+        start = self.window - self.search
+        region = buffer[start:self.window]
+        count = len(region) // frame
+        if count == 0:
+            return self.window
+        energy = np.square(region[:count * frame].reshape(count, frame)).mean(axis=1)
+        return start + int(np.argmin(energy)) * frame + frame // 2
+
+    def _transcribe_window(self, audio, offset, stitcher, options):
+        offset_seconds = offset / self.sample_rate
+        segments, info = self.model.transcribe(audio, language=self.language, **options)
+        if self.language is None:
+            self.language = info.language
+            self.language_probability = round(float(info.language_probability or 0.0), 3)
+            logger.info(f"言語判定（最初の窓）: {self.language}（確率 {self.language_probability:.2f}）")
+        for segment in segments:
+            stitched = stitcher.add(
+                float(segment.start) + offset_seconds,
+                float(segment.end) + offset_seconds,
+                segment.text.strip(),
+                chunk=offset  # 窓のつなぎ目でのみ重複を除去
+            )
+            if stitched is not None:
+                yield stitched
+
+    def _read_log(self, log_file):
+        log_file.seek(0)
+        return log_file.read().decode('utf-8', errors='replace').strip()
@@ -0,0 +1,88 @@
+"""文字おこし対象の時間範囲（開始・終了の指定、等間隔の抜粋区間）"""
+import re
+from lib.transcript_writer import format_clock_timestamp
+from config.settings import SKIM_WINDOW_COUNT, SKIM_WINDOW_SECONDS
+
+_TIMECODE_PATTERN = re.compile(r'^(?:(\d+):)?(?:(\d+):)?(\d+(?:\.\d+)?)$')
+
+
+def parse_timecode(text):
+    """"90" / "1:30" / "01:02:03" / "75.5" を秒に変換（空なら None）"""
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return float(text)
+    text = str(text).strip()
+    if not text:
+        return None
+    match = _TIMECODE_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"時刻の形式が正しくありません: {text}（例: 90, 1:30, 01:02:03）")
+    parts = [float(part) for part in match.groups() if part is not None]
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + part
+    return seconds
+
+
+def is_partial(start=None, end=None, skim=False):
+    """全体ではなく一部だけを文字おこしする指定か"""
+    return start is not None or end is not None or bool(skim)
+
+
+def download_section(start=None, end=None):
+    """ダウンロードする区間（範囲指定がなければ None で全体、スキムの抜粋区間はこの中からシーク）"""
+    if start is None and end is None:
+        return None
+    return (start, end)
+
+
+def plan_windows(duration, start=None, end=None, skim=False,
+                 count=SKIM_WINDOW_COUNT, window_seconds=SKIM_WINDOW_SECONDS):
+    """文字おこしする区間 [(開始秒, 終了秒), ...]（全体を処理する場合は None）
+
+    duration が不明な場合、終了は None（末尾まで）となり、スキムは範囲全体の処理になる。
+    スキムは範囲を count 等分し、各区間の中央から window_seconds ずつ取り出す。
+    """
+    if not is_partial(start, end, skim):
+        return None
+
+    range_start = max(0.0, start or 0.0)
+    range_end = end
+    if duration:
+        range_end = min(end, duration) if end is not None else duration
+    if range_end is not None and range_end <= range_start:
+        raise ValueError(f"終了時刻は開始時刻より後を指定してください（{range_start:.0f}秒 - {range_end:.0f}秒）")
+
+    if not skim or range_end is None:
+        return [(range_start, range_end)]
+
+    span = range_end - range_start
+    if span <= count * window_seconds:
+        return [(range_start, range_end)]
+
+    step = span / count
+    windows = []
+    for i in range(count):
+        window_start = range_start + step * i + (step - window_seconds) / 2
+        windows.append((round(window_start, 2), round(window_start + window_seconds, 2)))
+    return windows
+
+
+def select_segments(segments, windows):
+    """区間と重なるセグメントだけを残す（windows が None なら全件）"""
+    if not windows:
+        return segments
+    return [
+        segment for segment in segments
+        if any(segment['end'] > window_start and (window_end is None or segment['start'] < window_end)
+               for window_start, window_end in windows)
+    ]
+
+
+def describe_windows(windows):
+    """ログ・保存用の区間表記"""
+    return ", ".join(
+        f"{format_clock_timestamp(s)}-{format_clock_timestamp(e) if e is not None else '末尾'}"
+        for s, e in windows
+    )
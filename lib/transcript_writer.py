@@ -0,0 +1,240 @@
+"""文字おこしセグメントを逐次書き出すライター（TXT / JSON / VTT / SRT）"""
+import itertools
+import json
+import logging
+import os
+import shutil
+from collections.abc import Sequence
+
+logger = logging.getLogger(__name__)
+
+
+def format_clock_timestamp(seconds):
+    """mm:ss（1時間以上は hh:mm:ss）形式のタイムスタンプに変換"""
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+
+    if hours > 0:
+        return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+    else:
+        return f"{minutes:02d}:{secs:02d}"
+
+
+def format_vtt_timestamp(seconds):
+    """VTT形式のタイムスタンプに変換"""
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = seconds % 60
+    return f"{hours:02d}:{minutes:02d}:{secs:06.3f}"
+
+
+def format_srt_timestamp(seconds):
+    """SRT形式のタイムスタンプに変換"""
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+    millisecs = int((seconds % 1) * 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millisecs:03d}"
+
+
+def format_txt_segment(index, segment, use_timestamps=True):
+    """transcription.txt のセグメント一覧1件分の行"""
+    if not use_timestamps:
+        return f"{index:3d}. {segment['text']}\n"
+
+    line = (f"[{format_clock_timestamp(segment['start'])} - {format_clock_timestamp(segment['end'])}] "
+            f"{segment['text']}\n")
+    # 単語レベルタイムスタンプ（利用可能な場合）
+    if segment.get('words'):
+        line += "  単語別タイムスタンプ:\n"
+        for word_data in segment['words']:
+            word_start = format_clock_timestamp(word_data['start'])
+            word_end = format_clock_timestamp(word_data['end'])
+            line += f"    [{word_start}-{word_end}] {word_data['word']} (信頼度: {word_data['probability']})\n"
+        line += "\n"
+    return line
+
+
+class VttWriter:
+    """VTT字幕を1セグメントずつ追記"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'w', encoding='utf-8')
+        self.file.write("WEBVTT\n\n")
+        self.file.flush()
+
+    def write(self, segment):
+        self.file.write(
+            f"{format_vtt_timestamp(segment['start'])} --> {format_vtt_timestamp(segment['end'])}\n"
+            f"{segment['text']}\n\n"
+        )
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class SrtWriter:
+    """SRT字幕を1セグメントずつ追記"""
+
+    def __init__(self, path):
+        self.path = path
+        self.index = 0
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def write(self, segment):
+        self.index += 1
+        self.file.write(
+            f"{self.index}\n"
+            f"{format_srt_timestamp(segment['start'])} --> {format_srt_timestamp(segment['end'])}\n"
+            f"{segment['text']}\n\n"
+        )
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class TxtSegmentWriter:
+    """transcription.txt のセグメント一覧部分を追記（最終的なTXTへはコピーで結合）"""
+
+    def __init__(self, path, use_timestamps=True):
+        self.path = path
+        self.use_timestamps = use_timestamps
+        self.index = 0
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def write(self, segment):
+        self.index += 1
+        self.file.write(format_txt_segment(self.index, segment, self.use_timestamps))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class JsonSegmentWriter:
+    """セグメントのJSON配列を追記（閉じ括弧はclose時。異常終了時も途中までは読める）"""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self.file = open(path, 'w', encoding='utf-8')
+        self.file.write("[")
+        self.file.flush()
+
+    def write(self, segment):
+        separator = ",\n" if self.count else "\n"
+        self.file.write(separator + "    " + json.dumps(segment, ensure_ascii=False))
+        self.file.flush()
+        self.count += 1
+
+    def close(self):
+        self.file.write("\n  ]" if self.count else "]")
+        self.file.close()
+
+
+class WrittenSegments(Sequence):
+    """書き出し済みのセグメント配列をファイルから順に読む（全件をメモリに載せない）
+
+    JsonSegmentWriter は1行に1セグメントを書くため、配列の開始位置から行ごとに読めばよい。
+    最終JSONへ結合した後はそちらを読む（TranscriptWriter.segments_path / segments_offset）。
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+
+    def __len__(self):
+        return self.writer.json.count
+
+    def __iter__(self):
+        with open(self.writer.segments_path, 'r', encoding='utf-8') as f:
+            f.seek(self.writer.segments_offset)
+            for line in f:
+                line = line.strip()
+                if line.startswith("{"):
+                    yield json.loads(line.rstrip(","))
+                elif line.endswith("]"):
+                    return
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(itertools.islice(self, *index.indices(len(self))))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return next(itertools.islice(self, index, None))
+
+
+class TranscriptWriter:
+    """文字おこし中の各セグメントを全形式へ同時に逐次書き出す
+
+    字幕（subtitles.vtt / subtitles.srt）はそのまま完成形になる。
+    TXT・JSONはセグメント部分のみ一時ファイルに書き、保存時に
+    ヘッダー（URL・文字数・翻訳など）と結合して transcription.txt / transcription.json を作る。
+    """
+
+    def __init__(self, output_dir, use_timestamps=True):
+        self.output_dir = output_dir
+        self.use_timestamps = use_timestamps
+        self.txt = TxtSegmentWriter(os.path.join(output_dir, "transcription.segments.txt"), use_timestamps)
+        self.json = JsonSegmentWriter(os.path.join(output_dir, "transcription.segments.json"))
+        self.writers = [self.txt, self.json]
+        # セグメント配列を読む位置（最終JSONへ結合した後はそちら）
+        self.segments_path = self.json.path
+        self.segments_offset = 0
+        if use_timestamps:
+            self.writers += [
+                VttWriter(os.path.join(output_dir, "subtitles.vtt")),
+                SrtWriter(os.path.join(output_dir, "subtitles.srt")),
+            ]
+        self.closed = False
+
+    def write(self, segment):
+        for writer in self.writers:
+            writer.write(segment)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for writer in self.writers:
+            try:
+                writer.close()
+            except Exception as e:
+                logger.warning(f"文字おこしファイルクローズエラー: {e}")
+
+    def segments(self):
+        """書き出したセグメントをファイルから読む Sequence"""
+        return WrittenSegments(self)
+
+    def copy_txt_segments(self, dest):
+        """書き出し済みのセグメント一覧をTXTファイルへコピー（全件をメモリに載せない）"""
+        with open(self.txt.path, 'r', encoding='utf-8') as src:
+            shutil.copyfileobj(src, dest)
+
+    def finalize_json(self, json_path, header):
+        """ヘッダー項目の後に書き出し済みセグメント配列を結合して最終JSONを作成"""
+        head = json.dumps(header, ensure_ascii=False, indent=2)
+        tmp_path = json_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as dest:
+            dest.write(head[:-2] + ",\n" if header else "{\n")
+            dest.write('  "segments": ')
+            offset = dest.tell()
+            with open(self.json.path, 'r', encoding='utf-8') as src:
+                shutil.copyfileobj(src, dest)
+            dest.write("\n}\n")
+        os.replace(tmp_path, json_path)
+        self.segments_path = json_path
+        self.segments_offset = offset
+
+    def cleanup(self):
+        """結合済みの一時ファイルを削除"""
+        for path in (self.txt.path, self.json.path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
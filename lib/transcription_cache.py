@@ -0,0 +1,157 @@
+"""文字おこし結果のキャッシュ（メディアID / 音声ハッシュ × モデル × 言語）"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from config.settings import TRANSCRIPTION_CACHE_PATH
+
+logger = logging.getLogger(__name__)
+
+YOUTUBE_ID_PATTERNS = [
+    re.compile(r'youtube\.com/watch\?(?:.*&)?v=([\w-]{6,})'),
+    re.compile(r'youtu\.be/([\w-]{6,})'),
+    re.compile(r'youtube\.com/(?:embed|shorts|live)/([\w-]{6,})'),
+]
+TWEET_ID_PATTERN = re.compile(r'(?:x|twitter)\.com/[^/]+/status/(\d+)')
+
+
+def media_key_for_url(url):
+    """URLからプラットフォーム上のメディアIDキーを作成（判別できなければ None）"""
+    for pattern in YOUTUBE_ID_PATTERNS:
+        match = pattern.search(url)
+        if match:
+            return f"youtube:{match.group(1)}"
+    match = TWEET_ID_PATTERN.search(url)
+    if match:
+        return f"twitter:{match.group(1)}"
+    return None
+
+
+def audio_sha256(path, block_size=1024 * 1024):
+    """音声ファイルの内容ハッシュ"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TranscriptionCache:
+    """文字おこし結果と取得済み音声の所在をサイドカーのSQLiteに保存
+
+    transcripts はメディアキー・モデル・言語ごとのセグメント、
+    audio はメディアキーごとの音声ファイル（モデル変更時に再ダウンロードせず使う）、
+    languages はメディアキーごとの判定済みの言語（言語の自動判定を繰り返さない）。
+    """
+
+    def __init__(self, db_path=TRANSCRIPTION_CACHE_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS transcripts (
+                    media_key TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    segments TEXT NOT NULL,
+                    audio_sha256 TEXT,
+                    created_at DATETIME NOT NULL,
+                    PRIMARY KEY (media_key, model, language)
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS audio (
+                    media_key TEXT PRIMARY KEY,
+                    audio_path TEXT NOT NULL,
+                    audio_sha256 TEXT,
+                    created_at DATETIME NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS languages (
+                    media_key TEXT PRIMARY KEY,
+                    language TEXT NOT NULL,
+                    probability REAL,
+                    created_at DATETIME NOT NULL
+                )
+            ''')
+
+    @contextmanager
+    def _connect(self):
+        """コミットして閉じる接続"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_transcript(self, media_key, model, language):
+        """キャッシュ済みセグメント（なければ None）"""
+        if not media_key:
+            return None
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT segments FROM transcripts WHERE media_key = ? AND model = ? AND language = ?",
+                (media_key, model, language)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_transcript(self, media_keys, model, language, segments, sha256=None):
+        """セグメントを複数のキー（メディアID・音声ハッシュ）で保存"""
+        payload = json.dumps(list(segments), ensure_ascii=False)
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._lock, self._connect() as conn:
+            for key in filter(None, media_keys):
+                conn.execute(
+                    "INSERT OR REPLACE INTO transcripts VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, language, payload, sha256, now)
+                )
+
+    def get_audio(self, media_key):
+        """取得済み音声のパス（ファイルが消えていれば None）"""
+        if not media_key:
+            return None
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT audio_path FROM audio WHERE media_key = ?", (media_key,)
+            ).fetchone()
+        if row and os.path.exists(row[0]):
+            return row[0]
+        return None
+
+    def put_audio(self, media_keys, audio_path, sha256=None):
+        """音声ファイルの所在を記録"""
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._lock, self._connect() as conn:
+            for key in filter(None, media_keys):
+                conn.execute(
+                    "INSERT OR REPLACE INTO audio VALUES (?, ?, ?, ?)",
+                    (key, os.path.abspath(audio_path), sha256, now)
+                )
+
+    def get_language(self, media_key):
+        """判定済みの (言語, 確率)（なければ None）"""
+        if not media_key:
+            return None
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT language, probability FROM languages WHERE media_key = ?", (media_key,)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def put_language(self, media_keys, language, probability=None):
+        """判定した言語を記録"""
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._lock, self._connect() as conn:
+            for key in filter(None, media_keys):
+                conn.execute(
+                    "INSERT OR REPLACE INTO languages VALUES (?, ?, ?, ?)",
+                    (key, language, probability, now)
+                )
@@ -0,0 +1,286 @@
+"""セグメント単位のバッチ翻訳（並列・レート制限・SQLiteキャッシュ・バックエンド差し替え可）"""
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from config.settings import (
+    TRANSLATION_BACKEND, TRANSLATION_BATCH_CHARS, TRANSLATION_MAX_WORKERS,
+    TRANSLATION_RATE_PER_SECOND, TRANSLATION_CACHE_PATH
+)
+
+logger = logging.getLogger(__name__)
+
+# バッチ内のテキストを連結する区切り（改行は翻訳後も保持される）
+_SEPARATOR = "\n"
+_MAX_RETRIES = 2
+# 長すぎるテキストの分割位置（文末記号と続く空白の直後、なければ空白の直後）
+_SENTENCE_BREAK = re.compile(r'[。！？!?．.]+\s*')
+_SPACE_BREAK = re.compile(r'\s+')
+# 訳文の断片を空白なしで連結する言語
+_NO_SPACE_LANGUAGES = ("ja", "zh")
+
+
+def split_long_text(text, limit):
+    """limit 文字以内の断片に分割（文末 → 空白 → 文字数の順で区切りを探し、連結すると元に戻る）"""
+    pieces = []
+    while len(text) > limit:
+        window = text[:limit]
+        cut = None
+        for pattern in (_SENTENCE_BREAK, _SPACE_BREAK):
+            ends = [match.end() for match in pattern.finditer(window) if match.end() < len(text)]
+            if ends:
+                cut = ends[-1]
+                break
+        cut = cut or limit
+        pieces.append(text[:cut])
+        text = text[cut:]
+    pieces.append(text)
+    return pieces
+
+
+class GoogleTranslateBackend:
+    """deep_translator経由のGoogle翻訳（改行区切りで複数テキストを1リクエストに）"""
+
+    name = "google"
+
+    def __init__(self, target_language="en", source_language="auto"):
+        from deep_translator import GoogleTranslator
+        self.translator = GoogleTranslator(source=source_language, target=target_language)
+
+    def translate_batch(self, texts):
+        """1リクエストで翻訳（改行が保持されず行数が合わない場合もそのまま返し、呼び出し側で分割し直す）"""
+        translated = self.translator.translate(_SEPARATOR.join(texts)) or ""
+        return translated.split(_SEPARATOR)
+
+
+class EchoBackend:
+    """翻訳せずに原文を返す（ネットワークなしの動作確認用）"""
+
+    name = "echo"
+
+    def __init__(self, target_language="en", source_language="auto"):
+        self.target_language = target_language
+
+    def translate_batch(self, texts):
+        return list(texts)
+
+
+BACKENDS = {
+    "google": GoogleTranslateBackend,
+    "echo": EchoBackend,
+}
+
+
+class RateLimiter:
+    """リクエスト間隔を一定以上に保つ（スレッド間で共有）"""
+
+    def __init__(self, rate_per_second):
+        self.interval = 1.0 / rate_per_second if rate_per_second else 0.0
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            wait_time = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+class TranslationCache:
+    """(原文, 翻訳先言語, バックエンド) ごとの翻訳結果をSQLiteに保存"""
+
+    def __init__(self, db_path=TRANSLATION_CACHE_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS translations (
+                    source_text TEXT NOT NULL,
+                    target_language TEXT NOT NULL,
+                    backend TEXT NOT NULL,
+                    translated_text TEXT NOT NULL,
+                    created_at DATETIME NOT NULL,
+                    PRIMARY KEY (source_text, target_language, backend)
+                )
+            ''')
+
+    @contextmanager
+    def _connect(self):
+        """コミットして閉じる接続"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_many(self, texts, target_language, backend):
+        """キャッシュ済みの翻訳 {原文: 訳文}"""
+        found = {}
+        texts = list(texts)
+        with self._lock, self._connect() as conn:
+            # SQLiteの変数上限を超えないよう分割して検索
+            for start in range(0, len(texts), 500):
+                chunk = texts[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT source_text, translated_text FROM translations "
+                    f"WHERE target_language = ? AND backend = ? AND source_text IN ({placeholders})",
+                    [target_language, backend] + chunk
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def put_many(self, pairs, target_language, backend):
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)",
+                [(source, target_language, backend, translated, now) for source, translated in pairs]
+            )
+
+
+class TranslationEngine:
+    """セグメントを文字数上限内のバッチにまとめ、並列・レート制限付きで翻訳"""
+
+    def __init__(self, target_language="en", backend=TRANSLATION_BACKEND,
+                 max_batch_chars=TRANSLATION_BATCH_CHARS, max_workers=TRANSLATION_MAX_WORKERS,
+                 rate_per_second=TRANSLATION_RATE_PER_SECOND, cache_path=TRANSLATION_CACHE_PATH):
+        self.target_language = target_language
+        self.backend = BACKENDS[backend](target_language) if isinstance(backend, str) else backend
+        self.max_batch_chars = max_batch_chars
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter(rate_per_second)
+        self.cache = None
+        if cache_path:
+            try:
+                self.cache = TranslationCache(cache_path)
+            except Exception as e:
+                logger.warning(f"翻訳キャッシュを開けません: {e}")
+
+    def translate_segments(self, segments):
+        """各セグメントの text を翻訳したセグメント一覧（start / end は元のまま）"""
+        translations = self.translate_texts([segment['text'] for segment in segments])
+        return [dict(segment, text=translated) for segment, translated in zip(segments, translations)]
+
+    def translate_text(self, text):
+        """長文を行単位で翻訳（バックエンドの文字数上限を超えないように分割）"""
+        lines = text.split("\n")
+        return "\n".join(self.translate_texts(lines))
+
+    def translate_texts(self, texts):
+        """テキスト一覧を翻訳（同じ原文は1回だけ翻訳、失敗したものは原文のまま）"""
+        unique = [text for text in dict.fromkeys(texts) if text.strip()]
+        backend_name = getattr(self.backend, 'name', type(self.backend).__name__)
+
+        translated = {}
+        if self.cache and unique:
+            try:
+                translated = self.cache.get_many(unique, self.target_language, backend_name)
+            except Exception as e:
+                logger.warning(f"翻訳キャッシュ参照エラー: {e}")
+
+        missing = [text for text in unique if text not in translated]
+        logger.info(f"翻訳: {len(unique)}件（キャッシュ {len(unique) - len(missing)}件 / 新規 {len(missing)}件）")
+
+        # 1件で上限を超えるテキスト（タイムスタンプなしの全文など）は分割して翻訳し、後で連結する
+        limit = self.max_batch_chars - len(_SEPARATOR)
+        parts = {}
+        requests = []
+        for text in missing:
+            if len(text) > limit:
+                parts[text] = [piece for piece in split_long_text(text, limit) if piece.strip()]
+                requests.extend(parts[text])
+            else:
+                requests.append(text)
+        if parts:
+            logger.info(f"長文 {len(parts)}件を {sum(len(pieces) for pieces in parts.values())}個に分割して翻訳")
+        requests = list(dict.fromkeys(requests))
+
+        if requests:
+            batches = self._make_batches(requests)
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for batch, result in zip(batches, executor.map(self._translate_batch, batches)):
+                    if result is None:
+                        continue
+                    pairs = [(source, translated) for source, translated in zip(batch, result)
+                             if translated is not None]
+                    translated.update(pairs)
+                    if self.cache:
+                        try:
+                            self.cache.put_many(pairs, self.target_language, backend_name)
+                        except Exception as e:
+                            logger.warning(f"翻訳キャッシュ保存エラー: {e}")
+
+        joined = []
+        separator = "" if self.target_language.split("-")[0] in _NO_SPACE_LANGUAGES else " "
+        for text, pieces in parts.items():
+            # 一部の断片が翻訳できなかった場合は原文のまま（断片ごとの訳文はキャッシュ済み）
+            if all(piece in translated for piece in pieces):
+                translated[text] = separator.join(translated[piece].strip() for piece in pieces)
+                joined.append((text, translated[text]))
+        if self.cache and joined:
+            try:
+                self.cache.put_many(joined, self.target_language, backend_name)
+            except Exception as e:
+                logger.warning(f"翻訳キャッシュ保存エラー: {e}")
+
+        return [translated.get(text, text) for text in texts]
+
+    def _make_batches(self, texts):
+        """区切り文字込みで max_batch_chars を超えないようにまとめる"""
+        batches = []
+        current = []
+        size = 0
+        for text in texts:
+            text_size = len(text) + len(_SEPARATOR)
+            if current and size + text_size > self.max_batch_chars:
+                batches.append(current)
+                current = []
+                size = 0
+            current.append(text)
+            size += text_size
+        if current:
+            batches.append(current)
+        return batches
+
+    def _translate_batch(self, batch):
+        """1バッチを翻訳（失敗時はリトライ、最終的に失敗なら None）
+
+        結果の件数が合わない（改行が保持されなかった）場合はバッチを半分に分けて翻訳し直す。
+        分割後のリクエストもレート制限に従い、翻訳できなかったテキストの訳文は None。
+        """
+        # 区切りとして使う改行はテキスト内では空白に置き換える
+        request = [text.replace(_SEPARATOR, " ") for text in batch]
+        for attempt in range(_MAX_RETRIES + 1):
+            self.rate_limiter.wait()
+            try:
+                result = self.backend.translate_batch(request)
+            except Exception as e:
+                logger.warning(f"翻訳エラー（{attempt + 1}/{_MAX_RETRIES + 1}回目）: {e}")
+                if attempt < _MAX_RETRIES:
+                    time.sleep(2 ** attempt)
+                continue
+
+            if len(result) == len(batch):
+                return [translated.strip() if translated else source
+                        for source, translated in zip(batch, result)]
+            if len(batch) == 1:
+                # 1件の訳文が複数行に分かれた場合は連結
+                return [" ".join(line.strip() for line in result if line.strip()) or batch[0]]
+            logger.debug(f"翻訳結果の件数不一致（{len(batch)} → {len(result)}）、バッチを分割して再翻訳")
+            middle = len(batch) // 2
+            halves = [self._translate_batch(batch[:middle]), self._translate_batch(batch[middle:])]
+            if all(half is None for half in halves):
+                return None
+            return [translated for half, part in zip(halves, (batch[:middle], batch[middle:]))
+                    for translated in (half if half is not None else [None] * len(part))]
+        return None
@@ -0,0 +1,197 @@
+"""ツイートのローカル集計（キーワード・ハッシュタグ・エンゲージメント・時間帯）"""
+import logging
+import re
+from collections import Counter
+from datetime import datetime
+import numpy as np
+from config.settings import LOCAL_ANALYSIS_TOP_N, LOCAL_ANALYSIS_NGRAM_SIZES
+
+logger = logging.getLogger(__name__)
+
+HASHTAG_PATTERN = re.compile(r'[#＃](\w+)')
+MENTION_PATTERN = re.compile(r'@(\w{1,15})')
+URL_PATTERN = re.compile(r'https?://\S+')
+# n-gram抽出前に除去する記号・空白
+NOISE_PATTERN = re.compile(r'[\s\W_]+')
+# ひらがなのみ・数字のみのn-gramは助詞や語尾が大半のため除外
+HIRAGANA_ONLY = re.compile(r'^[぀-ゟ]+$')
+DIGIT_ONLY = re.compile(r'^\d+$')
+
+ENGAGEMENT_METRICS = ['likes', 'reposts', 'replies', 'views']
+
+
+class TweetAnalytics:
+    """LLMに渡す前のローカル集計"""
+
+    def __init__(self, top_n=LOCAL_ANALYSIS_TOP_N, ngram_sizes=LOCAL_ANALYSIS_NGRAM_SIZES):
+        self.top_n = top_n
+        self.ngram_sizes = ngram_sizes
+
+    def analyze(self, tweets):
+        """ツイート一覧を集計"""
+        texts = [tweet.get('text', '') or '' for tweet in tweets]
+
+        hashtags = Counter()
+        mentions = Counter()
+        ngrams = Counter()
+        for text in texts:
+            hashtags.update(tag.lower() for tag in HASHTAG_PATTERN.findall(text))
+            mentions.update(MENTION_PATTERN.findall(text))
+            ngrams.update(self._char_ngrams(text))
+
+        stats = {
+            'count': len(tweets),
+            'users': len({tweet.get('username', '') for tweet in tweets if tweet.get('username')}),
+            'hashtags': hashtags.most_common(self.top_n),
+            'mentions': mentions.most_common(self.top_n),
+            'keywords': self._top_keywords(ngrams),
+            'engagement': self._engagement_stats(tweets),
+            'hourly_volume': self._hourly_volume(tweets),
+            'top_tweets': self._top_tweets(tweets),
+        }
+        logger.info(f"ローカル集計完了: {stats['count']}件")
+        return stats
+
+    def _char_ngrams(self, text):
+        """文字n-gram（1ツイート内の重複は1回として数える）"""
+        text = URL_PATTERN.sub(' ', text)
+        text = HASHTAG_PATTERN.sub(' ', text)
+        text = MENTION_PATTERN.sub(' ', text)
+
+        grams = set()
+        for chunk in NOISE_PATTERN.split(text.lower()):
+            for n in self.ngram_sizes:
+                for i in range(len(chunk) - n + 1):
+                    gram = chunk[i:i + n]
+                    if not HIRAGANA_ONLY.match(gram) and not DIGIT_ONLY.match(gram):
+                        grams.add(gram)
+        return grams
+
+    def _top_keywords(self, ngrams):
+        """頻出n-gram（同程度の頻度で重なり合うn-gramは1つの語句に連結）"""
+        candidates = [[gram, count] for gram, count in ngrams.most_common(self.top_n * 10) if count > 1]
+        candidates.sort(key=lambda gc: (-gc[1], -len(gc[0])))
+
+        # 頻度が近く2文字以上重なる語句同士を、変化がなくなるまで連結
+        phrases = candidates
+        merged = True
+        while merged:
+            merged = False
+            for i, (left, left_count) in enumerate(phrases):
+                for j, (right, right_count) in enumerate(phrases):
+                    if i == j or min(left_count, right_count) * 1.2 < max(left_count, right_count):
+                        continue
+                    joined = self._join_overlap(left, right)
+                    if joined:
+                        phrases[i] = [joined, max(left_count, right_count)]
+                        del phrases[j]
+                        merged = True
+                        break
+                if merged:
+                    break
+
+        phrases.sort(key=lambda gc: (-gc[1], -len(gc[0])))
+        return [tuple(phrase) for phrase in phrases[:self.top_n]]
+
+    def _join_overlap(self, left, right):
+        """leftの末尾とrightの先頭が2文字以上重なれば連結（包含ならleft）"""
+        if right in left:
+            return left
+        for k in range(min(len(left), len(right)) - 1, 1, -1):
+            if left.endswith(right[:k]):
+                return left + right[k:]
+        return None
+
+    def _engagement_stats(self, tweets):
+        """エンゲージメント分布（numpyで一括計算）"""
+        if not tweets:
+            return {}
+
+        values = np.array(
+            [[self._to_number(tweet.get(metric, 0)) for metric in ENGAGEMENT_METRICS] for tweet in tweets],
+            dtype=np.float64
+        )
+        stats = {}
+        for index, metric in enumerate(ENGAGEMENT_METRICS):
+            column = values[:, index]
+            stats[metric] = {
+                'total': int(column.sum()),
+                'mean': round(float(column.mean()), 1),
+                'median': float(np.median(column)),
+                'p90': float(np.percentile(column, 90)),
+                'max': int(column.max()),
+            }
+
+        # 表示数に対するエンゲージメント率
+        interactions = values[:, 0] + values[:, 1] + values[:, 2]
+        views = values[:, 3]
+        mask = views > 0
+        if mask.any():
+            stats['engagement_rate'] = round(float((interactions[mask] / views[mask]).mean()) * 100, 2)
+        return stats
+
+    def _hourly_volume(self, tweets):
+        """時間帯別（0-23時）の投稿数"""
+        hours = []
+        for tweet in tweets:
+            try:
+                hours.append(datetime.strptime(tweet.get('datetime', ''), '%Y-%m-%d %H:%M').hour)
+            except (TypeError, ValueError):
+                continue
+        if not hours:
+            return []
+        return np.bincount(np.array(hours, dtype=np.int64), minlength=24).tolist()
+
+    def _top_tweets(self, tweets, limit=3):
+        """エンゲージメント上位のツイート"""
+        def score(tweet):
+            return (self._to_number(tweet.get('likes', 0))
+                    + self._to_number(tweet.get('reposts', 0)) * 2
+                    + self._to_number(tweet.get('replies', 0)))
+        return sorted(tweets, key=score, reverse=True)[:limit]
+
+    def _to_number(self, value):
+        try:
+            return float(value or 0)
+        except (TypeError, ValueError):
+            return 0.0
+
+
+def format_analytics_summary(stats):
+    """集計結果をプロンプト・レポート用のコンパクトなテキストに整形"""
+    if not stats or not stats.get('count'):
+        return "（集計対象のツイートがありません）"
+
+    lines = [f"件数: {stats['count']}件 / 投稿者: {stats['users']}人"]
+
+    if stats['keywords']:
+        lines.append("頻出語: " + ", ".join(f"{gram}({count})" for gram, count in stats['keywords']))
+    if stats['hashtags']:
+        lines.append("ハッシュタグ: " + ", ".join(f"#{tag}({count})" for tag, count in stats['hashtags']))
+    if stats['mentions']:
+        lines.append("メンション: " + ", ".join(f"@{name}({count})" for name, count in stats['mentions']))
+
+    engagement = stats.get('engagement', {})
+    for metric, label in (('likes', 'いいね'), ('reposts', 'リポスト'), ('replies', 'リプライ'), ('views', '表示')):
+        if metric in engagement:
+            m = engagement[metric]
+            lines.append(
+                f"{label}: 合計 {m['total']} / 平均 {m['mean']} / 中央値 {m['median']:g} / "
+                f"上位10% {m['p90']:g} / 最大 {m['max']}"
+            )
+    if 'engagement_rate' in engagement:
+        lines.append(f"平均エンゲージメント率: {engagement['engagement_rate']}%")
+
+    hourly = stats.get('hourly_volume')
+    if hourly:
+        peak = max(range(24), key=lambda h: hourly[h])
+        busy = " ".join(f"{h}時:{n}" for h, n in enumerate(hourly) if n)
+        lines.append(f"時間帯別投稿数（ピーク {peak}時）: {busy}")
+
+    if stats.get('top_tweets'):
+        lines.append("反応上位:")
+        for tweet in stats['top_tweets']:
+            text = (tweet.get('text', '') or '').replace("\n", " ")[:80]
+            lines.append(f"  - {tweet.get('username', '')} いいね:{tweet.get('likes', 0)} {text}")
+
+    return "\n".join(lines)
@@ -0,0 +1,320 @@
+"""ツイート動画の直接取得（ブラウザが読み込んだ m3u8/mp4 のURLを使い、yt-dlpでの再解決を省く）
+
+接続中のChromeのタブが読み込んだリソース（Resource Timing）から video.twimg.com のプレイリスト・動画URLを集め、
+HLSは音声レンディションのセグメントを並列に取得して順番どおりに書き出す。
+ツイートを開き直す間だけCDPでページに監視スクリプトを追加し、リソースの記録が溢れても取りこぼさないようにする。
+"""
+import logging
+import os
+import re
+import subprocess
+import time
+from collections import deque
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+from lib.download_manager import write_checksum
+from config.settings import (
+    TWEET_CAPTURE_WAIT, HLS_SEGMENT_WORKERS, DOWNLOAD_SOCKET_TIMEOUT, DOWNLOAD_RETRIES
+)
+
+logger = logging.getLogger(__name__)
+
+MEDIA_HOST = "video.twimg.com"
+
+_TWEET_URL = re.compile(r'https?://(?:www\.|mobile\.)?(?:twitter|x)\.com/[^/]+/status/(\d+)')
+_ATTRIBUTE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+_RESOLUTION = re.compile(r'/(\d+)x(\d+)/')
+_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36",
+    "Referer": "https://x.com/",
+}
+
+# タブ内で実際に読み込まれたリソースのURL
+_RESOURCE_URLS_JS = "return performance.getEntriesByType('resource').map(entry => entry.name);"
+
+# ページ読み込み前に追加する監視スクリプト（動画ホストのプレイリスト・動画ファイルのURLだけを記録）
+_COLLECT_MEDIA_URLS_JS = """
+window.__tweetMediaUrls = [];
+new PerformanceObserver(list => {
+  for (const entry of list.getEntries()) {
+    const url = new URL(entry.name);
+    if (url.hostname === '%s' && /\\.(m3u8|mp4)$/.test(url.pathname)) window.__tweetMediaUrls.push(entry.name);
+  }
+}).observe({type: 'resource', buffered: true});
+""" % MEDIA_HOST
+_COLLECTED_URLS_JS = "return window.__tweetMediaUrls || [];"
+
+# 動画を再生してプレイリストの読み込みを促す（自動再生されない設定向け）
+_PLAY_VIDEO_JS = """
+const video = document.querySelector('article video');
+if (video) { video.muted = true; video.play().catch(() => {}); }
+return !!video;
+"""
+
+
+def is_tweet_url(url):
+    return bool(_TWEET_URL.match(url or ""))
+
+
+def _attributes(line):
+    return {key: value.strip('"') for key, value in _ATTRIBUTE.findall(line.split(":", 1)[1])}
+
+
+def parse_master_playlist(text, base_url):
+    """マスタープレイリストを (音声レンディション一覧, 映像バリアント一覧) に分解
+
+    音声: {'uri', 'group', 'bitrate'}、映像: {'uri', 'bandwidth', 'audio'}（audio は音声グループ名）
+    """
+    audio = []
+    variants = []
+    lines = [line.strip() for line in text.splitlines()]
+    for i, line in enumerate(lines):
+        if line.startswith("#EXT-X-MEDIA:"):
+            attributes = _attributes(line)
+            if attributes.get("TYPE") == "AUDIO" and attributes.get("URI"):
+                digits = re.findall(r'\d+', attributes.get("GROUP-ID", ""))
+                audio.append({
+                    'uri': urljoin(base_url, attributes["URI"]),
+                    'group': attributes.get("GROUP-ID"),
+                    'bitrate': int(digits[-1]) if digits else 0,
+                })
+        elif line.startswith("#EXT-X-STREAM-INF:"):
+            uri = next((candidate for candidate in lines[i + 1:] if candidate and not candidate.startswith("#")), None)
+            if uri:
+                attributes = _attributes(line)
+                variants.append({
+                    'uri': urljoin(base_url, uri),
+                    'bandwidth': int(attributes.get("BANDWIDTH", 0) or 0),
+                    'audio': attributes.get("AUDIO"),
+                })
+    return audio, variants
+
+
+def parse_media_playlist(text, base_url):
+    """メディアプレイリストを (初期化セグメントURL, セグメントURL一覧) に分解（暗号化されていれば None）"""
+    init_url = None
+    segments = []
+    for line in (line.strip() for line in text.splitlines()):
+        if line.startswith("#EXT-X-KEY:") and _attributes(line).get("METHOD", "NONE") != "NONE":
+            return None
+        if line.startswith("#EXT-X-MAP:"):
+            init_url = urljoin(base_url, _attributes(line).get("URI", ""))
+        elif line and not line.startswith("#"):
+            segments.append(urljoin(base_url, line))
+    return init_url, segments
+
+
+def _fetch(url, retries=DOWNLOAD_RETRIES):
+    for attempt in range(retries + 1):
+        try:
+            request = urllib.request.Request(url, headers=_HEADERS)
+            with urllib.request.urlopen(request, timeout=DOWNLOAD_SOCKET_TIMEOUT) as response:
+                return response.read()
+        except Exception:
+            if attempt >= retries:
+                raise
+            time.sleep(min(2 ** attempt, 8))
+
+
+class TweetMediaCapture:
+    """ブラウザの通信からツイート動画のURLを取得し、直接ダウンロード"""
+
+    def __init__(self, chrome_connector, wait=TWEET_CAPTURE_WAIT, workers=HLS_SEGMENT_WORKERS):
+        self.chrome = chrome_connector
+        self.wait = wait
+        self.workers = max(1, workers)
+
+    def capture(self, tweet_url, output_dir, basename, kind="audio"):
+        """保存先パス（URLが見つからない・取得に失敗した場合は None）"""
+        urls = self.observe(tweet_url)
+        if not urls:
+            logger.info("ブラウザの通信に動画URLが見つかりません")
+            return None
+
+        started = time.time()
+        path = None
+        playlists = [url for url in urls if ".m3u8" in url]
+        if playlists:
+            path = self._download_hls(playlists, output_dir, basename, kind)
+        if not path:
+            files = [url for url in urls if urlparse(url).path.endswith(".mp4") and "/vid/" in url]
+            if files:
+                path = self._download_file(files, output_dir, basename, kind)
+        if path:
+            write_checksum(path)
+            logger.info(f"ブラウザの通信から直接取得: {path}（{time.time() - started:.1f}秒）")
+        return path
+
+    def observe(self, tweet_url):
+        """タブが読み込んだ video.twimg.com のURL（読み込み順、重複なし）"""
+        if not self.chrome.connect():
+            return []
+        driver = self.chrome.driver
+        tweet_id = _TWEET_URL.match(tweet_url).group(1)
+
+        # 既にツイートを表示していれば読み込み済みのURLを使い、なければ開いて再生を待つ
+        urls = []
+        if tweet_id in (driver.current_url or ""):
+            urls = self._resource_urls(driver)
+        if not urls:
+            script_id = self._add_collector(driver)
+            try:
+                try:
+                    driver.get(tweet_url)
+                except Exception as e:
+                    logger.debug(f"ツイートの読み込みが完了しません（読み込み済みの通信で続行）: {e}")
+                deadline = time.time() + self.wait
+                while time.time() < deadline and not any(".m3u8" in url or ".mp4" in url for url in urls):
+                    time.sleep(0.5)
+                    try:
+                        driver.execute_script(_PLAY_VIDEO_JS)
+                    except Exception:
+                        pass
+                    urls = self._merge(urls, self._collected_urls(driver) + self._resource_urls(driver))
+            finally:
+                self._remove_collector(driver, script_id)
+        return urls
+
+    def _merge(self, urls, new_urls):
+        seen = set(urls)
+        return urls + [url for url in new_urls if not (url in seen or seen.add(url))]
+
+    def _add_collector(self, driver):
+        """次に開くページへ監視スクリプトを追加（CDPが使えなければ None で Resource Timing のみ）"""
+        try:
+            return driver.execute_cdp_cmd(
+                "Page.addScriptToEvaluateOnNewDocument", {"source": _COLLECT_MEDIA_URLS_JS}
+            ).get("identifier")
+        except Exception as e:
+            logger.debug(f"監視スクリプトを追加できません: {e}")
+            return None
+
+    def _remove_collector(self, driver, script_id):
+        if script_id is None:
+            return
+        try:
+            driver.execute_cdp_cmd("Page.removeScriptToEvaluateOnNewDocument", {"identifier": script_id})
+        except Exception as e:
+            logger.debug(f"監視スクリプトの削除エラー: {e}")
+
+    def _collected_urls(self, driver):
+        try:
+            return driver.execute_script(_COLLECTED_URLS_JS) or []
+        except Exception:
+            return []
+
+    def _resource_urls(self, driver):
+        try:
+            names = driver.execute_script(_RESOURCE_URLS_JS) or []
+        except Exception:
+            return []
+        return [url for url in names if urlparse(url).hostname == MEDIA_HOST]
+
+    def _download_hls(self, playlists, output_dir, basename, kind):
+        for playlist_url in playlists:
+            try:
+                text = _fetch(playlist_url).decode('utf-8', errors='replace')
+            except Exception as e:
+                logger.debug(f"プレイリスト取得エラー: {e}")
+                continue
+            if "#EXT-X-STREAM-INF" not in text:
+                continue
+            audio, variants = parse_master_playlist(text, playlist_url)
+            try:
+                return self._download_rendition(audio, variants, output_dir, basename, kind)
+            except Exception as e:
+                logger.warning(f"HLS取得エラー: {e}")
+                return None
+        return None
+
+    def _download_rendition(self, audio, variants, output_dir, basename, kind):
+        best_audio = max(audio, key=lambda rendition: rendition['bitrate']) if audio else None
+        if kind == "audio" and best_audio:
+            return self._download_stream(best_audio['uri'], output_dir, basename, audio_only=True)
+        if not variants:
+            return None
+
+        # 音声のみの場合も音声が映像に多重化されていれば最小の映像を使う
+        variant = (max if kind == "video" else min)(variants, key=lambda item: item['bandwidth'])
+        video_path = self._download_stream(variant['uri'], output_dir, f"{basename}_video_only" if audio else basename)
+        if not audio or not video_path:
+            return video_path
+
+        grouped = [rendition for rendition in audio if rendition['group'] == variant['audio']] or [best_audio]
+        audio_path = self._download_stream(grouped[0]['uri'], output_dir, f"{basename}_audio_only", audio_only=True)
+        if not audio_path:
+            return None
+        output_path = os.path.join(output_dir, f"{basename}.mp4")
+        cmd = ["ffmpeg", "-y", "-loglevel", "error", "-i", video_path, "-i", audio_path, "-c", "copy", output_path]
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        for path in (video_path, audio_path):
+            os.remove(path)
+        if result.returncode != 0:
+            logger.warning(f"映像と音声の結合に失敗: {result.stderr.strip()[:200]}")
+            return None
+        return output_path
+
+    def _download_stream(self, playlist_url, output_dir, basename, audio_only=False):
+        """メディアプレイリストのセグメントを並列に取得し、取得できたものから順番どおりに書き出す
+
+        先読みはワーカー数の2倍までとし、メモリに保持するセグメントを抑える。
+        """
+        parsed = parse_media_playlist(_fetch(playlist_url).decode('utf-8', errors='replace'), playlist_url)
+        if not parsed or not parsed[1]:
+            return None
+        init_url, segments = parsed
+
+        ext = "ts" if urlparse(segments[0]).path.endswith(".ts") else ("m4a" if audio_only else "mp4")
+        path = os.path.join(output_dir, f"{basename}.{ext}")
+        os.makedirs(output_dir, exist_ok=True)
+        try:
+            with open(path + ".part", 'wb') as f, \
+                    ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hls") as executor:
+                if init_url:
+                    f.write(_fetch(init_url))
+                pending = deque()
+                try:
+                    for segment_url in segments:
+                        pending.append(executor.submit(_fetch, segment_url))
+                        if len(pending) >= self.workers * 2:
+                            f.write(pending.popleft().result())
+                    while pending:
+                        f.write(pending.popleft().result())
+                finally:
+                    for future in pending:
+                        future.cancel()
+        except Exception:
+            if os.path.exists(path + ".part"):
+                os.remove(path + ".part")
+            raise
+        os.replace(path + ".part", path)
+        logger.info(f"HLSセグメント取得: {len(segments)}件（並列 {self.workers}）")
+        return path
+
+    def _download_file(self, files, output_dir, basename, kind):
+        """mp4直リンク（音声のみなら最小の解像度、動画なら最大の解像度）"""
+        def pixels(url):
+            match = _RESOLUTION.search(url)
+            return int(match.group(1)) * int(match.group(2)) if match else 0
+
+        url = (max if kind == "video" else min)(files, key=pixels)
+        path = os.path.join(output_dir, f"{basename}.mp4")
+        os.makedirs(output_dir, exist_ok=True)
+        try:
+            data = _fetch(url)
+        except Exception as e:
+            logger.warning(f"動画ファイル取得エラー: {e}")
+            return None
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+
+def capture_tweet_media(chrome_connector, tweet_url, output_dir, basename, kind="audio"):
+    """ブラウザ経由でツイート動画を取得（失敗時は None で呼び出し元がyt-dlpを使う）"""
+    try:
+        return TweetMediaCapture(chrome_connector).capture(tweet_url, output_dir, basename, kind)
+    except Exception as e:
+        logger.warning(f"ブラウザ経由の動画取得に失敗（yt-dlpで取得します）: {e}")
+        return None
@@ -0,0 +1,191 @@
+"""TF-IDFクラスタリングによる代表ツイート選定（プロンプト詰め込み用）"""
+import logging
+import re
+import numpy as np
+from scipy import sparse
+from config.settings import (
+    ANALYSIS_PROMPT_MAX_CHARS, SELECTOR_HASH_DIM, SELECTOR_NGRAM_SIZES,
+    SELECTOR_MAX_CLUSTERS, SELECTOR_TEXT_LENGTH
+)
+
+logger = logging.getLogger(__name__)
+
+URL_PATTERN = re.compile(r'https?://\S+')
+SPACE_PATTERN = re.compile(r'\s+')
+
+# 各ツイートの整形オーバーヘッド（ユーザー名・エンゲージメント表記）の概算文字数
+_LINE_OVERHEAD = 40
+_HASH_BASE = 1000003
+
+
+def engagement_score(tweet):
+    """エンゲージメントスコア（リポストを重めに評価）"""
+    def number(value):
+        try:
+            return float(value or 0)
+        except (TypeError, ValueError):
+            return 0.0
+    return number(tweet.get('likes')) + number(tweet.get('reposts')) * 2 + number(tweet.get('replies'))
+
+
+class TweetSelector:
+    """文字n-gramのTF-IDFでクラスタリングし、各クラスタの代表と高反応ツイートを予算内で選ぶ"""
+
+    def __init__(self, max_chars=ANALYSIS_PROMPT_MAX_CHARS, max_clusters=SELECTOR_MAX_CLUSTERS,
+                 hash_dim=SELECTOR_HASH_DIM, ngram_sizes=SELECTOR_NGRAM_SIZES,
+                 text_length=SELECTOR_TEXT_LENGTH, seed=0):
+        self.max_chars = max_chars
+        self.max_clusters = max_clusters
+        self.hash_dim = hash_dim
+        self.ngram_sizes = ngram_sizes
+        self.text_length = text_length
+        self.rng = np.random.default_rng(seed)
+
+    def select(self, tweets, max_items=None):
+        """代表ツイートを選定
+
+        Returns:
+            (selected, clusters): selected は 'cluster' キー付きのツイート、
+            clusters は {'id', 'size', 'share'} のリスト（サイズ降順）
+        """
+        if not tweets:
+            return [], []
+
+        costs = [self._cost(t) for t in tweets]
+        if sum(costs) <= self.max_chars and (max_items is None or len(tweets) <= max_items):
+            return [dict(t, cluster=0) for t in tweets], [{'id': 0, 'size': len(tweets), 'share': 1.0}]
+
+        matrix = self._tfidf_matrix([t.get('text', '') or '' for t in tweets])
+        k = min(self.max_clusters, max(2, int(np.sqrt(len(tweets) / 2))), len(tweets))
+        centers = self._minibatch_kmeans(matrix, k)
+        labels, similarity = self._assign(matrix, centers)
+
+        sizes = np.bincount(labels, minlength=k)
+        order = [int(c) for c in np.argsort(-sizes) if sizes[c] > 0]
+        scores = np.array([engagement_score(t) for t in tweets])
+
+        # クラスタごとの候補: 重心に最も近いツイート（メドイド）→ 反応の高い順
+        candidates = {}
+        for cluster in order:
+            members = np.flatnonzero(labels == cluster)
+            medoid = int(members[np.argmax(similarity[members])])
+            ranked = [int(i) for i in members[np.argsort(-scores[members], kind='stable')] if i != medoid]
+            candidates[cluster] = [medoid] + ranked
+
+        budget = self.max_chars
+        limit = max_items or len(tweets)
+        chosen = []
+
+        # 1巡目: 各クラスタのメドイド（大きいクラスタから）
+        for cluster in order:
+            index = candidates[cluster][0]
+            if costs[index] <= budget and len(chosen) < limit:
+                chosen.append((cluster, index))
+                budget -= costs[index]
+
+        # 2巡目以降: クラスタサイズに比例した枠で高反応ツイートを追加
+        total = float(sizes.sum())
+        quotas = {c: budget * sizes[c] / total for c in order}
+        for cluster in order:
+            for index in candidates[cluster][1:]:
+                if len(chosen) >= limit or costs[index] > quotas[cluster]:
+                    break
+                chosen.append((cluster, index))
+                quotas[cluster] -= costs[index]
+
+        rank = {cluster: i + 1 for i, cluster in enumerate(order)}
+        chosen.sort(key=lambda ci: (rank[ci[0]], ci[1] != candidates[ci[0]][0]))
+        selected = [dict(tweets[index], cluster=rank[cluster]) for cluster, index in chosen]
+        clusters = [
+            {'id': rank[c], 'size': int(sizes[c]), 'share': round(float(sizes[c] / total), 3)}
+            for c in order
+        ]
+
+        logger.info(f"代表ツイート選定: {len(tweets)}件 → {len(selected)}件（{len(order)}クラスタ）")
+        return selected, clusters
+
+    def _cost(self, tweet):
+        text = tweet.get('text', '') or ''
+        return min(len(text), self.text_length) + _LINE_OVERHEAD
+
+    def _tfidf_matrix(self, texts):
+        """文字n-gramをハッシュ化したTF-IDF行列（行L2正規化済みCSR）"""
+        texts = [SPACE_PATTERN.sub(' ', URL_PATTERN.sub(' ', t.lower())).strip() for t in texts]
+        lengths = np.array([len(t) for t in texts], dtype=np.int64)
+
+        # 全文を区切り文字(\0)で連結し、コードポイント配列上でn-gramハッシュを一括計算
+        joined = "\0".join(texts) + "\0"
+        codes = np.frombuffer(joined.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+        doc_ids = np.repeat(np.arange(len(texts), dtype=np.int64), lengths + 1)
+        is_sep = np.concatenate(([0], np.cumsum(codes == 0)))
+
+        rows, cols = [], []
+        for n in self.ngram_sizes:
+            count = len(codes) - n + 1
+            if count <= 0:
+                continue
+            valid = (is_sep[n:n + count] - is_sep[:count]) == 0
+            hashes = np.zeros(count, dtype=np.int64)
+            for offset in range(n):
+                hashes = (hashes * _HASH_BASE + codes[offset:offset + count]) % 2147483647
+            hashes = (hashes * (n + 7)) % self.hash_dim
+            rows.append(doc_ids[:count][valid])
+            cols.append(hashes[valid])
+
+        rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+        cols = np.concatenate(cols) if cols else np.zeros(0, dtype=np.int64)
+        matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(len(texts), self.hash_dim)
+        )
+        matrix.sum_duplicates()
+
+        # サブリニアTF × スムージング付きIDF
+        matrix.data = 1.0 + np.log(matrix.data)
+        df = np.bincount(matrix.indices, minlength=self.hash_dim)
+        idf = np.log((1.0 + len(texts)) / (1.0 + df)) + 1.0
+        matrix.data *= idf[matrix.indices].astype(np.float32)
+
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sparse.diags(1.0 / norms).dot(matrix).tocsr().astype(np.float32)
+
+    def _minibatch_kmeans(self, matrix, k, batch_size=1024, iterations=60):
+        """球面ミニバッチk-means（重心は単位ベクトル）"""
+        n = matrix.shape[0]
+        init = self.rng.choice(n, size=k, replace=False)
+        centers = matrix[init].toarray()
+        counts = np.zeros(k, dtype=np.float64)
+
+        for _ in range(iterations):
+            batch = matrix[self.rng.choice(n, size=min(batch_size, n), replace=False)]
+            labels = np.asarray(batch.dot(centers.T).argmax(axis=1)).ravel()
+            batch_counts = np.bincount(labels, minlength=k).astype(np.float64)
+            indicator = sparse.csr_matrix(
+                (np.ones(len(labels), dtype=np.float32), (labels, np.arange(len(labels)))),
+                shape=(k, len(labels))
+            )
+            sums = np.asarray(indicator.dot(batch).todense())
+
+            counts += batch_counts
+            updated = batch_counts > 0
+            rate = (batch_counts[updated] / counts[updated])[:, None]
+            centers[updated] = (
+                centers[updated] * (1.0 - rate)
+                + sums[updated] / batch_counts[updated][:, None] * rate
+            )
+            norms = np.linalg.norm(centers, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centers /= norms
+
+        return centers.astype(np.float32)
+
+    def _assign(self, matrix, centers, chunk_size=8192):
+        """全ツイートを最も近い重心に割り当て（コサイン類似度）"""
+        labels = np.empty(matrix.shape[0], dtype=np.int64)
+        similarity = np.empty(matrix.shape[0], dtype=np.float32)
+        for start in range(0, matrix.shape[0], chunk_size):
+            scores = np.asarray(matrix[start:start + chunk_size].dot(centers.T))
+            labels[start:start + chunk_size] = scores.argmax(axis=1)
+            similarity[start:start + chunk_size] = scores.max(axis=1)
+        return labels, similarity
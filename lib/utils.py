@@ -1,6 +1,7 @@
 """ユーティリティ関数"""
 import re
 import os
+import itertools
 import logging
 from datetime import datetime
 from config.settings import MAX_FILENAME_LENGTH
@@ -98,3 +99,12 @@ def retry_on_failure(func, max_retries=3, delay=1):
         return None
     
     return wrapper
+
+def start_iterator(iterable):
+    """最初の要素まで取得した反復子を返す（遅延実行の開始時の例外をこの呼び出しで発生させる）"""
+    iterator = iter(iterable)
+    try:
+        first = next(iterator)
+    except StopIteration:
+        return iter(())
+    return itertools.chain([first], iterator)
@@ -4,93 +4,71 @@ import logging
 from datetime import datetime
 import subprocess
 import tempfile
-from faster_whisper import WhisperModel
-from deep_translator import GoogleTranslator
-from lib.utils import sanitize_filename
+from lib.utils import sanitize_filename, start_iterator
+from lib.whisper_registry import get_registry, auto_batch_size
+from lib.whisper_tuner import tuned_setting
+from lib.translation_engine import TranslationEngine
+from lib.download_manager import get_download_manager
+from lib.artifact_store import get_artifact_store, artifact_source_key
+from lib.caption_tracks import CaptionFetcher
+from lib.tweet_media_capture import is_tweet_url, capture_tweet_media
+from lib.parallel_transcriber import TranscribedSegment
+from lib.time_ranges import is_partial, plan_windows, select_segments, describe_windows
+from lib.language_probe import LanguageResult, is_auto, probe_language
+from lib.transcription_cache import TranscriptionCache, media_key_for_url, audio_sha256
+from lib.transcript_writer import (
+    TranscriptWriter, VttWriter, SrtWriter,
+    format_clock_timestamp, format_vtt_timestamp, format_srt_timestamp, format_txt_segment
+)
+from config.settings import (
+    AUDIO_SAMPLE_RATE, AUDIO_FORMAT, TRANSCRIPTION_MODE, TRANSCRIPTION_BATCH_SIZE,
+    TRANSCRIPTION_CACHE_ENABLED, CAPTION_TRACKS_ENABLED, TRANSCRIPTION_LANGUAGE, LANGUAGE_PROBE_FALLBACK,
+    TWEET_CAPTURE_ENABLED, ARTIFACT_STORE_ENABLED
+)
 import json
 
 logger = logging.getLogger(__name__)
 
+
+def _is_out_of_memory(error):
+    """GPU/CPUのメモリ不足による例外か"""
+    return isinstance(error, MemoryError) or "out of memory" in str(error).lower()
+
 class VideoProcessor:
     def __init__(self):
         self.whisper_model = None
+        self.model_size = "base"
         self.output_dir = None
+        self._cache = None
+        self.transcription_complete = False  # 直前の文字おこしが最後まで完了したか
+        self.transcript_writer = None  # 直前の文字おこしで逐次書き出したファイル（保存時に結合）
+        self.transcribed_windows = None  # 直前の文字おこしの対象区間（全体なら None）
+        self._section_offsets = {}  # 区間のみ取得したファイル → 元メディア上の開始秒
+        self.language_result = None  # 直前の文字おこしの言語（自動判定時は確率と判定方法も）
+        self.browser = None  # ChromeConnector（設定時はツイート動画をブラウザの通信から直接取得）
 
-    def download_youtube_video(self, youtube_url):
-        """YouTubeから動画をダウンロード（フォールバック付き）"""
+    def download_youtube_video(self, youtube_url, audio_quality="best", section=None):
+        """YouTubeから動画をダウンロード（フォールバック付き、section指定時はその区間のみ）"""
+        logger.info(f"YouTube動画ダウンロード開始: {youtube_url}")
+        return self._download(youtube_url, "youtube_video", "video", audio_quality, section)
+    
+    def initialize_whisper(self, model_size="base"):
+        """Whisperモデルを準備（プロセス内キャッシュから取得、ジョブ間で再利用）"""
         try:
-            logger.info(f"YouTube動画ダウンロード開始: {youtube_url}")
-            
-            # フォーマット優先順位リスト
-            format_options = [
-                "best[height<=720]/best[height<=480]/best",  # 主要フォーマット
-                "best[ext=mp4]/mp4/best",                    # MP4優先
-                "bestvideo+bestaudio/best",                  # 分離ストリーム
-                "worst"                                       # 最後の手段
-            ]
+            self.model_size = model_size
+            registry = get_registry()
+            device, _ = registry.default_device()
             
-            video_path = os.path.join(self.output_dir, "youtube_video.%(ext)s")
+            # GPU使用時はより大きなモデルを推奨
+            if device == "cuda" and model_size == "base":
+                logger.info("💡 GPU使用時は 'small' または 'medium' モデル推奨")
             
-            for i, format_option in enumerate(format_options):
-                logger.info(f"フォーマット試行 {i+1}/{len(format_options)}: {format_option}")
-                
-                cmd = [
-                    "yt-dlp",
-                    "--format", format_option,
-                    "--output", video_path,
-                    "--no-playlist",
-                    "--merge-output-format", "mp4",
-                    youtube_url
-                ]
-                
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
-                
-                if result.returncode == 0:
-                    # ダウンロードされたファイルを探す
-                    for file in os.listdir(self.output_dir):
-                        if file.startswith("youtube_video."):
-                            actual_path = os.path.join(self.output_dir, file)
-                            logger.info(f"YouTube動画ダウンロード完了: {actual_path}")
-                            return actual_path
-                    
-                    logger.warning(f"フォーマット{i+1}でダウンロード成功したがファイルが見つかりません")
-                else:
-                    logger.warning(f"フォーマット{i+1}失敗: {result.stderr.strip()[:100]}...")
-                    continue
+            self.whisper_model = registry.get(model_size)
+            return True
             
-            logger.error("全てのフォーマットでダウンロードに失敗しました")
-            return None
-                
         except Exception as e:
-            logger.error(f"YouTube動画ダウンロードエラー: {e}")
-            return None
-    
-    def initialize_whisper(self, model_size="base"):
-        try:
-            import torch
-            if torch.cuda.is_available():
-                device = "cuda"
-                compute_type = "float16"
-                logger.info(f"🚀 GPU使用: {torch.cuda.get_device_name(0)}")
-                logger.info(f"VRAM: {torch.cuda.get_device_properties(0).total_memory // 1024**3}GB")
-            else:
-                device = "cpu"
-                compute_type = "int8"
-                logger.info("💻 CPU使用（CUDA未対応）")
-        except ImportError:
-            device = "cpu"
-            compute_type = "int8"
-            logger.info("💻 CPU使用（PyTorch未インストール）")
-        
-        # GPU使用時はより大きなモデルを推奨
-        if device == "cuda" and model_size == "base":
-            logger.info("💡 GPU使用時は 'small' または 'medium' モデル推奨")
-        
-        self.whisper_model = WhisperModel(
-            model_size, 
-            device=device, 
-            compute_type=compute_type
-        )
+            logger.error(f"Whisper初期化エラー: {e}")
+            return False
     
     def setup_output_directory(self, query):
         """出力ディレクトリ設定"""
@@ -100,54 +78,132 @@ class VideoProcessor:
         
         self.output_dir = os.path.join("output", "query", today, f"{timestamp}_{safe_query}_video")
         os.makedirs(self.output_dir, exist_ok=True)
+        self.language_result = None
         logger.info(f"動画出力ディレクトリ: {self.output_dir}")
         return self.output_dir
     
-    def download_video_from_tweet(self, tweet_url):
-        """ツイートから動画をダウンロード"""
+    def download_video_from_tweet(self, tweet_url, section=None):
+        """ツイートから動画をダウンロード（section指定時はその区間のみ）"""
+        logger.info(f"動画ダウンロード開始: {tweet_url}")
+        return self._download(tweet_url, "video", "video", section=section)
+    
+    def download_audio(self, media_url, basename="audio", section=None):
+        """音声のみをダウンロードしてWhisper用（16kHzモノラル）に変換（section指定時はその区間のみ）"""
         try:
-            logger.info(f"動画ダウンロード開始: {tweet_url}")
+            logger.info(f"音声のみダウンロード開始: {media_url}")
             
-            # yt-dlpで動画ダウンロード
-            video_path = os.path.join(self.output_dir, "video.%(ext)s")
+            source_path = self._download(media_url, f"{basename}_source", "audio", section=section)
+            if not source_path:
+                return None
             
-            cmd = [
-                "yt-dlp",
-                "--format", "best[ext=mp4]/best",
-                "--output", video_path,
-                "--no-playlist",
-                tweet_url
-            ]
+            audio_path = os.path.join(self.output_dir, f"{basename}.{AUDIO_FORMAT}")
+            if not self.convert_audio_for_whisper(source_path, audio_path):
+                return None
             
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+            get_download_manager().discard(source_path)
+            if source_path in self._section_offsets:
+                self._section_offsets[audio_path] = self._section_offsets.pop(source_path)
+            logger.info(f"音声ダウンロード完了: {audio_path}")
+            return audio_path
             
-            if result.returncode == 0:
-                # ダウンロードされたファイルを探す
-                for file in os.listdir(self.output_dir):
-                    if file.startswith("video."):
-                        actual_path = os.path.join(self.output_dir, file)
-                        logger.info(f"動画ダウンロード完了: {actual_path}")
-                        return actual_path
-                
-                logger.error("ダウンロードファイルが見つかりません")
-                return None
-            else:
-                logger.error(f"yt-dlpエラー: {result.stderr}")
-                return None
-                
         except Exception as e:
-            logger.error(f"動画ダウンロードエラー: {e}")
+            logger.error(f"音声ダウンロードエラー: {e}")
             return None
     
-    def transcribe_video(self, video_path, language="ja", use_timestamps=True, progress_callback=None):
-        """動画を文字おこし（リアルタイム進捗表示付き）"""
+    def _ytdlp_client(self):
+        """プロセス内のyt-dlp（ダウンロードマネージャーと共有し、メディア情報の取得を1回に）"""
+        return get_download_manager().client()
+    
+    def _download(self, media_url, basename, kind, quality="best", section=None):
+        """ダウンロード（失敗時は None）
+
+        動画は内容ごとにメディア保存領域へ1つだけ保存し、同じ動画を再度取得するときは
+        ダウンロードせずに実行フォルダへ配置する（区間指定時は対象外）。
+        """
+        store = self._artifact_store() if kind == "video" and not section else None
+        source_key = artifact_source_key(media_url, kind, quality) if store else None
+        if source_key:
+            path = store.checkout(source_key, self.output_dir, basename)
+            if path:
+                logger.info(f"保存済みの動画を使用（ダウンロードをスキップ）: {path}")
+                return path
+
+        path = self._fetch_media(media_url, basename, kind, quality, section)
+        if path and store:
+            try:
+                path = store.ingest(path, source_key)
+            except Exception as e:
+                logger.warning(f"メディア保存領域への登録エラー: {e}")
+        return path
+    
+    def _fetch_media(self, media_url, basename, kind, quality="best", section=None):
+        """ダウンロードマネージャー経由でダウンロード（失敗時は None）
+
+        section: (開始秒, 終了秒)。区間のみの取得に対応していない配信元では全体を取得し、
+        文字おこし時にffmpegで該当区間へシークする。
+        """
+        # ツイートは表示中のブラウザが読み込んだ動画URLを優先（区間指定時も全体を取得してシーク）
+        if self.browser and TWEET_CAPTURE_ENABLED and is_tweet_url(media_url):
+            path = capture_tweet_media(self.browser, media_url, self.output_dir, basename, kind)
+            if path:
+                return path
+        manager = get_download_manager()
+        if section:
+            # 全体や別の区間のダウンロード済みファイルと取り違えないよう区間ごとのファイル名にする
+            start, end = section
+            section_basename = f"{basename}_{start or 0:g}-{end:g}" if end is not None else f"{basename}_{start or 0:g}-"
+            try:
+                path = manager.download(media_url, self.output_dir, section_basename, kind, quality, section)
+                self._section_offsets[path] = section[0] or 0.0
+                logger.info(f"区間のみ取得: {describe_windows([section])}")
+                return path
+            except Exception as e:
+                logger.warning(f"区間のみの取得に失敗（全体を取得してシークします）: {e}")
         try:
-            if not self.whisper_model:
-                if not self.initialize_whisper():
-                    return None, None
+            return manager.download(media_url, self.output_dir, basename, kind, quality)
+        except Exception as e:
+            logger.error(f"ダウンロードエラー: {e}")
+            return None
+    
+    def convert_audio_for_whisper(self, source_path, audio_path):
+        """ffmpegで16kHzモノラル音声に一度だけ変換（Whisperの入力形式）"""
+        try:
+            cmd = [
+                "ffmpeg", "-y", "-loglevel", "error",
+                "-i", source_path,
+                "-vn",
+                "-ac", "1",
+                "-ar", str(AUDIO_SAMPLE_RATE),
+                audio_path
+            ]
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
+            if result.returncode != 0:
+                logger.error(f"音声変換エラー: {result.stderr.strip()[:200]}")
+                return False
+            return True
             
+        except Exception as e:
+            logger.error(f"音声変換エラー: {e}")
+            return False
+    
+    def transcribe_video(self, video_path, language=TRANSCRIPTION_LANGUAGE, use_timestamps=True, progress_callback=None,
+                         transcription_mode=None, batch_size=None, start=None, end=None, skim=False):
+        """動画を文字おこし（リアルタイム進捗表示付き）
+
+        transcription_mode: "sequential"（単一モデル）、"parallel"（無音区間で分割して並列処理）
+        または "batched"（複数の音声窓をまとめて推論）。未指定時は設定値 TRANSCRIPTION_MODE を使用。
+        batch_size: batched方式のバッチサイズ（未指定時は設定値、それもなければ空きメモリから決定）
+        start / end: 文字おこしする範囲（秒、元メディア上の時刻）。未指定なら先頭から／末尾まで
+        skim: 範囲内の等間隔の区間だけを文字おこし（概要把握用）
+        language: "auto" の場合は数か所の短い区間で言語を判定してから全体を文字おこし
+        """
+        try:
+            self.transcript_writer = None
+            self.transcribed_windows = None
+            mode = transcription_mode or TRANSCRIPTION_MODE
             logger.info(f"文字おこし開始: {video_path}")
             logger.info(f"タイムスタンプ: {'有効' if use_timestamps else '無効'}")
+            logger.info(f"文字おこし方式: {mode}")
             
             # ファイル存在・サイズチェック
             if not os.path.exists(video_path):
@@ -162,97 +218,517 @@ class VideoProcessor:
             if duration:
                 logger.info(f"動画時間: {self._format_timestamp(duration)}")
             
-            # Whisperで文字おこし
-            logger.info("Whisper処理開始...")
+            language = self._resolve_language(video_path, language, duration)
             
-            try:
-                result = self.whisper_model.transcribe(
-                    video_path, 
-                    language=language,
-                    beam_size=1,
-                    word_timestamps=False,
-                    vad_filter=True,
-                    vad_parameters=dict(min_silence_duration_ms=500)
-                )
-                
-                # 結果の形式を確認
-                if isinstance(result, tuple) and len(result) == 2:
-                    segments, info = result
-                    logger.info("Whisper処理完了、結果を整理中...")
-                elif hasattr(result, '__iter__'):
-                    # イテレータの場合
-                    segments = result
-                    info = None
-                    logger.info("Whisper処理完了（イテレータ形式）、結果を整理中...")
-                else:
-                    logger.error(f"予期しないWhisper結果形式: {type(result)}")
+            if is_partial(start, end, skim):
+                # 区間のみ取得したファイルは元メディア上の開始位置を加味して区間を決める
+                offset = self._section_offsets.get(video_path, 0.0)
+                windows = plan_windows(offset + duration if duration else None, start, end, skim)
+                logger.info(f"文字おこし区間: {describe_windows(windows)}")
+                self.transcribed_windows = windows
+                segments = self._transcribe_windows(video_path, windows, offset, language, mode, batch_size)
+                duration = windows[-1][1] or duration
+            else:
+                segments = self._start_transcription(video_path, language, mode, batch_size)
+                if segments is None:
                     return None, None
-            except Exception as whisper_error:
-                logger.error(f"Whisper処理エラー: {whisper_error}")
-                return None, None
             
-            # セグメントをリアルタイム処理
-            transcription_data = []
-            full_text = ""
+            writer = self._open_transcript_writer(use_timestamps)
+            try:
+                return self._collect_segments(segments, duration, use_timestamps, progress_callback, writer)
+            finally:
+                if writer:
+                    writer.close()
+            
+        except Exception as e:
+            logger.error(f"文字おこしエラー: {e}")
+            return None, None
+    
+    def _resolve_language(self, video_path, language, duration=None):
+        """文字おこしに使う言語（自動判定の指定なら区間判定し、結果を language_result に記録）"""
+        if not is_auto(language):
+            if not self.language_result or self.language_result.language != language:
+                self.language_result = LanguageResult(language, None, "specified")
+            return language
+        
+        if not self.whisper_model and not self.initialize_whisper(self.model_size):
+            self.language_result = LanguageResult(LANGUAGE_PROBE_FALLBACK, None, "fallback")
+        else:
+            self.language_result = probe_language(self.whisper_model, video_path, duration)
+        return self.language_result.language
+    
+    def _cached_language(self, cache, keys):
+        """判定済みの言語（なければ None）"""
+        for key in filter(None, keys):
+            cached = cache.get_language(key)
+            if cached:
+                language, probability = cached
+                logger.info(f"判定済みの言語を使用: {language}")
+                self.language_result = LanguageResult(language, probability, "cache")
+                return language
+        return None
+    
+    def _start_transcription(self, video_path, language, mode, batch_size=None):
+        """方式に応じて文字おこしを開始（並列・バッチを開始できなければ単一モデルで処理）"""
+        segments = None
+        if mode == "parallel":
+            segments = self._transcribe_parallel(video_path, language)
+        elif mode == "batched":
+            segments = self._transcribe_batched(video_path, language, batch_size)
+        
+        if segments is None:
+            segments = self._transcribe_sequential(video_path, language)
+        return segments
+    
+    def _transcribe_windows(self, video_path, windows, offset, language, mode, batch_size=None):
+        """区間ごとにffmpegで切り出して文字おこしし、元メディア上の時刻で返す"""
+        for index, (window_start, window_end) in enumerate(windows):
+            section_path = os.path.join(self.output_dir, f"section_{index}.{AUDIO_FORMAT}")
+            if not self._extract_section(video_path, section_path, max(0.0, window_start - offset),
+                                         None if window_end is None else window_end - offset):
+                raise RuntimeError(f"区間の切り出しに失敗しました: {describe_windows([(window_start, window_end)])}")
+            try:
+                segments = self._start_transcription(section_path, language, mode, batch_size)
+                if segments is None:
+                    raise RuntimeError("Whisperを開始できません")
+                for segment in segments:
+                    yield TranscribedSegment(
+                        round(float(segment.start) + window_start, 2),
+                        round(float(segment.end) + window_start, 2),
+                        segment.text
+                    )
+            finally:
+                try:
+                    os.remove(section_path)
+                except OSError:
+                    pass
+    
+    def _extract_section(self, source_path, section_path, start, end=None):
+        """ffmpegで区間へシークしてWhisper用（16kHzモノラル）に切り出し"""
+        try:
+            cmd = ["ffmpeg", "-y", "-loglevel", "error", "-ss", f"{start:.3f}", "-i", source_path]
+            if end is not None:
+                cmd += ["-t", f"{max(0.0, end - start):.3f}"]
+            cmd += ["-vn", "-ac", "1", "-ar", str(AUDIO_SAMPLE_RATE), section_path]
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
+            if result.returncode != 0:
+                logger.error(f"区間切り出しエラー: {result.stderr.strip()[:200]}")
+                return False
+            return os.path.exists(section_path)
+        except Exception as e:
+            logger.error(f"区間切り出しエラー: {e}")
+            return False
+    
+    def _transcribe_sequential(self, video_path, language):
+        """単一モデルで全体を文字おこし（セグメントのイテレータを返す）"""
+        if not self.whisper_model:
+            if not self.initialize_whisper(self.model_size):
+                return None
+        
+        # Whisperで文字おこし
+        logger.info("Whisper処理開始...")
+        
+        try:
+            result = self.whisper_model.transcribe(
+                video_path, 
+                language=language,
+                beam_size=1,
+                word_timestamps=False,
+                vad_filter=True,
+                vad_parameters=dict(min_silence_duration_ms=500)
+            )
+            
+            # 結果の形式を確認
+            if isinstance(result, tuple) and len(result) == 2:
+                segments, info = result
+                logger.info("Whisper処理完了、結果を整理中...")
+            elif hasattr(result, '__iter__'):
+                # イテレータの場合
+                segments = result
+                logger.info("Whisper処理完了（イテレータ形式）、結果を整理中...")
+            else:
+                logger.error(f"予期しないWhisper結果形式: {type(result)}")
+                return None
+            return segments
+        except Exception as whisper_error:
+            logger.error(f"Whisper処理エラー: {whisper_error}")
+            return None
+    
+    def _transcribe_parallel(self, video_path, language):
+        """無音区間で分割して複数プロセスで文字おこし（失敗時は None で通常処理へ）"""
+        try:
+            from lib.parallel_transcriber import ParallelTranscriber
+            transcriber = ParallelTranscriber(self.model_size)
+            return transcriber.transcribe(
+                video_path,
+                language=language,
+                beam_size=1,
+                word_timestamps=False,
+                vad_filter=True,
+                vad_parameters=dict(min_silence_duration_ms=500)
+            )
+        except Exception as e:
+            logger.warning(f"並列文字おこしを開始できません（通常処理に切り替え）: {e}")
+            return None
+    
+    def _transcribe_batched(self, video_path, language, batch_size=None):
+        """faster-whisperのバッチ推論で文字おこし（失敗時は None で通常処理へ）"""
+        try:
+            if not self.whisper_model:
+                if not self.initialize_whisper(self.model_size):
+                    return None
+            
+            from faster_whisper import BatchedInferencePipeline
+            batch_size = (batch_size or TRANSCRIPTION_BATCH_SIZE or self._tuned_batch_size()
+                          or auto_batch_size(self.model_size))
+            logger.info(f"バッチ推論開始: バッチサイズ {batch_size}")
             
-            logger.info("📝 文字おこし結果（リアルタイム）:")
-            logger.info("=" * 50)
+            pipeline = BatchedInferencePipeline(model=self.whisper_model)
+            while True:
+                try:
+                    segments, _ = pipeline.transcribe(
+                        video_path,
+                        language=language,
+                        beam_size=1,
+                        word_timestamps=False,
+                        vad_filter=True,
+                        vad_parameters=dict(min_silence_duration_ms=500),
+                        batch_size=batch_size
+                    )
+                    # 推論は反復時に実行されるため、最初のバッチまで処理して失敗をここで検出
+                    return start_iterator(segments)
+                except Exception as e:
+                    if batch_size <= 1 or not _is_out_of_memory(e):
+                        raise
+                    batch_size //= 2
+                    logger.warning(f"バッチ推論でメモリ不足（バッチサイズ {batch_size} で再試行）: {e}")
+        except Exception as e:
+            logger.warning(f"バッチ推論を開始できません（通常処理に切り替え）: {e}")
+            return None
+    
+    def _tuned_batch_size(self):
+        """このハードウェアで計測済みのバッチサイズ（batched方式で最適だった場合のみ）"""
+        tuned = tuned_setting(self.model_size)
+        if tuned and (tuned.get('batch_size') or 1) > 1:
+            return tuned['batch_size']
+        return None
+    
+    def transcribe_stream(self, media_url, language=TRANSCRIPTION_LANGUAGE, use_timestamps=True, progress_callback=None,
+                          basename="audio"):
+        """ダウンロードしながら文字おこし（字幕ファイルも逐次書き出し）
+
+        Returns:
+            (音声ファイルパス, 文字おこしテキスト, セグメント) / 失敗時は (None, None, None)
+        """
+        try:
+            self.transcript_writer = None
+            if not self.whisper_model:
+                if not self.initialize_whisper(self.model_size):
+                    return None, None, None
+            
+            from lib.streaming_transcriber import StreamingTranscriber
+            logger.info(f"ストリーミング文字おこし開始: {media_url}")
             
+            audio_path = os.path.join(self.output_dir, f"{basename}.{AUDIO_FORMAT}")
+            transcriber = StreamingTranscriber(self.whisper_model)
+            segments = transcriber.transcribe_url(
+                media_url,
+                language=language,
+                audio_path=audio_path,
+                beam_size=1,
+                word_timestamps=False,
+                vad_filter=True,
+                vad_parameters=dict(min_silence_duration_ms=500)
+            )
+            
+            writer = self._open_transcript_writer(use_timestamps)
             try:
-                for i, segment in enumerate(segments):
-                    # セグメントデータ作成
-                    segment_data = {
-                        "start": round(float(segment.start), 2),
-                        "end": round(float(segment.end), 2),
-                        "text": str(segment.text).strip()
-                    }
-                    
-                    transcription_data.append(segment_data)
-                    
-                    # リアルタイムでログに出力
-                    start_time = self._format_timestamp(segment.start)
-                    end_time = self._format_timestamp(segment.end)
-                    segment_text = segment.text.strip()
-                    
-                    # ログに表示
-                    logger.info(f"[{start_time}-{end_time}] {segment_text}")
-                    
-                    # プログレス用コールバック（GUIへの通知）
-                    if progress_callback:
-                        progress_info = {
-                            'segment_index': i + 1,
-                            'total_segments': 'unknown',  # 事前に分からない
-                            'current_time': segment.end,
-                            'duration': duration,
-                            'text': segment_text,
-                            'timestamp': f"[{start_time}-{end_time}]"
-                        }
-                        progress_callback(progress_info)
-                    
-                    # フルテキスト構築
-                    if use_timestamps:
-                        full_text += f"[{start_time}-{end_time}] {segment_text}\n"
-                    else:
-                        full_text += segment_text + " "
-                    
-                    # 処理制限（安全装置）
-                    if i > 1000:
-                        logger.warning(f"セグメント数が多いため {i+1} 個で処理を終了します")
-                        break
-                        
-            except Exception as e:
-                logger.error(f"セグメント処理エラー: {e}")
-                if not transcription_data:
-                    return None, None
+                transcription_text, segments_data = self._collect_segments(
+                    segments, None, use_timestamps, progress_callback, writer
+                )
+            finally:
+                if writer:
+                    writer.close()
+            
+            if is_auto(language):
+                # ストリーミングでは全体を先に読めないため最初の窓で判定
+                language = transcriber.language or LANGUAGE_PROBE_FALLBACK
+                self.language_result = LanguageResult(language, transcriber.language_probability, "stream")
+            else:
+                self.language_result = LanguageResult(language, None, "specified")
             
-            logger.info("=" * 50)
-            logger.info(f"✅ 文字おこし完了: {len(transcription_data)}セグメント")
+            if not os.path.exists(audio_path):
+                audio_path = None
+            if segments_data and audio_path and self.transcription_complete:
+                self._store_in_cache(media_url, audio_path, language, segments_data)
             
-            return full_text.strip(), transcription_data
+            return audio_path, transcription_text, segments_data
             
         except Exception as e:
-            logger.error(f"文字おこしエラー: {e}")
+            logger.error(f"ストリーミング文字おこしエラー: {e}")
+            return None, None, None
+    
+    def _open_transcript_writer(self, use_timestamps):
+        """出力ディレクトリへの逐次書き出しを開始（異常終了しても途中までの結果が残る）"""
+        if not self.output_dir:
+            return None
+        try:
+            self.transcript_writer = TranscriptWriter(self.output_dir, use_timestamps)
+        except Exception as e:
+            logger.warning(f"逐次書き出しを開始できません（保存時にまとめて書き出します）: {e}")
+            self.transcript_writer = None
+        return self.transcript_writer
+    
+    def _collect_segments(self, segments, duration, use_timestamps, progress_callback, writer=None):
+        """セグメントを順に受け取り、ログ・進捗通知・テキスト構築を行う
+
+        writer指定時は書き出し先だけに蓄積し、戻り値のセグメントとテキストは書き出したファイルから作る。
+        """
+        transcription_data = [] if writer is None else None
+        count = 0
+        self.transcription_complete = False
+        
+        logger.info("📝 文字おこし結果（リアルタイム）:")
+        logger.info("=" * 50)
+        
+        try:
+            for i, segment in enumerate(segments):
+                # セグメントデータ作成
+                segment_data = {
+                    "start": round(float(segment.start), 2),
+                    "end": round(float(segment.end), 2),
+                    "text": str(segment.text).strip()
+                }
+                
+                if writer:
+                    writer.write(segment_data)
+                else:
+                    transcription_data.append(segment_data)
+                count += 1
+                
+                # リアルタイムでログに出力
+                start_time = self._format_timestamp(segment.start)
+                end_time = self._format_timestamp(segment.end)
+                segment_text = segment.text.strip()
+                
+                # ログに表示
+                logger.info(f"[{start_time}-{end_time}] {segment_text}")
+                
+                # プログレス用コールバック（GUIへの通知）
+                if progress_callback:
+                    progress_info = {
+                        'segment_index': i + 1,
+                        'total_segments': 'unknown',  # 事前に分からない
+                        'current_time': segment.end,
+                        'duration': duration,
+                        'text': segment_text,
+                        'timestamp': f"[{start_time}-{end_time}]"
+                    }
+                    progress_callback(progress_info)
+            
+            self.transcription_complete = True
+                    
+        except Exception as e:
+            logger.error(f"セグメント処理エラー: {e}")
+            if not count:
+                return None, None
+        
+        logger.info("=" * 50)
+        logger.info(f"✅ 文字おこし完了: {count}セグメント")
+        
+        if writer:
+            writer.close()
+            transcription_data = writer.segments()
+        # フルテキスト構築
+        return self._segments_to_text(transcription_data, use_timestamps).strip(), transcription_data
+    
+    def cached_transcription(self, media_url, language=TRANSCRIPTION_LANGUAGE, use_timestamps=True):
+        """メディアIDで文字おこしキャッシュを検索（見つからなければ (None, None)）
+
+        言語が自動判定の場合は、判定済みの言語の結果を探す。
+        """
+        cache = self._transcription_cache()
+        if not cache:
             return None, None
+        try:
+            media_key = media_key_for_url(media_url)
+            if is_auto(language):
+                language = self._cached_language(cache, [media_key])
+                if not language:
+                    return None, None
+            else:
+                self.language_result = LanguageResult(language, None, "specified")
+            segments_data = cache.get_transcript(media_key, self.model_size, language)
+        except Exception as e:
+            logger.warning(f"文字おこしキャッシュ参照エラー: {e}")
+            return None, None
+        if not segments_data:
+            return None, None
+        logger.info(f"文字おこしキャッシュ使用: {media_url}（{self.model_size}/{language}）")
+        self.transcribed_windows = None
+        return self._segments_to_text(segments_data, use_timestamps), segments_data
+    
+    def cached_audio(self, media_url):
+        """取得済みの音声ファイル（モデル変更時の再ダウンロード回避用、なければ None）"""
+        cache = self._transcription_cache()
+        if not cache:
+            return None
+        try:
+            audio_path = cache.get_audio(media_key_for_url(media_url))
+        except Exception as e:
+            logger.warning(f"文字おこしキャッシュ参照エラー: {e}")
+            return None
+        if audio_path:
+            logger.info(f"取得済み音声を再利用: {audio_path}")
+        return audio_path
+    
+    def fetch_captions(self, media_url, language=TRANSCRIPTION_LANGUAGE, use_timestamps=True,
+                       start=None, end=None, skim=False):
+        """字幕トラック（投稿者の字幕・自動生成字幕）があればセグメントとして取得（なければ (None, None)）
+
+        start / end / skim 指定時は対象区間に重なるセグメントだけを使う。
+        言語が自動判定の場合は、判定済みの言語かメディア情報の言語の字幕を探す。
+        """
+        if not CAPTION_TRACKS_ENABLED:
+            return None, None
+        source = "specified"
+        if is_auto(language):
+            language = self._media_language(media_url)
+            if not language:
+                logger.info("メディアの言語が不明のため字幕トラックは使用しません")
+                return None, None
+            source = "captions"
+        track = CaptionFetcher(self._ytdlp_client()).fetch(media_url, language)
+        if not track:
+            return None, None
+        return self.use_caption_track(track, use_timestamps, start, end, skim, source)
+    
+    def use_caption_track(self, track, use_timestamps=True, start=None, end=None, skim=False, source="captions"):
+        """取得済みの字幕トラック（yt-dlp・ページのいずれか）を文字おこし結果として使う
+
+        start / end / skim 指定時は対象区間に重なるセグメントだけを使う（なければ (None, None)）。
+        """
+        segments = track.segments
+        windows = None
+        if is_partial(start, end, skim):
+            try:
+                windows = plan_windows(segments[-1]['end'], start, end, skim)
+            except ValueError as e:
+                logger.error(f"範囲指定エラー: {e}")
+                return None, None
+            segments = select_segments(segments, windows)
+            if not segments:
+                logger.info("指定範囲に字幕がありません")
+                return None, None
+            logger.info(f"字幕の対象区間: {describe_windows(windows)}（{len(segments)}セグメント）")
+        
+        self.transcript_writer = None
+        self.transcribed_windows = windows
+        self.language_result = LanguageResult(track.language, None, source) if track.language else None
+        return self._segments_to_text(segments, use_timestamps), segments
+    
+    def _media_language(self, media_url):
+        """判定済みの言語、なければyt-dlpのメディア情報にある言語（不明なら None）"""
+        cache = self._transcription_cache()
+        if cache:
+            try:
+                cached = cache.get_language(media_key_for_url(media_url))
+                if cached:
+                    return cached[0]
+            except Exception as e:
+                logger.warning(f"文字おこしキャッシュ参照エラー: {e}")
+        client = self._ytdlp_client()
+        if not client:
+            return None
+        try:
+            return (client.extract(media_url).get('language') or "").split("-")[0] or None
+        except Exception as e:
+            logger.debug(f"メディア情報の言語取得エラー: {e}")
+            return None
+    
+    def transcribe_with_cache(self, audio_path, media_url, language=TRANSCRIPTION_LANGUAGE, use_timestamps=True,
+                              progress_callback=None, transcription_mode=None, start=None, end=None, skim=False):
+        """音声ハッシュでキャッシュを確認し、なければ文字おこしして結果を記録
+
+        範囲指定・スキム時は全体の結果ではないため、キャッシュを参照・記録しない。
+        """
+        cache = self._transcription_cache()
+        if not cache or is_partial(start, end, skim):
+            return self.transcribe_video(
+                audio_path, language=language, use_timestamps=use_timestamps,
+                progress_callback=progress_callback, transcription_mode=transcription_mode,
+                start=start, end=end, skim=skim
+            )
+        
+        self.transcript_writer = None
+        media_key = media_key_for_url(media_url)
+        sha256 = None
+        try:
+            sha256 = audio_sha256(audio_path)
+            cache.put_audio([media_key, f"sha256:{sha256}"], audio_path, sha256)
+            if is_auto(language):
+                language = self._cached_language(cache, [media_key, f"sha256:{sha256}"]) or language
+            segments_data = None
+            if not is_auto(language):
+                segments_data = cache.get_transcript(f"sha256:{sha256}", self.model_size, language)
+            if segments_data:
+                logger.info(f"文字おこしキャッシュ使用（音声ハッシュ一致）: {sha256[:12]}")
+                self._resolve_language(audio_path, language)
+                cache.put_transcript([media_key], self.model_size, language, segments_data, sha256)
+                return self._segments_to_text(segments_data, use_timestamps), segments_data
+        except Exception as e:
+            logger.warning(f"文字おこしキャッシュ参照エラー: {e}")
+        
+        transcription_text, segments_data = self.transcribe_video(
+            audio_path, language=language, use_timestamps=use_timestamps,
+            progress_callback=progress_callback, transcription_mode=transcription_mode
+        )
+        
+        # 途中で打ち切られた結果はキャッシュしない
+        if segments_data and self.transcription_complete:
+            self._store_in_cache(media_url, audio_path, self.language_result.language, segments_data, sha256)
+        
+        return transcription_text, segments_data
+    
+    def _store_in_cache(self, media_url, audio_path, language, segments_data, sha256=None):
+        """文字おこし結果と音声の所在をメディアID・音声ハッシュで記録"""
+        cache = self._transcription_cache()
+        if not cache:
+            return
+        try:
+            sha256 = sha256 or audio_sha256(audio_path)
+            keys = [media_key_for_url(media_url), f"sha256:{sha256}"]
+            cache.put_audio(keys, audio_path, sha256)
+            cache.put_transcript(keys, self.model_size, language, segments_data, sha256)
+            result = self.language_result
+            if result and result.source in ("probe", "stream") and result.language == language:
+                cache.put_language(keys, language, result.probability)
+        except Exception as e:
+            logger.warning(f"文字おこしキャッシュ保存エラー: {e}")
+    
+    def _transcription_cache(self):
+        if not TRANSCRIPTION_CACHE_ENABLED:
+            return None
+        if self._cache is None:
+            try:
+                self._cache = TranscriptionCache()
+            except Exception as e:
+                logger.warning(f"文字おこしキャッシュを開けません: {e}")
+                return None
+        return self._cache
+    
+    def _artifact_store(self):
+        """メディア保存領域（無効・開けない場合は None）"""
+        return get_artifact_store() if ARTIFACT_STORE_ENABLED else None
+    
+    def _segments_to_text(self, segments_data, use_timestamps=True):
+        """保存済みセグメントから文字おこしテキストを再構成"""
+        if use_timestamps:
+            return "\n".join(
+                f"[{self._format_timestamp(seg['start'])}-{self._format_timestamp(seg['end'])}] {seg['text']}"
+                for seg in segments_data
+            )
+        return " ".join(seg['text'] for seg in segments_data)
     
     def translate_text(self, text, target_language="en"):
         """テキスト翻訳"""
@@ -262,8 +738,8 @@ class VideoProcessor:
             
             logger.info(f"翻訳開始: {target_language}")
             
-            translator = GoogleTranslator(source='auto', target=target_language)
-            translated = translator.translate(text)
+            # 行単位でバッチ化して翻訳（長文でもバックエンドの上限を超えない）
+            translated = TranslationEngine(target_language).translate_text(text)
             
             logger.info("翻訳完了")
             return translated
@@ -272,6 +748,31 @@ class VideoProcessor:
             logger.error(f"翻訳エラー: {e}")
             return text  # 翻訳失敗時は元のテキストを返す
     
+    def translate_segments(self, segments_data, target_language="en"):
+        """セグメント単位で翻訳し、元の時刻に揃えた翻訳字幕（subtitles.<言語>.vtt / .srt）も作成
+
+        Returns:
+            翻訳テキスト（セグメントごとに改行区切り）。失敗時は None
+        """
+        try:
+            logger.info(f"セグメント翻訳開始: {len(segments_data)}件 → {target_language}")
+            translated_segments = TranslationEngine(target_language).translate_segments(segments_data)
+            
+            if self.output_dir:
+                self._create_vtt_file(
+                    translated_segments, os.path.join(self.output_dir, f"subtitles.{target_language}.vtt")
+                )
+                self._create_srt_file(
+                    translated_segments, os.path.join(self.output_dir, f"subtitles.{target_language}.srt")
+                )
+            
+            logger.info("セグメント翻訳完了")
+            return "\n".join(segment['text'] for segment in translated_segments)
+            
+        except Exception as e:
+            logger.error(f"セグメント翻訳エラー: {e}")
+            return None
+    
     def save_transcription(self, video_path, transcription_text, segments_data, video_url, translation=None, use_timestamps=True, video_info=None):
         """文字おこし結果を保存（互換性維持 + 新機能対応）"""
         try:
@@ -296,6 +797,11 @@ class VideoProcessor:
         try:
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
+            # 文字おこし中に逐次書き出したセグメントがあればそれを結合（全件を再生成しない）
+            streamed = self.transcript_writer
+            if not (segments_data and streamed and streamed.closed and streamed.use_timestamps == use_timestamps):
+                streamed = None
+            
             # テキストファイル保存
             text_file = os.path.join(self.output_dir, "transcription.txt")
             with open(text_file, 'w', encoding='utf-8') as f:
@@ -306,6 +812,10 @@ class VideoProcessor:
                 f.write(f"処理日時: {timestamp}\n")
                 f.write(f"文字数: {len(transcription_text)}\n")
                 f.write(f"タイムスタンプ: {'有効' if use_timestamps else '無効'}\n")
+                if self.transcribed_windows:
+                    f.write(f"文字おこし区間: {describe_windows(self.transcribed_windows)}\n")
+                if self.language_result:
+                    f.write(f"言語: {self._describe_language()}\n")
                 
                 if video_info:
                     f.write(f"動画タイトル: {video_info.get('title', '不明')}\n")
@@ -323,29 +833,19 @@ class VideoProcessor:
                     f.write(translation)
                     f.write("\n\n")
                 
-                if use_timestamps and segments_data:
-                    f.write("【詳細タイムスタンプ】\n")
-                    for segment in segments_data:
-                        start_time = self._format_timestamp(segment['start'])
-                        end_time = self._format_timestamp(segment['end'])
-                        f.write(f"[{start_time} - {end_time}] {segment['text']}\n")
-                        
-                        # 単語レベルタイムスタンプ（利用可能な場合）
-                        if 'words' in segment and segment['words']:
-                            f.write("  単語別タイムスタンプ:\n")
-                            for word_data in segment['words']:
-                                word_start = self._format_timestamp(word_data['start'])
-                                word_end = self._format_timestamp(word_data['end'])
-                                probability = word_data['probability']
-                                f.write(f"    [{word_start}-{word_end}] {word_data['word']} (信頼度: {probability})\n")
-                            f.write("\n")
-                elif segments_data:
-                    f.write("【セグメント一覧（タイムスタンプなし）】\n")
-                    for i, segment in enumerate(segments_data, 1):
-                        f.write(f"{i:3d}. {segment['text']}\n")
-            
-            # 字幕ファイル作成（タイムスタンプ有効時のみ）
-            if use_timestamps and segments_data:
+                if segments_data:
+                    if use_timestamps:
+                        f.write("【詳細タイムスタンプ】\n")
+                    else:
+                        f.write("【セグメント一覧（タイムスタンプなし）】\n")
+                    if streamed:
+                        streamed.copy_txt_segments(f)
+                    else:
+                        for i, segment in enumerate(segments_data, 1):
+                            f.write(format_txt_segment(i, segment, use_timestamps))
+            
+            # 字幕ファイル作成（タイムスタンプ有効時のみ、逐次書き出し済みなら不要）
+            if use_timestamps and segments_data and not streamed:
                 try:
                     vtt_file = os.path.join(self.output_dir, "subtitles.vtt")
                     self._create_vtt_file(segments_data, vtt_file)
@@ -366,12 +866,25 @@ class VideoProcessor:
                 "use_timestamps": use_timestamps,
                 "video_info": video_info,
                 "transcription": transcription_text,
-                "translation": translation,
-                "segments": segments_data
+                "translation": translation
             }
+            if self.language_result:
+                json_data["language"] = self.language_result.language
+                json_data["language_probability"] = self.language_result.probability
+                json_data["language_source"] = self.language_result.source
+            if self.transcribed_windows:
+                json_data["time_windows"] = [
+                    {"start": window_start, "end": window_end} for window_start, window_end in self.transcribed_windows
+                ]
             
-            with open(json_file, 'w', encoding='utf-8') as f:
-                json.dump(json_data, f, ensure_ascii=False, indent=2)
+            if streamed:
+                # ヘッダーを確定させ、逐次書き出したセグメント配列と結合
+                streamed.finalize_json(json_file, json_data)
+                streamed.cleanup()
+            else:
+                json_data["segments"] = list(segments_data or [])
+                with open(json_file, 'w', encoding='utf-8') as f:
+                    json.dump(json_data, f, ensure_ascii=False, indent=2)
             
             logger.info(f"文字おこし結果保存: {text_file}")
             
@@ -384,11 +897,31 @@ class VideoProcessor:
     
 
         
+    def _describe_language(self):
+        result = self.language_result
+        labels = {
+            "probe": "自動判定", "stream": "自動判定（冒頭）", "cache": "判定済み",
+            "captions": "字幕トラック", "specified": "指定", "fallback": "判定不可のため既定値",
+        }
+        label = labels.get(result.source, result.source)
+        if result.probability is not None:
+            return f"{result.language}（{label}、確率 {result.probability:.2f}）"
+        return f"{result.language}（{label}）"
+
     def get_video_info(self, video_url):
         """動画の基本情報を取得"""
         try:
             logger.info(f"動画情報取得: {video_url}")
             
+            client = self._ytdlp_client()
+            if client:
+                try:
+                    info = client.video_info(video_url)
+                    logger.info(f"動画情報: {info}")
+                    return info
+                except Exception as e:
+                    logger.warning(f"プロセス内の情報取得失敗（CLIで再試行）: {e}")
+            
             cmd = [
                 "yt-dlp",
                 "--print", "title",
@@ -464,7 +997,7 @@ class VideoProcessor:
                 "video_info": video_info,
                 "transcription": transcription_text,
                 "translation": translation,
-                "segments": segments_data
+                "segments": list(segments_data or [])
             }
             
             with open(json_file, 'w', encoding='utf-8') as f:
@@ -480,15 +1013,12 @@ class VideoProcessor:
     def _create_vtt_file(self, segments_data, vtt_file):
         """VTT字幕ファイルを作成"""
         try:
-            with open(vtt_file, 'w', encoding='utf-8') as f:
-                f.write("WEBVTT\n\n")
-                
-                for i, segment in enumerate(segments_data):
-                    start_time = self._format_vtt_timestamp(segment['start'])
-                    end_time = self._format_vtt_timestamp(segment['end'])
-                    
-                    f.write(f"{start_time} --> {end_time}\n")
-                    f.write(f"{segment['text']}\n\n")
+            writer = VttWriter(vtt_file)
+            try:
+                for segment in segments_data:
+                    writer.write(segment)
+            finally:
+                writer.close()
             
             logger.info(f"VTTファイル作成: {vtt_file}")
             
@@ -498,14 +1028,12 @@ class VideoProcessor:
     def _create_srt_file(self, segments_data, srt_file):
         """SRT字幕ファイルを作成"""
         try:
-            with open(srt_file, 'w', encoding='utf-8') as f:
-                for i, segment in enumerate(segments_data, 1):
-                    start_time = self._format_srt_timestamp(segment['start'])
-                    end_time = self._format_srt_timestamp(segment['end'])
-                    
-                    f.write(f"{i}\n")
-                    f.write(f"{start_time} --> {end_time}\n")
-                    f.write(f"{segment['text']}\n\n")
+            writer = SrtWriter(srt_file)
+            try:
+                for segment in segments_data:
+                    writer.write(segment)
+            finally:
+                writer.close()
             
             logger.info(f"SRTファイル作成: {srt_file}")
             
@@ -514,29 +1042,15 @@ class VideoProcessor:
 
     def _format_vtt_timestamp(self, seconds):
         """VTT形式のタイムスタンプに変換"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = seconds % 60
-        return f"{hours:02d}:{minutes:02d}:{secs:06.3f}"
+        return format_vtt_timestamp(seconds)
 
     def _format_srt_timestamp(self, seconds):
         """SRT形式のタイムスタンプに変換"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        millisecs = int((seconds % 1) * 1000)
-        return f"{hours:02d}:{minutes:02d}:{secs:02d},{millisecs:03d}"
+        return format_srt_timestamp(seconds)
 
     def _format_timestamp(self, seconds):
         """mm:ss 形式のタイムスタンプに変換（拡張版）"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        
-        if hours > 0:
-            return f"{hours:02d}:{minutes:02d}:{secs:02d}"
-        else:
-            return f"{minutes:02d}:{secs:02d}"
+        return format_clock_timestamp(seconds)
         
     def _get_video_duration(self, video_path):
         """動画の時間を取得"""
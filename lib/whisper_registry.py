@@ -0,0 +1,228 @@
+"""Whisperモデルのプロセス内キャッシュ（LRU退避・バックグラウンド事前読み込み）"""
+import gc
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from config.settings import WHISPER_CACHE_MEMORY_MB, WHISPER_STATE_PATH, TRANSCRIPTION_MAX_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+# int8換算のおおよそのメモリ使用量（MB）
+MODEL_MEMORY_MB = {
+    "tiny": 80,
+    "base": 150,
+    "small": 500,
+    "medium": 1500,
+    "large": 3000,
+    "large-v2": 3000,
+    "large-v3": 3000,
+}
+COMPUTE_TYPE_FACTOR = {
+    "int8": 1.0,
+    "int8_float16": 1.3,
+    "int8_float32": 1.3,
+    "float16": 2.0,
+    "float32": 4.0,
+}
+# バッチ推論で1要素（30秒窓）あたりに追加で必要なおおよそのメモリ（MB）
+BATCH_ITEM_MEMORY_MB = {
+    "tiny": 60,
+    "base": 100,
+    "small": 200,
+    "medium": 400,
+    "large": 700,
+    "large-v2": 700,
+    "large-v3": 700,
+}
+
+
+def available_memory_mb():
+    """空きメモリ（MB）。psutilがあれば使用し、なければOSの値を参照"""
+    try:
+        import psutil
+        return psutil.virtual_memory().available / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def auto_batch_size(model_size, max_batch_size=TRANSCRIPTION_MAX_BATCH_SIZE):
+    """空きメモリの半分に収まるバッチサイズを決定（取得できなければ控えめな値）"""
+    available = available_memory_mb()
+    if available is None:
+        return min(4, max_batch_size)
+    per_item = BATCH_ITEM_MEMORY_MB.get(model_size, BATCH_ITEM_MEMORY_MB["large"])
+    return max(1, min(max_batch_size, int(available * 0.5 // per_item)))
+
+
+def detect_device():
+    """利用可能なデバイスと推奨compute_typeを判定"""
+    try:
+        import torch
+        if torch.cuda.is_available():
+            logger.info(f"🚀 GPU使用: {torch.cuda.get_device_name(0)}")
+            logger.info(f"VRAM: {torch.cuda.get_device_properties(0).total_memory // 1024**3}GB")
+            return "cuda", "float16"
+        logger.info("💻 CPU使用（CUDA未対応）")
+    except ImportError:
+        logger.info("💻 CPU使用（PyTorch未インストール）")
+    return "cpu", "int8"
+
+
+class WhisperModelRegistry:
+    """(モデルサイズ, デバイス, compute_type) をキーに読み込み済みモデルを保持"""
+
+    def __init__(self, memory_limit_mb=WHISPER_CACHE_MEMORY_MB, state_path=WHISPER_STATE_PATH):
+        self.memory_limit_mb = memory_limit_mb
+        self.state_path = state_path
+        self._models = OrderedDict()  # key -> (model, 推定MB)
+        self._lock = threading.Lock()
+        self._loading = {}  # key -> threading.Lock（同一モデルの二重読み込み防止）
+        self._device = None
+        self._device_lock = threading.Lock()
+
+    def get(self, model_size="base", device=None, compute_type=None, **model_kwargs):
+        """モデルを取得（未読み込みなら読み込んでキャッシュ）
+
+        compute_type 未指定時は、このハードウェアで計測済み（benchmark_whisper.py）の
+        compute_type・cpu_threads を使い、なければデバイスの推奨値とする。
+        """
+        if device is None or compute_type is None:
+            default_device, default_compute = self.default_device()
+            device = device or default_device
+            if compute_type is None and device == default_device:
+                tuned = self._tuned(model_size)
+                if tuned:
+                    compute_type = tuned['compute_type']
+                    if device == "cpu" and tuned.get('cpu_threads'):
+                        model_kwargs.setdefault('cpu_threads', tuned['cpu_threads'])
+            compute_type = compute_type or (default_compute if device == default_device else "int8")
+
+        key = (model_size, device, compute_type) + tuple(sorted(model_kwargs.items()))
+
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                logger.info(f"Whisperモデル再利用: {model_size} ({device}/{compute_type})")
+                self._save_last_used(model_size, device, compute_type)
+                return self._models[key][0]
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # 別スレッドが読み込み済みならそれを使う
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    return self._models[key][0]
+
+            estimate = self._estimate_mb(model_size, compute_type)
+            with self._lock:
+                self._evict_for(estimate)
+
+            logger.info(f"Whisperモデル読み込み: {model_size} ({device}/{compute_type})")
+            from faster_whisper import WhisperModel
+            model = WhisperModel(model_size, device=device, compute_type=compute_type, **model_kwargs)
+
+            with self._lock:
+                self._models[key] = (model, estimate)
+                self._loading.pop(key, None)
+            self._save_last_used(model_size, device, compute_type)
+            return model
+
+    def default_device(self):
+        """デバイス判定（初回のみ実行）"""
+        with self._device_lock:
+            if self._device is None:
+                self._device = detect_device()
+        return self._device
+
+    def warm_up_async(self, model_size=None):
+        """最後に使用したモデル（または指定モデル）をバックグラウンドで読み込む"""
+        last = self.last_used()
+        if model_size is None:
+            if not last:
+                return None
+            model_size = last["model_size"]
+            device, compute_type = last.get("device"), last.get("compute_type")
+        else:
+            device = compute_type = None
+
+        def warm():
+            try:
+                self.get(model_size, device, compute_type)
+                logger.info(f"Whisperモデル事前読み込み完了: {model_size}")
+            except Exception as e:
+                logger.warning(f"Whisperモデル事前読み込みエラー: {e}")
+
+        thread = threading.Thread(target=warm, daemon=True)
+        thread.start()
+        return thread
+
+    def last_used(self):
+        """前回使用したモデル設定"""
+        try:
+            if os.path.exists(self.state_path):
+                with open(self.state_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.debug(f"Whisper状態読み込みエラー: {e}")
+        return None
+
+    def loaded_models(self):
+        """読み込み済みモデルのキー一覧（古い順）"""
+        with self._lock:
+            return list(self._models.keys())
+
+    def clear(self):
+        """全モデルを解放"""
+        with self._lock:
+            self._models.clear()
+        gc.collect()
+
+    def _tuned(self, model_size):
+        """計測済みの設定（なければ None）"""
+        try:
+            from lib.whisper_tuner import tuned_setting
+            return tuned_setting(model_size)
+        except Exception as e:
+            logger.debug(f"Whisper調整結果の参照エラー: {e}")
+            return None
+
+    def _estimate_mb(self, model_size, compute_type):
+        base = MODEL_MEMORY_MB.get(model_size, MODEL_MEMORY_MB["large"])
+        return base * COMPUTE_TYPE_FACTOR.get(compute_type, 2.0)
+
+    def _evict_for(self, required_mb):
+        """メモリ上限を超える場合は最も古く使われたモデルから解放（ロック保持中に呼ぶ）"""
+        used = sum(mb for _, mb in self._models.values())
+        while self._models and used + required_mb > self.memory_limit_mb:
+            key, (model, mb) = self._models.popitem(last=False)
+            used -= mb
+            del model
+            logger.info(f"Whisperモデル解放（LRU）: {key[0]} ({key[1]}/{key[2]})")
+        gc.collect()
+
+    def _save_last_used(self, model_size, device, compute_type):
+        try:
+            os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+            with open(self.state_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "model_size": model_size,
+                    "device": device,
+                    "compute_type": compute_type,
+                }, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logger.debug(f"Whisper状態保存エラー: {e}")
+
+
+_registry = WhisperModelRegistry()
+
+
+def get_registry():
+    """プロセス共通のレジストリ"""
+    return _registry
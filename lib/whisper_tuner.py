@@ -0,0 +1,319 @@
+"""Whisper設定のベンチマークと自動調整（ハードウェアごとの最適な設定を保存して既定値に使用）"""
+import itertools
+import json
+import logging
+import math
+import multiprocessing
+import os
+import platform
+import re
+import threading
+import time
+import wave
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from config.settings import (
+    AUDIO_SAMPLE_RATE, WHISPER_TUNING_PATH, WHISPER_BENCHMARK_SECONDS, WHISPER_TUNING_WER_TOLERANCE
+)
+
+logger = logging.getLogger(__name__)
+
+# rtf: 処理時間 / 音声の長さ（1未満なら実時間より速い）。wer: 参照テキストがなければ None
+BenchmarkResult = namedtuple("BenchmarkResult", [
+    "model_size", "compute_type", "cpu_threads", "batch_size",
+    "load_seconds", "transcribe_seconds", "rtf", "peak_rss_mb", "wer", "error"
+])
+
+# 単語区切りのない文字（日本語・中国語）は1文字を1語として数える
+_CJK_CHAR = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff66-\uff9f]')
+_PUNCTUATION = re.compile(r'[^\w\s]')
+
+_lock = threading.Lock()
+_profile = None
+
+
+def _cpu_name():
+    try:
+        with open("/proc/cpuinfo", 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine() or "unknown"
+
+
+def _total_memory_gb():
+    try:
+        import psutil
+        return round(psutil.virtual_memory().total / 1024 ** 3)
+    except ImportError:
+        pass
+    try:
+        return round(os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') / 1024 ** 3)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def hardware_profile():
+    """調整結果を保存する単位となるハードウェア情報（キー付き、初回のみ判定）"""
+    global _profile
+    with _lock:
+        if _profile is None:
+            from lib.whisper_registry import get_registry
+            device, _ = get_registry().default_device()
+            accelerator = _cpu_name()
+            if device == "cuda":
+                try:
+                    import torch
+                    accelerator = torch.cuda.get_device_name(0)
+                except Exception:
+                    pass
+            cpu_count = os.cpu_count() or 1
+            memory_gb = _total_memory_gb()
+            _profile = {
+                'key': f"{device}|{accelerator}|{cpu_count}cpu|{memory_gb}GB",
+                'device': device,
+                'accelerator': accelerator,
+                'cpu_count': cpu_count,
+                'memory_gb': memory_gb,
+            }
+        return _profile
+
+
+def peak_rss_mb():
+    """このプロセスの最大常駐メモリ（MB、取得できなければ None）"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linuxはキロバイト、macOSはバイト単位
+        return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def _tokens(text):
+    """WER計算用の語（句読点を除き、日本語は1文字ずつ）"""
+    text = _PUNCTUATION.sub(' ', text.lower())
+    text = _CJK_CHAR.sub(lambda m: f" {m.group(0)} ", text)
+    return text.split()
+
+
+def word_error_rate(reference, hypothesis):
+    """参照テキストに対する単語誤り率（置換・削除・挿入の編集距離 / 参照の語数）"""
+    ref = _tokens(reference)
+    hyp = _tokens(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+
+    previous = list(range(len(hyp) + 1))
+    for i, ref_token in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_token in enumerate(hyp, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_token != hyp_token)
+            )
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def write_synthetic_audio(path, seconds=WHISPER_BENCHMARK_SECONDS, sample_rate=AUDIO_SAMPLE_RATE, seed=0):
+    """音声らしい（倍音と母音の共鳴を持つ音節と無音の繰り返し）16bitモノラルWAVを作成
+
+    処理速度・メモリの計測用（参照テキストがないためWERは計算しない）。
+    VADが発話区間として扱うよう、音節と短い無音を交互に並べる。
+    """
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    formants = ((730, 1090), (270, 2290), (300, 870), (530, 1840), (570, 840))  # a i u e o
+
+    chunks = []
+    total = 0
+    while total < seconds * sample_rate:
+        length = int(rng.uniform(0.15, 0.35) * sample_rate)
+        t = np.arange(length) / sample_rate
+        f0 = rng.uniform(110, 220) * (1 + 0.1 * t)
+        phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+        first, second = formants[rng.integers(len(formants))]
+        syllable = np.zeros(length)
+        for harmonic in range(1, 30):
+            frequency = f0 * harmonic
+            gain = (np.exp(-((frequency - first) / 120) ** 2) + 0.5 * np.exp(-((frequency - second) / 180) ** 2)
+                    + 0.02)
+            syllable += gain * np.sin(harmonic * phase)
+        syllable *= np.hanning(length)
+        chunks.append(syllable)
+        # 語・文の区切りに相当する無音
+        pause = int(rng.choice([0.03, 0.08, 0.4], p=[0.6, 0.3, 0.1]) * sample_rate)
+        chunks.append(np.zeros(pause))
+        total += length + pause
+
+    audio = np.concatenate(chunks)[:int(seconds * sample_rate)]
+    audio += rng.normal(0, 0.005, len(audio))
+    audio = (audio / (np.abs(audio).max() or 1.0) * 0.6 * 32767).astype(np.int16)
+
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(audio.tobytes())
+    return path
+
+
+def candidate_grid(model_sizes, compute_types, cpu_threads, batch_sizes):
+    """試す組み合わせ（モデルサイズの小さい順）"""
+    return list(itertools.product(model_sizes, compute_types, cpu_threads, batch_sizes))
+
+
+def _run_candidate(audio_path, reference, language, device, model_size, compute_type, cpu_threads, batch_size):
+    """1つの組み合わせを計測（メモリを分けて測るため専用プロセスで実行）"""
+    from faster_whisper import WhisperModel, decode_audio
+    audio = decode_audio(audio_path, sampling_rate=AUDIO_SAMPLE_RATE)
+    duration = len(audio) / AUDIO_SAMPLE_RATE
+
+    started = time.perf_counter()
+    model = WhisperModel(model_size, device=device, compute_type=compute_type,
+                         cpu_threads=cpu_threads, num_workers=1)
+    load_seconds = time.perf_counter() - started
+
+    # 本番の文字おこしと同じ条件で推論（batch_size 1 は単一モデルの逐次処理）
+    options = dict(language=language, beam_size=1, word_timestamps=False, vad_filter=True,
+                   vad_parameters=dict(min_silence_duration_ms=500))
+    started = time.perf_counter()
+    if batch_size > 1:
+        from faster_whisper import BatchedInferencePipeline
+        segments, _ = BatchedInferencePipeline(model=model).transcribe(audio, batch_size=batch_size, **options)
+    else:
+        segments, _ = model.transcribe(audio, **options)
+    text = " ".join(segment.text.strip() for segment in segments)
+    transcribe_seconds = time.perf_counter() - started
+    peak = peak_rss_mb()
+
+    return BenchmarkResult(
+        model_size, compute_type, cpu_threads, batch_size,
+        round(load_seconds, 2), round(transcribe_seconds, 2),
+        round(transcribe_seconds / duration, 4) if duration else None,
+        round(peak, 1) if peak is not None else None,
+        round(word_error_rate(reference, text), 4) if reference is not None else None,
+        None
+    )
+
+
+def run_benchmark(audio_path, candidates, reference=None, language="ja", device=None, progress_callback=None):
+    """各組み合わせを順に計測し BenchmarkResult を返す（失敗した組み合わせは error に記録）
+
+    組み合わせ同士が CPU を奪い合わないよう1つずつ実行する。
+    """
+    device = device or hardware_profile()['device']
+    # CTranslate2のスレッドを持つプロセスのforkは危険なためspawnを使う
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for index, (model_size, compute_type, cpu_threads, batch_size) in enumerate(candidates, 1):
+        logger.info(f"ベンチマーク {index}/{len(candidates)}: {model_size} {compute_type} "
+                    f"threads={cpu_threads} batch={batch_size}")
+        try:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                result = executor.submit(
+                    _run_candidate, audio_path, reference, language, device,
+                    model_size, compute_type, cpu_threads, batch_size
+                ).result()
+        except Exception as e:
+            logger.warning(f"ベンチマーク失敗: {e}")
+            result = BenchmarkResult(model_size, compute_type, cpu_threads, batch_size,
+                                     None, None, None, None, None, str(e))
+        results.append(result)
+        if progress_callback:
+            progress_callback(result)
+    return results
+
+
+def choose_best(results, wer_tolerance=WHISPER_TUNING_WER_TOLERANCE):
+    """最も速い設定（WERがあれば最良のWERから許容幅以内のものに限る）"""
+    succeeded = [r for r in results if not r.error and r.rtf is not None]
+    if not succeeded:
+        return None
+    scored = [r for r in succeeded if r.wer is not None]
+    if scored:
+        best_wer = min(r.wer for r in scored)
+        succeeded = [r for r in scored if r.wer <= best_wer + wer_tolerance]
+    return min(succeeded, key=lambda r: (r.rtf, r.peak_rss_mb or math.inf))
+
+
+def _setting(result):
+    return {
+        'model_size': result.model_size,
+        'compute_type': result.compute_type,
+        'cpu_threads': result.cpu_threads,
+        'batch_size': result.batch_size,
+        'rtf': result.rtf,
+        'peak_rss_mb': result.peak_rss_mb,
+        'wer': result.wer,
+    }
+
+
+def save_tuning(results, path=WHISPER_TUNING_PATH, wer_tolerance=WHISPER_TUNING_WER_TOLERANCE):
+    """このハードウェアの最適な設定（全体・モデルサイズ別）を保存して返す
+
+    WERを計測していない場合は小さいモデルほど速いだけなので、全体の最適値（既定の
+    モデルサイズ）は保存せず、モデルサイズ別の compute_type・スレッド数・バッチサイズのみ保存する。
+    """
+    by_model = {}
+    for model_size in dict.fromkeys(r.model_size for r in results):
+        model_best = choose_best([r for r in results if r.model_size == model_size], wer_tolerance)
+        if model_best:
+            by_model[model_size] = _setting(model_best)
+    if not by_model:
+        return None
+
+    best = None
+    if any(r.wer is not None for r in results):
+        best = choose_best(results, wer_tolerance)
+
+    profile = hardware_profile()
+    tunings = _load(path)
+    tunings[profile['key']] = {
+        'hardware': {k: v for k, v in profile.items() if k != 'key'},
+        'best': _setting(best) if best else None,
+        'models': by_model,
+        'updated_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(tunings, f, ensure_ascii=False, indent=2)
+    logger.info(f"Whisper調整結果を保存: {path}（{profile['key']}）")
+    return tunings[profile['key']]
+
+
+def _load(path):
+    try:
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+    except Exception as e:
+        logger.debug(f"Whisper調整結果の読み込みエラー: {e}")
+    return {}
+
+
+def tuned_setting(model_size=None, path=WHISPER_TUNING_PATH):
+    """このハードウェアで計測済みの設定（model_size指定時はそのモデルの設定、なければ None）"""
+    tuning = _load(path).get(hardware_profile()['key'])
+    if not tuning:
+        return None
+    if model_size is None:
+        return tuning.get('best')
+    return (tuning.get('models') or {}).get(model_size)
+
+
+def default_model_size(fallback="base"):
+    """計測済みなら最適なモデルサイズ、なければ fallback"""
+    best = tuned_setting()
+    return best['model_size'] if best else fallback
@@ -0,0 +1,375 @@
+"""YouTube ページからの字幕・コメント取得
+
+字幕はプレーヤー情報の字幕トラックURLからtimedtextを直接取得する（時刻付き）。
+コメントはスクロールせず、ytInitialData のコメント欄 continuation から始めて
+ページ内の fetch で YouTube 内部API（youtubei/v1/next）を直接呼び出し、
+返信スレッドも含めて複数の continuation をまとめて取得する。
+"""
+import json
+import logging
+import time
+from selenium.common.exceptions import TimeoutException
+from lib.caption_tracks import CaptionTrack, choose_player_track, parse_caption
+from config.settings import (
+    PAGE_LOAD_TIMEOUT, CAPTION_MIN_CHARS, YOUTUBE_COMMENT_BATCH, YOUTUBE_COMMENT_MAX_REPLIES, YOUTUBE_COMMENT_MAX_REQUESTS
+)
+
+logger = logging.getLogger(__name__)
+
+# 複数の continuation をページ内で並行取得（ページのCookie・クライアント情報をそのまま使う）
+_FETCH_CONTINUATIONS_JS = """
+const tokens = arguments[0];
+const done = arguments[arguments.length - 1];
+const context = window.ytcfg.get('INNERTUBE_CONTEXT');
+const key = window.ytcfg.get('INNERTUBE_API_KEY');
+Promise.all(tokens.map(token =>
+    fetch('/youtubei/v1/next?prettyPrint=false' + (key ? '&key=' + key : ''), {
+        method: 'POST',
+        credentials: 'include',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({context: context, continuation: token})
+    }).then(r => r.ok ? r.text() : null).catch(() => null)
+)).then(done);
+"""
+
+# プレーヤー情報の字幕トラックからtimedtextを1回のリクエストで取得（json3、返らなければそのままの形式）
+_FETCH_TIMEDTEXT_JS = """
+const url = arguments[0];
+const done = arguments[arguments.length - 1];
+fetch(url, {credentials: 'include'}).then(r => r.ok ? r.text() : null).catch(() => null).then(done);
+"""
+
+_CAPTION_TRACKS_JS = """
+const response = window.ytInitialPlayerResponse || {};
+const renderer = (response.captions || {}).playerCaptionsTracklistRenderer || {};
+return JSON.stringify(renderer.captionTracks || []);
+"""
+
+# 概要欄の「文字起こしを表示」を開き、文字起こしパネルの行がそろうまで待つ（字幕トラックを取得できない場合のみ）
+_TRANSCRIPT_PANEL_JS = """
+const done = arguments[arguments.length - 1];
+const button = document.querySelector('ytd-video-description-transcript-section-renderer button');
+if (!button) { done(null); return; }
+button.click();
+let waited = 0;
+const timer = setInterval(() => {
+    const rows = document.querySelectorAll('ytd-transcript-segment-renderer');
+    waited += 250;
+    if (rows.length || waited >= 10000) {
+        clearInterval(timer);
+        done(Array.from(rows).map(row => ({
+            time: (row.querySelector('.segment-timestamp') || {}).innerText || '',
+            text: (row.querySelector('.segment-text') || {}).innerText || ''
+        })));
+    }
+}, 250);
+"""
+
+# 文字起こしパネルの最後の行の長さ（次の行がないため）
+_LAST_ROW_SECONDS = 5
+
+
+def _clock_seconds(value):
+    """「1:02:03」「2:03」形式の時刻を秒に変換（不明なら None）"""
+    try:
+        seconds = 0
+        for part in value.strip().split(":"):
+            seconds = seconds * 60 + int(part)
+        return seconds
+    except ValueError:
+        return None
+
+
+def panel_segments(rows):
+    """文字起こしパネルの行をセグメント一覧に変換（終了時刻は次の行の開始時刻）"""
+    timed = []
+    for row in rows or []:
+        text = (row.get('text') or '').strip()
+        start = _clock_seconds(row.get('time') or '')
+        if text and start is not None:
+            timed.append((start, text))
+    return [
+        {'start': start, 'end': timed[i + 1][0] if i + 1 < len(timed) else start + _LAST_ROW_SECONDS, 'text': text}
+        for i, (start, text) in enumerate(timed)
+    ]
+
+
+def _text(value):
+    """simpleText / runs / content のいずれかの形式のテキスト"""
+    if not value:
+        return ""
+    if isinstance(value, str):
+        return value
+    if 'simpleText' in value:
+        return value['simpleText']
+    if 'runs' in value:
+        return "".join(run.get('text', '') for run in value['runs'])
+    return value.get('content', '')
+
+
+def _find_tokens(node):
+    """continuationCommand のトークンをすべて列挙"""
+    if isinstance(node, dict):
+        command = node.get('continuationCommand')
+        if command and command.get('token'):
+            yield command['token']
+            return
+        for value in node.values():
+            yield from _find_tokens(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _find_tokens(value)
+
+
+def _parent_id(comment_id):
+    """返信のIDは「親ID.返信ID」の形式"""
+    return comment_id.split('.', 1)[0] if '.' in comment_id else None
+
+
+def _from_renderer(renderer):
+    """旧形式（commentRenderer）のコメント"""
+    comment_id = renderer.get('commentId', '')
+    return {
+        'id': comment_id,
+        'author': _text(renderer.get('authorText')),
+        'text': _text(renderer.get('contentText')),
+        'likes': _text(renderer.get('voteCount')) or 0,
+        'published': _text(renderer.get('publishedTimeText')),
+        'reply_count': renderer.get('replyCount', 0),
+        'is_reply': bool(_parent_id(comment_id)),
+        'parent_id': _parent_id(comment_id),
+    }
+
+
+def _from_entity(payload):
+    """新形式（commentEntityPayload）のコメント"""
+    properties = payload.get('properties', {})
+    toolbar = payload.get('toolbar', {})
+    comment_id = properties.get('commentId', '')
+    return {
+        'id': comment_id,
+        'author': payload.get('author', {}).get('displayName', ''),
+        'text': _text(properties.get('content')),
+        'likes': toolbar.get('likeCountNotliked') or 0,
+        'published': properties.get('publishedTime', ''),
+        'reply_count': toolbar.get('replyCount') or 0,
+        'is_reply': bool(_parent_id(comment_id)),
+        'parent_id': _parent_id(comment_id),
+    }
+
+
+def comment_section_token(initial_data):
+    """ytInitialData からコメント欄の最初の continuation（コメント欄がなければ None）"""
+    try:
+        contents = initial_data['contents']['twoColumnWatchNextResults']['results']['results']['contents']
+    except (KeyError, TypeError):
+        return None
+    for item in contents:
+        section = item.get('itemSectionRenderer')
+        if section and section.get('sectionIdentifier') == 'comment-item-section':
+            return next(_find_tokens(section.get('contents', [])), None)
+    return None
+
+
+def parse_comment_page(response):
+    """continuation の応答1件を (コメント一覧, 次ページのトークン, 返信スレッドのトークン) に分解"""
+    comments = []
+    next_tokens = []
+    reply_tokens = []
+
+    for endpoint in response.get('onResponseReceivedEndpoints', []):
+        action = endpoint.get('reloadContinuationItemsCommand') or endpoint.get('appendContinuationItemsAction') or {}
+        for item in action.get('continuationItems', []):
+            thread = item.get('commentThreadRenderer')
+            if thread:
+                renderer = thread.get('comment', {}).get('commentRenderer')
+                if renderer:
+                    comments.append(_from_renderer(renderer))
+                reply_tokens.extend(_find_tokens(thread.get('replies', {})))
+            elif 'commentRenderer' in item:
+                comments.append(_from_renderer(item['commentRenderer']))
+            elif 'continuationItemRenderer' in item:
+                next_tokens.extend(_find_tokens(item['continuationItemRenderer']))
+
+    # 新形式ではコメント本文が frameworkUpdates にまとめて入る
+    mutations = response.get('frameworkUpdates', {}).get('entityBatchUpdate', {}).get('mutations', [])
+    for mutation in mutations:
+        payload = mutation.get('payload', {}).get('commentEntityPayload')
+        if payload:
+            comments.append(_from_entity(payload))
+
+    return comments, next_tokens, reply_tokens
+
+
+class YouTubeScraper:
+    def __init__(self, chrome_connector):
+        self.chrome = chrome_connector
+        self.driver = chrome_connector.driver
+
+    def navigate(self, url):
+        """動画ページを開き、ytInitialData が読めるまで待機"""
+        try:
+            self.driver.get(url)
+        except TimeoutException:
+            logger.info("ページ読み込みがタイムアウト（読み込み済みの内容で続行）")
+        except Exception as e:
+            logger.error(f"YouTubeページ読み込みエラー: {e}")
+            return False
+
+        deadline = time.time() + PAGE_LOAD_TIMEOUT
+        while time.time() < deadline:
+            try:
+                if self.driver.execute_script("return !!(window.ytInitialData && window.ytcfg);"):
+                    return True
+            except Exception:
+                pass
+            time.sleep(0.25)
+        logger.warning("ytInitialData を取得できません")
+        return False
+
+    def extract_subtitles(self, language=None):
+        """ページの字幕を CaptionTrack として取得（なければ None）
+
+        プレーヤー情報（ytInitialPlayerResponse）の字幕トラックURLからtimedtextを直接取得する。
+        取得できない場合のみ文字起こしパネルを開いて読み取る。language 未指定時は話されている言語。
+        """
+        track = self._fetch_player_track(language)
+        if track and not self._long_enough(track.segments):
+            return None
+        if track:
+            kind = "自動生成字幕" if track.automatic else "字幕"
+            logger.info(f"ページの{kind}トラックを取得: {track.language}（{len(track.segments)}セグメント）")
+            return track
+
+        try:
+            segments = panel_segments(self.driver.execute_async_script(_TRANSCRIPT_PANEL_JS))
+        except Exception as e:
+            logger.warning(f"DOM字幕取得エラー: {e}")
+            return None
+        if not self._long_enough(segments):
+            return None
+        logger.info(f"文字起こしパネルから字幕を取得: {len(segments)}セグメント")
+        return CaptionTrack(language, None, segments)
+
+    def extract_dom_subtitles(self, language=None):
+        """ページの字幕テキスト（なければ None）"""
+        track = self.extract_subtitles(language)
+        if not track:
+            return None
+        return "\n".join(segment['text'] for segment in track.segments)
+
+    def _long_enough(self, segments):
+        if sum(len(segment['text']) for segment in segments) < CAPTION_MIN_CHARS:
+            logger.info("ページの字幕が短すぎるため使用しません")
+            return False
+        return True
+
+    def _fetch_player_track(self, language):
+        try:
+            tracks = json.loads(self.driver.execute_script(_CAPTION_TRACKS_JS))
+        except Exception as e:
+            logger.debug(f"字幕トラック一覧の取得エラー: {e}")
+            return None
+        chosen = choose_player_track(tracks, language)
+        if not chosen or not chosen.get('baseUrl'):
+            return None
+
+        base_url = chosen['baseUrl']
+        url = f"{base_url}&fmt=json3" if "fmt=" not in base_url else base_url
+        try:
+            content = self.driver.execute_async_script(_FETCH_TIMEDTEXT_JS, url)
+            if not content:
+                return None
+            ext = "json3" if content.lstrip().startswith("{") else "xml"
+            segments = parse_caption(content, ext)
+        except Exception as e:
+            logger.warning(f"timedtext取得エラー: {e}")
+            return None
+        if not segments:
+            return None
+        return CaptionTrack(chosen.get('languageCode', '').split("-")[0] or language,
+                            chosen.get('kind') == "asr", segments)
+
+    def extract_comments(self, count, output_path=None, include_replies=True,
+                         max_replies=YOUTUBE_COMMENT_MAX_REPLIES):
+        """コメントを最大 count 件取得（返信を含む）
+
+        トップレベルの次ページ1件と返信スレッドの continuation をまとめてページ内で並行取得する。
+        output_path 指定時は取得したものから順にJSONLへ書き出す。
+        """
+        try:
+            initial_data = json.loads(self.driver.execute_script("return JSON.stringify(window.ytInitialData);"))
+        except Exception as e:
+            logger.warning(f"ytInitialData 取得エラー: {e}")
+            return []
+        token = comment_section_token(initial_data)
+        if not token:
+            logger.info("コメント欄が見つかりません（コメント無効の動画）")
+            return []
+
+        comments = []
+        seen = set()
+        next_tokens = [token]
+        reply_tokens = []
+        replies_per_thread = {}
+        requests = 0
+        started = time.time()
+
+        writer = open(output_path, 'w', encoding='utf-8') if output_path else None
+        try:
+            while (next_tokens or reply_tokens) and len(comments) < count and requests < YOUTUBE_COMMENT_MAX_REQUESTS:
+                # トップレベルを進めつつ、残りの枠で返信スレッドを取得
+                top = next_tokens[:1]
+                next_tokens = next_tokens[1:]
+                room = YOUTUBE_COMMENT_BATCH - len(top)
+                batch = top + reply_tokens[:room]
+                reply_tokens = reply_tokens[room:]
+                requests += len(batch)
+
+                try:
+                    pages = self.driver.execute_async_script(_FETCH_CONTINUATIONS_JS, batch)
+                except Exception as e:
+                    logger.warning(f"コメント取得エラー: {e}")
+                    break
+
+                for index, page in enumerate(pages or []):
+                    if not page:
+                        continue
+                    try:
+                        items, more, replies = parse_comment_page(json.loads(page))
+                    except ValueError:
+                        continue
+                    if index < len(top):
+                        next_tokens.extend(more)
+                        if include_replies and max_replies:
+                            reply_tokens.extend(replies)
+                    else:
+                        # 返信の続き（上限に達したスレッドは追わない）
+                        parents = {c['parent_id'] for c in items if c['parent_id']}
+                        if not any(replies_per_thread.get(parent, 0) >= max_replies for parent in parents):
+                            reply_tokens.extend(more)
+
+                    for comment in items:
+                        if len(comments) >= count or comment['id'] in seen:
+                            continue
+                        if comment['is_reply']:
+                            if not include_replies:
+                                continue
+                            taken = replies_per_thread.get(comment['parent_id'], 0)
+                            if taken >= max_replies:
+                                continue
+                            replies_per_thread[comment['parent_id']] = taken + 1
+                        seen.add(comment['id'])
+                        comments.append(comment)
+                        if writer:
+                            writer.write(json.dumps(comment, ensure_ascii=False) + "\n")
+                if writer:
+                    writer.flush()
+        finally:
+            if writer:
+                writer.close()
+
+        elapsed = time.time() - started
+        reply_count = sum(1 for c in comments if c['is_reply'])
+        logger.info(f"コメント取得: {len(comments)}件（返信 {reply_count}件、{requests}リクエスト、{elapsed:.1f}秒）")
+        return comments
@@ -0,0 +1,229 @@
+"""yt-dlpのプロセス内利用（メタデータとフォーマット一覧を1回で取得し、ダウンロードで再利用）"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+from config.settings import YTDLP_INFO_TTL, YTDLP_INFO_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# 音声品質設定ごとの動画の最大解像度
+QUALITY_MAX_HEIGHT = {
+    "best": 720,
+    "good": 720,
+    "medium": 480,
+}
+
+
+# 署名期限の直前に使わないよう早めに期限切れとみなす秒数
+_EXPIRE_MARGIN = 60
+
+
+def _has(codec):
+    return codec not in (None, "none")
+
+
+def _expires_at(info, ttl=YTDLP_INFO_TTL):
+    """メディア情報を再利用できる期限（フォーマットURLの expire と固定の秒数の早い方）"""
+    deadline = time.time() + ttl
+    for f in info.get('formats') or [info]:
+        for value in parse_qs(urlparse(f.get('url') or '').query).get('expire', []):
+            if value.isdigit():
+                deadline = min(deadline, int(value) - _EXPIRE_MARGIN)
+    return deadline
+
+
+def _is_forbidden(error):
+    return "403" in str(error)
+
+
+class YtDlpClient:
+    """URLごとに1回だけ extract_info し、その結果からローカルでフォーマットを選んでダウンロード
+
+    フォーマットのURLは署名の期限があるため、メディア情報は期限（YTDLP_INFO_TTL または URL の expire）まで、
+    最大 YTDLP_INFO_CACHE_SIZE 件だけ保持し、ダウンロードが終わったら破棄する。
+    """
+
+    def __init__(self, max_entries=YTDLP_INFO_CACHE_SIZE):
+        import yt_dlp  # 未インストールなら呼び出し側でCLIにフォールバック
+        self._yt_dlp = yt_dlp
+        self.max_entries = max(1, max_entries)
+        self._infos = OrderedDict()  # URL → (メディア情報, 期限)
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def extract(self, url, refresh=False):
+        """メタデータ＋フォーマット一覧（期限内に取得済みのURLは再取得しない）"""
+        with self._lock:
+            if not refresh:
+                cached = self._cached(url)
+                if cached is not None:
+                    return cached
+            url_lock = self._locks.setdefault(url, threading.Lock())
+
+        with url_lock:
+            if not refresh:
+                with self._lock:
+                    cached = self._cached(url)
+                    if cached is not None:
+                        return cached
+
+            options = {'quiet': True, 'no_warnings': True, 'noplaylist': True}
+            with self._yt_dlp.YoutubeDL(options) as ydl:
+                info = ydl.extract_info(url, download=False)
+
+            with self._lock:
+                self._infos[url] = (info, _expires_at(info))
+                self._infos.move_to_end(url)
+                while len(self._infos) > self.max_entries:
+                    oldest, _ = self._infos.popitem(last=False)
+                    self._locks.pop(oldest, None)
+            logger.info(f"メディア情報取得: {info.get('title', url)}（{len(info.get('formats') or [])}フォーマット）")
+            return info
+
+    def forget(self, url):
+        """保持しているメディア情報を破棄"""
+        with self._lock:
+            self._infos.pop(url, None)
+            self._locks.pop(url, None)
+
+    def _cached(self, url):
+        """期限内のメディア情報（なければ None、ロック取得済みで呼ぶ）"""
+        entry = self._infos.get(url)
+        if entry is None:
+            return None
+        info, expires_at = entry
+        if time.time() >= expires_at:
+            del self._infos[url]
+            return None
+        self._infos.move_to_end(url)
+        return info
+
+    def expand(self, url, limit=None):
+        """プレイリスト・チャンネルを個々の動画URLに展開（動画の詳細は取得しない）"""
+        options = {'quiet': True, 'no_warnings': True, 'extract_flat': 'in_playlist'}
+        if limit:
+            options['playlistend'] = limit
+        with self._yt_dlp.YoutubeDL(options) as ydl:
+            info = ydl.extract_info(url, download=False)
+
+        urls = []
+        for entry in info.get('entries') or [info]:
+            if not entry:
+                continue
+            if entry.get('_type') == 'playlist' or (entry.get('ie_key') or '').endswith('Tab'):
+                # チャンネルのタブ（動画・ショート等）は中の動画まで展開
+                urls += self.expand(entry.get('url') or entry.get('webpage_url'), limit and limit - len(urls))
+            else:
+                entry_url = entry.get('url') or entry.get('webpage_url')
+                if entry_url and "://" not in entry_url and entry.get('ie_key') == 'Youtube':
+                    # 古いyt-dlpは動画IDのみを返す
+                    entry_url = f"https://www.youtube.com/watch?v={entry_url}"
+                if entry_url:
+                    urls.append(entry_url)
+            if limit and len(urls) >= limit:
+                return urls[:limit]
+        return urls
+
+    def video_info(self, url):
+        """タイトル・時間・投稿者（従来の get_video_info と同じ形式）"""
+        info = self.extract(url)
+        return {
+            'title': info.get('title') or "不明",
+            'duration': str(info['duration']) if info.get('duration') is not None else "不明",
+            'uploader': info.get('uploader') or info.get('channel') or "不明",
+        }
+
+    def select_format(self, info, kind="video", max_height=720):
+        """フォーマット一覧からダウンロードするフォーマットIDをローカルで選ぶ
+
+        kind="audio": 音声のみの最高ビットレート（なければ音声付きで最小の動画）
+        kind="video": max_height以下の音声付き動画（mp4優先）、なければ映像＋音声の結合
+        """
+        formats = info.get('formats') or []
+        audio_only = [f for f in formats if _has(f.get('acodec')) and not _has(f.get('vcodec'))]
+        video_only = [f for f in formats if _has(f.get('vcodec')) and not _has(f.get('acodec'))]
+        combined = [f for f in formats if _has(f.get('acodec')) and _has(f.get('vcodec'))]
+
+        def bitrate(f):
+            return f.get('abr') or f.get('tbr') or 0
+
+        if kind == "audio":
+            if audio_only:
+                return max(audio_only, key=bitrate)['format_id']
+            if combined:
+                return min(combined, key=lambda f: (f.get('height') or 0, f.get('tbr') or 0))['format_id']
+            return info.get('format_id')
+
+        fitting = [f for f in combined if (f.get('height') or 0) <= max_height]
+        if fitting:
+            return max(fitting, key=lambda f: (f.get('height') or 0, f.get('ext') == 'mp4', f.get('tbr') or 0))['format_id']
+
+        fitting_video = [f for f in video_only if (f.get('height') or 0) <= max_height]
+        if fitting_video and audio_only:
+            video = max(fitting_video, key=lambda f: (f.get('height') or 0, f.get('ext') == 'mp4', f.get('tbr') or 0))
+            audio = max(audio_only, key=bitrate)
+            return f"{video['format_id']}+{audio['format_id']}"
+
+        if combined:
+            return min(combined, key=lambda f: f.get('height') or 0)['format_id']
+        # フォーマット一覧がない（直接リンク等）場合はyt-dlpの既定の選択
+        return info.get('format_id')
+
+    def download(self, url, output_template, kind="video", max_height=720, section=None, **ydl_options):
+        """取得済みの情報を再利用してダウンロード（保存先パスを返す）
+
+        section: (開始秒, 終了秒) 指定時はその区間だけを取得（終了 None は末尾まで）
+        ydl_options: YoutubeDL に追加で渡すオプション（再開・断片の並列取得など）
+        """
+        options = {
+            'quiet': True,
+            'no_warnings': True,
+            'noplaylist': True,
+            'outtmpl': output_template,
+            'merge_output_format': 'mp4',
+        }
+        options.update(ydl_options)
+        if section:
+            start, end = section
+            options['download_ranges'] = self._yt_dlp.utils.download_range_func(
+                None, [(start or 0, end if end is not None else float('inf'))]
+            )
+
+        try:
+            try:
+                result = self._process(url, options, kind, max_height)
+            except self._yt_dlp.utils.DownloadError as e:
+                if not _is_forbidden(e):
+                    raise
+                # 署名付きURLの期限切れ等 → メディア情報を取り直して1回だけ再試行
+                logger.info("フォーマットURLが拒否されたためメディア情報を再取得します（HTTP 403）")
+                self.extract(url, refresh=True)
+                result = self._process(url, options, kind, max_height)
+        finally:
+            self.forget(url)
+
+        for download in (result or {}).get('requested_downloads') or []:
+            path = download.get('filepath')
+            if path and os.path.exists(path):
+                return path
+
+        # 古いyt-dlpでは保存先が返らないため出力ディレクトリから探す
+        directory = os.path.dirname(output_template) or "."
+        prefix = os.path.basename(output_template).split("%(")[0]
+        for file in os.listdir(directory):
+            if file.startswith(prefix) and not file.endswith((".part", ".ytdl")):
+                return os.path.join(directory, file)
+        return None
+
+    def _process(self, url, options, kind, max_height):
+        info = self.extract(url)
+        format_id = self.select_format(info, kind, max_height)
+        logger.info(f"フォーマット選択: {format_id}（{kind}）")
+        options = dict(options)
+        if format_id:
+            options['format'] = format_id
+        with self._yt_dlp.YoutubeDL(options) as ydl:
+            return ydl.process_ie_result(dict(info), download=True)
@@ -4,7 +4,7 @@ import sys
 import os
 from lib.utils import setup_logging, create_directories
 from workflows.scrape_only import ScrapeOnlyWorkflow
-from config.settings import DEFAULT_TWEET_COUNT
+from config.settings import DEFAULT_TWEET_COUNT, BATCH_MAX_ITEMS
 from workflows.file_to_claude import FileToClaude
 
 def main():
@@ -12,6 +12,8 @@ def main():
     # 引数解析
     parser = create_argument_parser()
     args = parser.parse_args()
+    if not args.query and not (args.media and args.url_file):
+        parser.error("検索クエリ（--media時は動画URL）を指定してください")
     
     # 初期設定
     setup_logging(args.log_level)
@@ -19,11 +21,15 @@ def main():
     
     # ワークフロー選択
     # 修正後
+    if args.media:
+        return run_media_batch(args)
+    
+    query = " ".join(args.query)
     if args.analyze:
         # 1. ツイート取得
         scrape_workflow = ScrapeOnlyWorkflow()
         txt_file = scrape_workflow.execute(
-            query=args.query,
+            query=query,
             count=args.count,
             format_type=args.format
         )
@@ -37,7 +43,7 @@ def main():
     else:
         workflow = ScrapeOnlyWorkflow()
         result = workflow.execute(
-            query=args.query,
+            query=query,
             count=args.count,
             format_type=args.format
         )
@@ -50,6 +56,53 @@ def main():
         print("\n❌ 処理失敗")
         return 1
 
+def run_media_batch(args):
+    """動画URL・プレイリスト・チャンネルの一括文字おこし"""
+    from workflows.batch_media_transcription import BatchMediaTranscriptionWorkflow, split_urls
+    from lib.time_ranges import parse_timecode
+    from lib.whisper_tuner import default_model_size
+    
+    try:
+        start = parse_timecode(args.start)
+        end = parse_timecode(args.end)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    
+    urls = list(args.query)
+    if args.url_file:
+        with open(args.url_file, 'r', encoding='utf-8') as f:
+            urls += [url for line in f if not line.startswith('#') for url in split_urls(line)]
+    
+    def report(item):
+        if item.status in ("done", "failed"):
+            mark = "✅" if item.status == "done" else "❌"
+            print(f"{mark} [{item.index + 1}] {item.url} {item.error or ''}")
+    
+    workflow = BatchMediaTranscriptionWorkflow()
+    items, summary_file = workflow.execute(
+        urls,
+        translate=args.translate,
+        target_language=args.target_language,
+        whisper_model=args.whisper_model or default_model_size(),
+        use_timestamps=not args.no_timestamps,
+        keep_video=args.keep_video,
+        force_whisper=args.force_whisper,
+        transcription_mode=args.transcription_mode,
+        max_items=args.max_items,
+        progress_callback=report,
+        start=start,
+        end=end,
+        skim=args.skim,
+        language=args.language
+    )
+    
+    succeeded = sum(1 for item in items if item.status == "done")
+    print(f"\n📊 一括処理: 成功 {succeeded}件 / 失敗 {len(items) - succeeded}件")
+    if summary_file:
+        print(f"結果一覧: {summary_file}")
+    return 0 if items and succeeded == len(items) else 1
+
 def create_argument_parser():
     """コマンドライン引数パーサー作成"""
     parser = argparse.ArgumentParser(
@@ -71,6 +124,12 @@ def create_argument_parser():
   
   # カスタム分析プロンプト
   python main.py "@someone" --analyze --prompt "この人の最近の関心事は？"
+  
+  # 動画の一括文字おこし（URL複数・プレイリスト・チャンネル）
+  python main.py --media "https://youtu.be/xxxx" "https://x.com/user/status/123"
+  python main.py --media "https://www.youtube.com/playlist?list=xxxx" --translate --max-items 20
+  python main.py --media "https://youtu.be/xxxx" --start 10:00 --end 25:00
+  python main.py --media "https://youtu.be/xxxx" --skim
 
 注意事項:
   - Chrome を --remote-debugging-port=9222 で起動してください
@@ -79,7 +138,8 @@ def create_argument_parser():
     )
     
     # 必須引数
-    parser.add_argument("query", help="検索クエリ (例: @username, キーワード, #ハッシュタグ)")
+    parser.add_argument("query", nargs="*",
+                        help="検索クエリ (例: @username, キーワード, #ハッシュタグ)。--media時は動画URL（複数可）")
     
     # オプション引数
     parser.add_argument("--count", "-c", type=int, default=DEFAULT_TWEET_COUNT,
@@ -94,6 +154,31 @@ def create_argument_parser():
     parser.add_argument("--prompt", "-p", type=str,
                         help="カスタム分析プロンプト (--analyze時のみ有効)")
     
+    media_group = parser.add_argument_group("動画の一括文字おこし")
+    media_group.add_argument("--media", "-m", action="store_true",
+                             help="URL（ツイート・YouTube動画・プレイリスト・チャンネル）を一括文字おこし")
+    media_group.add_argument("--url-file", type=str,
+                             help="処理するURLの一覧ファイル（1行1件）")
+    media_group.add_argument("--whisper-model",
+                             choices=["tiny", "base", "small", "medium", "large", "large-v2", "large-v3"],
+                             help="Whisperモデル (デフォルト: benchmark_whisper.py の計測結果、未計測なら base)")
+    media_group.add_argument("--transcription-mode", choices=["sequential", "parallel", "batched"],
+                             help="文字おこし方式 (デフォルト: 設定値)")
+    media_group.add_argument("--language",
+                             help="音声の言語 (例: ja, en。auto は数か所の短い区間で判定。デフォルト: 設定値)")
+    media_group.add_argument("--translate", action="store_true", help="文字おこし結果を翻訳")
+    media_group.add_argument("--target-language", default="en", help="翻訳先の言語 (デフォルト: en)")
+    media_group.add_argument("--keep-video", action="store_true", help="音声のみでなく動画を保存")
+    media_group.add_argument("--force-whisper", action="store_true",
+                             help="字幕トラックがあってもWhisperで文字おこし")
+    media_group.add_argument("--no-timestamps", action="store_true", help="タイムスタンプなしで保存")
+    media_group.add_argument("--start", type=str, help="文字おこしの開始位置 (例: 90, 1:30, 01:02:03)")
+    media_group.add_argument("--end", type=str, help="文字おこしの終了位置 (例: 25:00)")
+    media_group.add_argument("--skim", action="store_true",
+                             help="範囲内の等間隔の区間だけを文字おこし（長時間動画の概要把握用）")
+    media_group.add_argument("--max-items", type=int, default=BATCH_MAX_ITEMS,
+                             help=f"プレイリスト・チャンネルから処理する最大件数 (デフォルト: {BATCH_MAX_ITEMS})")
+    
     parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
                         default="INFO", help="ログレベル (デフォルト: INFO)")
     
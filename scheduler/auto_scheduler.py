@@ -16,6 +16,8 @@ print(f"プロジェクトルート: {project_root}")  # デバッグ用
 
 from workflows.scrape_only import ScrapeOnlyWorkflow
 from workflows.file_to_claude import FileToClaude
+from workflows.incremental_claude import IncrementalClaudeAnalysis
+from workflows.local_analysis import LocalAnalysisWorkflow
 from lib.utils import setup_logging, create_directories
 
 logger = logging.getLogger(__name__)
@@ -51,6 +53,7 @@ class AutoScheduler:
                     "format": "json",
                     "claude_analysis": True,
                     "analysis_prompt": "技術トレンドを分析して、注目すべき技術を教えてください",
+                    "incremental": True,
                     "days": ["daily"]
                 }
             ]
@@ -87,6 +90,8 @@ class AutoScheduler:
             sort_type = job_config.get("sort_type", "latest")  # デフォルトは最新順
             claude_analysis = job_config.get("claude_analysis", False)
             analysis_prompt = job_config.get("analysis_prompt")
+            incremental = job_config.get("incremental", False)  # 前回チャットへの差分分析
+            local_analysis = job_config.get("local_analysis", False)  # LLMを使わないローカル集計
             
             logger.info(f"=== 自動ジョブ実行: {job_name} ===")
             logger.info(f"クエリ: {query}")
@@ -109,12 +114,24 @@ class AutoScheduler:
             
             logger.info(f"Twitter取得完了: {result}")
             
-            # Step 2: Claude分析（CLI版）
+            # Step 2: ローカル集計（LLM不使用）
+            if local_analysis:
+                logger.info("Step 2: ローカル集計開始")
+                summary_file = LocalAnalysisWorkflow().execute(result)
+                if summary_file:
+                    logger.info(f"ローカル集計完了: {summary_file}")
+                else:
+                    logger.warning("ローカル集計に失敗しました")
+            
+            # Step 3: Claude分析（CLI版）
             if claude_analysis:
-                logger.info("Step 2: Claude分析開始")
+                logger.info("Step 3: Claude分析開始")
                 
                 try:
-                    claude_workflow = FileToClaude()  # ← 修正
+                    if incremental:
+                        claude_workflow = IncrementalClaudeAnalysis(job_name)
+                    else:
+                        claude_workflow = FileToClaude()  # ← 修正
                     analysis_result = claude_workflow.execute(result, analysis_prompt)
                     
                     if analysis_result:
@@ -204,7 +221,9 @@ class AutoScheduler:
         for i, job in enumerate(self.config.get("schedules", []), 1):
             print(f"{i}. {job.get('name')} - {job.get('time')} - {job.get('days')}")
             print(f"   クエリ: {job.get('query')}")
-            print(f"   Claude分析: {'有' if job.get('claude_analysis') else '無'}")
+            print(f"   Claude分析: {'有' if job.get('claude_analysis') else '無'}"
+                  f"{'（差分）' if job.get('incremental') else ''}")
+            print(f"   ローカル集計: {'有' if job.get('local_analysis') else '無'}")
             print()
 
 def main():
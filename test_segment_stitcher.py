@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""分割文字おこしの連結（境界での重複除去）のテスト"""
+
+from lib.parallel_transcriber import SegmentStitcher
+
+
+def stitch(segments):
+    """(開始, 終了, テキスト, チャンク番号) の並びを連結し、残ったテキストを返す"""
+    stitcher = SegmentStitcher()
+    results = [stitcher.add(start, end, text, chunk=chunk) for start, end, text, chunk in segments]
+    return [segment.text for segment in results if segment is not None]
+
+
+def test_repeats_within_chunk_are_kept():
+    """チャンク内で繰り返した発話は重複とみなさない"""
+    segments = [
+        (0.0, 1.0, 'はい', 0),
+        (1.2, 2.0, 'はい', 0),
+        (2.1, 3.0, 'そうです', 0),
+        (3.1, 4.0, 'はい', 0),
+    ]
+    assert stitch(segments) == ['はい', 'はい', 'そうです', 'はい']
+
+
+def test_boundary_duplicate_is_removed():
+    """次のチャンクの先頭で前のチャンクの末尾と同じ発話は1つにまとめる"""
+    segments = [
+        (0.0, 1.0, 'こんにちは', 0),
+        (1.2, 2.0, '今日はいい天気です。', 0),
+        (1.5, 2.2, '今日は いい天気です', 1),
+        (2.3, 3.0, 'はい', 1),
+        (3.1, 4.0, 'はい', 1),
+    ]
+    assert stitch(segments) == ['こんにちは', '今日はいい天気です。', 'はい', 'はい']
+
+
+def test_boundary_dedup_only_checks_leading_segments():
+    """次のチャンクでも先頭以外のセグメントは前のチャンクと比べない"""
+    segments = [
+        (0.0, 1.0, 'はい', 0),
+        (1.1, 2.0, 'そうです', 1),
+        (2.1, 3.0, 'はい', 1),
+    ]
+    assert stitch(segments) == ['はい', 'そうです', 'はい']
+
+
+if __name__ == "__main__":
+    test_repeats_within_chunk_are_kept()
+    test_boundary_duplicate_is_removed()
+    test_boundary_dedup_only_checks_leading_segments()
+    print("✅ 連結テスト成功")
@@ -0,0 +1,327 @@
+"""複数メディアの一括文字おこし（ダウンロード・文字おこし・翻訳を段階ごとに並行処理）"""
+import json
+import logging
+import os
+import queue
+import re
+import subprocess
+import threading
+from datetime import datetime
+from lib.video_processor import VideoProcessor
+from lib.download_manager import get_download_manager
+from lib.transcription_cache import media_key_for_url
+from lib.time_ranges import is_partial, download_section
+from config.settings import (
+    OUTPUT_DIR, TRANSCRIPTION_MODE, TRANSCRIPTION_LANGUAGE, BATCH_DOWNLOAD_WORKERS, BATCH_TRANSCRIBE_WORKERS,
+    BATCH_TRANSLATE_WORKERS, BATCH_QUEUE_SIZE, BATCH_MAX_ITEMS
+)
+
+logger = logging.getLogger(__name__)
+
+# プレイリスト・チャンネルとして展開するYouTubeのURL
+_COLLECTION_PATTERN = re.compile(r'youtube\.com/(?:playlist\?|@|channel/|c/|user/)')
+_URL_SEPARATOR = re.compile(r'[\s,]+')
+
+_STAGE_END = object()  # 段階の終了を次の段階へ伝える目印
+
+
+def split_urls(text):
+    """空白・改行・カンマ区切りのURL一覧"""
+    return [url for url in _URL_SEPARATOR.split(text or "") if url]
+
+
+def is_collection_url(url):
+    """YouTubeのプレイリスト・チャンネルURLかどうか"""
+    return bool(_COLLECTION_PATTERN.search(url))
+
+
+class BatchItem:
+    """一括処理の1件分の状態（段階をまたいで受け渡す）"""
+
+    def __init__(self, index, url):
+        self.index = index
+        self.url = url
+        self.status = "queued"  # queued / downloading / transcribing / translating / done / failed
+        self.processor = None
+        self.media_path = None
+        self.transcription_text = None
+        self.segments_data = None
+        self.translation = None
+        self.text_file = None
+        self.language = None
+        self.error = None
+
+    def to_dict(self):
+        return {
+            'index': self.index,
+            'url': self.url,
+            'status': self.status,
+            'media_path': self.media_path,
+            'language': self.language,
+            'text_file': self.text_file,
+            'error': self.error,
+        }
+
+
+class BatchMediaTranscriptionWorkflow:
+    """URL一覧・プレイリスト・チャンネルを段階的なパイプラインで処理
+
+    ダウンロード → 文字おこし → 翻訳・保存 の各段階がそれぞれのワーカーを持ち、
+    上限付きのキューでつながる。文字おこし中も次のメディアのダウンロードが進み、
+    1件の失敗はその件だけの結果として記録され、他の件の処理は止めない。
+    """
+
+    def __init__(self, download_workers=BATCH_DOWNLOAD_WORKERS,
+                 transcribe_workers=BATCH_TRANSCRIBE_WORKERS,
+                 translate_workers=BATCH_TRANSLATE_WORKERS, queue_size=BATCH_QUEUE_SIZE):
+        self.download_workers = max(1, download_workers)
+        self.transcribe_workers = max(1, transcribe_workers)
+        self.translate_workers = max(1, translate_workers)
+        self.queue_size = max(1, queue_size)
+        self._lock = threading.Lock()
+
+    def expand_urls(self, inputs, max_items=BATCH_MAX_ITEMS):
+        """入力（URL・プレイリスト・チャンネル）を個々のメディアURLに展開（重複は除く）"""
+        urls = []
+        for url in inputs:
+            if is_collection_url(url):
+                expanded = self._expand_collection(url, max_items)
+                logger.info(f"プレイリスト/チャンネル展開: {url} → {len(expanded)}件")
+                urls += expanded
+            else:
+                urls.append(url)
+        return list(dict.fromkeys(urls))
+
+    def execute(self, inputs, translate=False, target_language="en", whisper_model="base",
+                audio_quality="best", use_timestamps=True, keep_video=False, force_whisper=False,
+                transcription_mode=None, max_items=BATCH_MAX_ITEMS, progress_callback=None,
+                start=None, end=None, skim=False, language=None):
+        """一括処理を実行
+
+        Args:
+            inputs: URLの一覧（プレイリスト・チャンネルURLも可）
+            force_whisper: 字幕トラックがあってもWhisperで文字おこしする
+            start / end / skim: 各メディアの文字おこし範囲（秒）と抜粋のみの処理
+            language: 音声の言語（未指定時は設定値、"auto" は各メディアごとに短い区間で判定）
+            progress_callback: 各件の状態が変わるたびに BatchItem を受け取る関数
+
+        Returns:
+            (BatchItemの一覧, 結果一覧ファイルのパス)
+        """
+        urls = self.expand_urls(inputs, max_items)
+        items = [BatchItem(index, url) for index, url in enumerate(urls)]
+        logger.info(f"=== 一括メディア処理開始: {len(items)}件 ===")
+        if not items:
+            return [], None
+
+        # 段階ごとにダウンロード済みのため、ストリーミング方式は通常の方式で処理
+        mode = transcription_mode or TRANSCRIPTION_MODE
+        if mode == "streaming":
+            mode = "sequential"
+
+        options = {
+            'translate': translate,
+            'target_language': target_language,
+            'whisper_model': whisper_model,
+            'audio_quality': audio_quality,
+            'use_timestamps': use_timestamps,
+            'keep_video': keep_video,
+            'force_whisper': force_whisper,
+            'transcription_mode': mode,
+            'start': start,
+            'end': end,
+            'skim': skim,
+            'language': language or TRANSCRIPTION_LANGUAGE,
+        }
+        self._callback = progress_callback
+
+        # Whisperモデルは最初のダウンロード中に読み込んでおく
+        threading.Thread(target=VideoProcessor().initialize_whisper, args=(whisper_model,), daemon=True).start()
+
+        downloads = queue.Queue()
+        transcribes = queue.Queue(maxsize=self.queue_size)
+        translates = queue.Queue(maxsize=self.queue_size)
+        for item in items:
+            downloads.put(item)
+        for _ in range(self.download_workers):
+            downloads.put(_STAGE_END)
+
+        threads = (
+            self._start_stage("download", self._download_stage, downloads, transcribes,
+                              self.download_workers, self.transcribe_workers, options)
+            + self._start_stage("transcribe", self._transcribe_stage, transcribes, translates,
+                                self.transcribe_workers, self.translate_workers, options)
+            + self._start_stage("translate", self._translate_stage, translates, None,
+                                self.translate_workers, 0, options)
+        )
+        for thread in threads:
+            thread.join()
+
+        done = sum(1 for item in items if item.status == "done")
+        logger.info(f"=== 一括メディア処理完了: 成功 {done}件 / 失敗 {len(items) - done}件 ===")
+        return items, self._save_summary(items, options)
+
+    def _start_stage(self, name, handler, inbox, outbox, workers, next_workers, options):
+        """1段階分のワーカースレッドを起動（最後のワーカーが終了時に次段階へ終了を伝える）"""
+        remaining = [workers]
+
+        def run():
+            while True:
+                item = inbox.get()
+                if item is _STAGE_END:
+                    break
+                try:
+                    handler(item, options)
+                except Exception as e:
+                    self._fail(item, f"{name}: {e}")
+                if outbox is not None and item.status != "failed":
+                    outbox.put(item)
+
+            with self._lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last and outbox is not None:
+                for _ in range(next_workers):
+                    outbox.put(_STAGE_END)
+
+        threads = [threading.Thread(target=run, name=f"batch-{name}-{i}", daemon=True) for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _download_stage(self, item, options):
+        """キャッシュ・字幕トラックの確認と音声（または動画）の取得"""
+        media_key = media_key_for_url(item.url)
+        if not media_key:
+            raise ValueError("サポートされていないURL形式です")
+
+        processor = VideoProcessor()
+        processor.model_size = options['whisper_model']
+        processor.setup_output_directory(media_key.replace(":", "_"))
+        item.processor = processor
+
+        # 範囲指定時は全体の文字おこし結果を使わない
+        if not is_partial(options['start'], options['end'], options['skim']):
+            item.transcription_text, item.segments_data = processor.cached_transcription(
+                item.url, options['language'], options['use_timestamps']
+            )
+        if not item.transcription_text and not options['force_whisper']:
+            item.transcription_text, item.segments_data = processor.fetch_captions(
+                item.url, options['language'], options['use_timestamps'],
+                start=options['start'], end=options['end'], skim=options['skim']
+            )
+        if item.transcription_text:
+            return
+
+        self._set_status(item, "downloading")
+        is_youtube = media_key.startswith("youtube:")
+        section = download_section(options['start'], options['end'])
+        if not options['keep_video']:
+            basename = "youtube_audio" if is_youtube else "audio"
+            item.media_path = (processor.cached_audio(item.url)
+                               or processor.download_audio(item.url, basename, section=section))
+        elif is_youtube:
+            item.media_path = processor.download_youtube_video(item.url, options['audio_quality'], section=section)
+        else:
+            item.media_path = processor.download_video_from_tweet(item.url, section=section)
+
+        if not item.media_path:
+            raise RuntimeError("ダウンロードに失敗しました")
+
+    def _transcribe_stage(self, item, options):
+        if item.transcription_text:
+            return
+        self._set_status(item, "transcribing")
+        processor = item.processor
+        if not processor.initialize_whisper(options['whisper_model']):
+            raise RuntimeError("Whisper初期化に失敗しました")
+
+        item.transcription_text, item.segments_data = processor.transcribe_with_cache(
+            item.media_path, item.url, language=options['language'], use_timestamps=options['use_timestamps'],
+            transcription_mode=options['transcription_mode'],
+            start=options['start'], end=options['end'], skim=options['skim']
+        )
+        if not item.transcription_text:
+            raise RuntimeError("文字おこしに失敗しました")
+
+    def _translate_stage(self, item, options):
+        """翻訳（有効時）と結果保存"""
+        processor = item.processor
+        if processor.language_result:
+            item.language = processor.language_result.language
+        if options['translate']:
+            self._set_status(item, "translating")
+            if item.segments_data:
+                item.translation = processor.translate_segments(item.segments_data, options['target_language'])
+            if not item.translation:
+                item.translation = processor.translate_text(item.transcription_text, options['target_language'])
+
+        item.text_file = processor.save_transcription_advanced(
+            video_path=item.media_path or '',
+            transcription_text=item.transcription_text,
+            segments_data=item.segments_data,
+            video_url=item.url,
+            translation=item.translation,
+            video_info=processor.get_video_info(item.url),
+            use_timestamps=options['use_timestamps']
+        )
+        if not item.text_file:
+            raise RuntimeError("結果保存に失敗しました")
+
+        item.processor = None
+        self._set_status(item, "done")
+
+    def _set_status(self, item, status):
+        item.status = status
+        logger.info(f"[{item.index + 1}] {status}: {item.url}")
+        if self._callback:
+            try:
+                self._callback(item)
+            except Exception as e:
+                logger.debug(f"進捗コールバックエラー: {e}")
+
+    def _fail(self, item, error):
+        item.error = error
+        item.processor = None
+        logger.error(f"[{item.index + 1}] 処理失敗: {item.url} - {error}")
+        self._set_status(item, "failed")
+
+    def _expand_collection(self, url, max_items):
+        client = get_download_manager().client()
+        try:
+            if client:
+                return client.expand(url, max_items)
+
+            cmd = ["yt-dlp", "--flat-playlist", "--print", "url", url]
+            if max_items:
+                cmd += ["--playlist-end", str(max_items)]
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+            if result.returncode != 0:
+                logger.error(f"yt-dlpエラー: {result.stderr.strip()[:200]}")
+                return []
+            return [line.strip() for line in result.stdout.splitlines() if line.strip()]
+
+        except Exception as e:
+            logger.error(f"プレイリスト/チャンネル展開エラー: {e}")
+            return []
+
+    def _save_summary(self, items, options):
+        """各件の結果（成功・失敗・出力先）をJSONに保存"""
+        try:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            summary_dir = os.path.join(OUTPUT_DIR, "batch", datetime.now().strftime("%Y-%m-%d"))
+            os.makedirs(summary_dir, exist_ok=True)
+            summary_path = os.path.join(summary_dir, f"{timestamp}_media_batch.json")
+            with open(summary_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'created_at': datetime.now().isoformat(timespec='seconds'),
+                    'options': options,
+                    'total': len(items),
+                    'succeeded': sum(1 for item in items if item.status == "done"),
+                    'items': [item.to_dict() for item in items],
+                }, f, ensure_ascii=False, indent=2)
+            logger.info(f"一括処理結果: {summary_path}")
+            return summary_path
+        except Exception as e:
+            logger.error(f"一括処理結果の保存エラー: {e}")
+            return None
@@ -0,0 +1,211 @@
+"""定期ジョブ向け差分Claude分析ワークフロー"""
+import json
+import logging
+import os
+from datetime import datetime
+from lib.chrome_connector import ChromeConnector
+from lib.claude_automation import ClaudeAutomation, DEFAULT_FILE_ANALYSIS_PROMPT
+from lib.formatter import Formatter
+from lib.tweet_analytics import TweetAnalytics, format_analytics_summary
+from lib.tweet_selector import TweetSelector
+from config.settings import (
+    SCHEDULER_STATE_PATH, INCREMENTAL_SUMMARY_MAX_CHARS, INCREMENTAL_MAX_SEEN,
+    INCREMENTAL_MAX_TWEETS
+)
+
+logger = logging.getLogger(__name__)
+
+# 次回の差分分析に引き継ぐ要約をClaudeに書いてもらう見出し
+SUMMARY_HEADING = "【要約】"
+SUMMARY_REQUEST = (
+    f"\n\n回答の最後に「{SUMMARY_HEADING}」という見出しを付け、次回の比較に使えるよう"
+    f"ここまでの結論と注目点を{INCREMENTAL_SUMMARY_MAX_CHARS // 4}字程度でまとめてください。"
+)
+
+
+def extract_summary(analysis, max_chars=INCREMENTAL_SUMMARY_MAX_CHARS):
+    """分析結果から引き継ぐ要約（見出しがなければ結論の多い末尾を残す）"""
+    analysis = (analysis or "").strip()
+    index = analysis.rfind(SUMMARY_HEADING)
+    if index >= 0:
+        summary = analysis[index + len(SUMMARY_HEADING):].strip()
+        if summary:
+            return summary[:max_chars]
+    if len(analysis) <= max_chars:
+        return analysis
+    return "…" + analysis[-(max_chars - 1):]
+
+
+class AnalysisStateStore:
+    """ジョブごとの前回分析状態（チャットURL・要約・既読ツイート）をJSONで保持"""
+
+    def __init__(self, state_path=SCHEDULER_STATE_PATH):
+        self.state_path = state_path
+
+    def load(self, job_name):
+        """ジョブの状態を取得"""
+        return self._load_all().get(job_name, {})
+
+    def save(self, job_name, job_state):
+        """ジョブの状態を保存"""
+        states = self._load_all()
+        states[job_name] = job_state
+        try:
+            os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+            tmp_path = self.state_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(states, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            logger.error(f"分析状態保存エラー: {e}")
+
+    def _load_all(self):
+        if not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"分析状態読み込みエラー（初期化します）: {e}")
+            return {}
+
+
+class IncrementalClaudeAnalysis:
+    def __init__(self, job_name, state_store=None):
+        self.job_name = job_name
+        self.state_store = state_store or AnalysisStateStore()
+        self.chrome = ChromeConnector()
+        self.claude = None
+
+    def execute(self, file_path, analysis_prompt=None):
+        """前回からの新規ツイートのみを同じチャットに送信して分析"""
+        logger.info(f"=== 差分Claude分析開始: {self.job_name} ===")
+        logger.info(f"ファイル: {file_path}")
+
+        try:
+            if not os.path.exists(file_path):
+                logger.error(f"ファイルが見つかりません: {file_path}")
+                return None
+
+            tweets = Formatter.load_tweets(file_path)
+            if not tweets:
+                # 読み込めない場合に「新規なし」として前回の分析結果を返さない
+                logger.error(f"ツイートを読み込めません（差分分析を中止します）: {file_path}")
+                return None
+            state = self.state_store.load(self.job_name)
+            seen = state.get("seen_tweets", [])
+            seen_set = set(seen)
+            new_tweets = [t for t in tweets if self._tweet_key(t) not in seen_set]
+
+            logger.info(f"取得 {len(tweets)}件 / 新規 {len(new_tweets)}件")
+
+            if state.get("chat_url") and not new_tweets:
+                logger.info("新規ツイートがないため分析をスキップします（前回の分析結果を返します）")
+                return state.get("analysis_file")
+
+            if not self.chrome.connect():
+                logger.error("Chrome接続に失敗しました")
+                return None
+            self.claude = ClaudeAutomation(self.chrome)
+
+            analysis, chat_url, mode = None, None, None
+            if state.get("chat_url"):
+                prompt = self._create_followup_prompt(new_tweets, state, analysis_prompt)
+                logger.info(f"差分プロンプト送信: {len(prompt)}文字")
+                analysis, chat_url = self.claude.send_followup(state["chat_url"], prompt)
+                mode = "差分"
+                if not analysis:
+                    logger.warning("フォローアップに失敗したため新規チャットで全体分析します")
+
+            if not analysis:
+                analysis, chat_url = self.claude.upload_and_analyze_file(
+                    file_path, (analysis_prompt or DEFAULT_FILE_ANALYSIS_PROMPT) + SUMMARY_REQUEST
+                )
+                mode = "全体"
+
+            if not analysis:
+                logger.error("Claude分析に失敗しました")
+                return None
+
+            analysis_file = self._write_analysis_file(file_path, analysis, chat_url, mode, len(new_tweets))
+            self._save_state(state, seen, tweets, analysis, chat_url, analysis_file)
+            return analysis_file
+
+        except Exception as e:
+            logger.error(f"差分分析エラー: {e}")
+            return None
+
+    def _tweet_key(self, tweet):
+        """ツイートの同一性キー（URL優先）"""
+        return tweet.get('url') or f"{tweet.get('username', '')}:{tweet.get('text', '')[:100]}"
+
+    def _save_state(self, state, seen, tweets, summary, chat_url, analysis_file):
+        """既読ツイート・要約・チャットURLを更新"""
+        seen = list(seen)
+        seen_set = set(seen)
+        for tweet in tweets:
+            key = self._tweet_key(tweet)
+            if key not in seen_set:
+                seen.append(key)
+                seen_set.add(key)
+
+        self.state_store.save(self.job_name, {
+            "chat_url": chat_url,
+            "summary": extract_summary(summary),
+            "analysis_file": analysis_file,
+            "seen_tweets": seen[-INCREMENTAL_MAX_SEEN:],
+            "last_run": datetime.now().isoformat(timespec="seconds"),
+            "previous_run": state.get("last_run"),
+        })
+
+    def _create_followup_prompt(self, new_tweets, state, analysis_prompt=None):
+        """前回要約からの変化を尋ねるコンパクトなプロンプトを作成"""
+        prompt = f"前回の分析（{state.get('last_run', '不明')}）以降に取得された新規ツイートです。\n"
+        prompt += "前回の要約からの変化点を中心に分析してください。\n\n"
+
+        if analysis_prompt:
+            prompt += f"【分析観点】\n{analysis_prompt}\n\n"
+
+        if state.get("summary"):
+            prompt += f"【前回の要約】\n{state['summary']}\n\n"
+
+        prompt += "【新規ツイートの集計】\n"
+        prompt += format_analytics_summary(TweetAnalytics().analyze(new_tweets)) + "\n\n"
+
+        # 件数が多い場合は先頭N件ではなくトピック別の代表ツイートを掲載
+        shown, _ = TweetSelector().select(new_tweets, max_items=INCREMENTAL_MAX_TWEETS)
+        prompt += f"【新規ツイート {len(new_tweets)}件"
+        if len(new_tweets) > len(shown):
+            prompt += f"（うち{len(shown)}件を掲載）"
+        prompt += "】\n"
+
+        for i, tweet in enumerate(shown, 1):
+            text = tweet.get('text', '').replace("\n", " ")[:200]
+            prompt += (
+                f"{i}. {tweet.get('username', '')} {tweet.get('datetime', '')} "
+                f"(いいね:{tweet.get('likes', 0)} RP:{tweet.get('reposts', 0)}) {text}\n"
+            )
+
+        return prompt + SUMMARY_REQUEST
+
+    def _write_analysis_file(self, file_path, analysis, chat_url, mode, new_count):
+        """分析結果を元ファイルと同じディレクトリに保存"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        base_name = os.path.splitext(os.path.basename(file_path))[0]
+        analysis_file = os.path.join(
+            os.path.dirname(file_path),
+            f"{timestamp}_{base_name}_claude_analysis.txt"
+        )
+
+        with open(analysis_file, 'w', encoding='utf-8') as f:
+            f.write(f"元ファイル: {file_path}\n")
+            if chat_url:
+                f.write(f"Claude URL: {chat_url}\n")
+            f.write(f"分析日時: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write(f"分析モード: {mode}（新規ツイート {new_count}件）\n")
+            f.write("=" * 50 + "\n\n")
+            f.write("【Claude分析結果】\n")
+            f.write(analysis)
+
+        logger.info(f"分析完了: {analysis_file}")
+        return analysis_file
@@ -0,0 +1,51 @@
+"""ローカル集計のみの分析ワークフロー（LLM不使用）"""
+import logging
+import os
+from datetime import datetime
+from lib.formatter import Formatter
+from lib.tweet_analytics import TweetAnalytics, format_analytics_summary
+
+logger = logging.getLogger(__name__)
+
+class LocalAnalysisWorkflow:
+    def __init__(self):
+        self.analytics = TweetAnalytics()
+
+    def execute(self, file_path):
+        """取得済みファイルをローカル集計してレポートを保存"""
+        logger.info("=== ローカル集計開始 ===")
+        logger.info(f"ファイル: {file_path}")
+
+        try:
+            if not os.path.exists(file_path):
+                logger.error(f"ファイルが見つかりません: {file_path}")
+                return None
+
+            tweets = Formatter.load_tweets(file_path)
+            if not tweets:
+                logger.warning("集計対象のツイートがありません")
+                return None
+
+            summary = format_analytics_summary(self.analytics.analyze(tweets))
+
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            base_name = os.path.splitext(os.path.basename(file_path))[0]
+            summary_file = os.path.join(
+                os.path.dirname(file_path),
+                f"{timestamp}_{base_name}_local_summary.txt"
+            )
+
+            with open(summary_file, 'w', encoding='utf-8') as f:
+                f.write(f"元ファイル: {file_path}\n")
+                f.write(f"集計日時: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+                f.write("=" * 50 + "\n\n")
+                f.write("【ローカル集計結果】\n")
+                f.write(summary)
+                f.write("\n")
+
+            logger.info(f"ローカル集計完了: {summary_file}")
+            return summary_file
+
+        except Exception as e:
+            logger.error(f"ローカル集計エラー: {e}")
+            return None
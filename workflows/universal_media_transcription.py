@@ -1,10 +1,15 @@
 """統合メディア処理ワークフロー（Twitter + YouTube対応）"""
 import logging
 import os
-import subprocess
 from lib.chrome_connector import ChromeConnector
 from lib.video_processor import VideoProcessor
 from lib.utils import setup_logging
+from lib.time_ranges import is_partial, download_section, describe_windows
+from lib.language_probe import is_auto
+from config.settings import (
+    TRANSCRIPTION_MODE, TRANSCRIPTION_LANGUAGE,
+    STAGE_METADATA_TIMEOUT, STAGE_CAPTIONS_TIMEOUT, STAGE_PAGE_TIMEOUT, STAGE_COMMENTS_TIMEOUT
+)
 
 logger = logging.getLogger(__name__)
 
@@ -12,17 +17,29 @@ class UniversalMediaTranscriptionWorkflow:
     def __init__(self):
         self.chrome = ChromeConnector()
         self.video_processor = VideoProcessor()
+        self.video_processor.browser = self.chrome  # ツイート動画はブラウザの通信から直接取得
     
     def execute(self, media_url, translate=False, target_language="en", whisper_model="base", 
                 audio_quality="best", use_timestamps=True, comment_count: int | None = None,
-                download_video=True, force_whisper=False):
-        """統合メディア処理を実行"""
+                download_video=True, force_whisper=False, keep_video=False, transcription_mode=None,
+                start=None, end=None, skim=False, language=None):
+        """統合メディア処理を実行
+
+        start / end: 文字おこしする範囲（秒）。skim: 範囲内の等間隔の区間だけを文字おこし
+        language: 音声の言語（未指定時は設定値、"auto" は短い区間で判定）
+        """
+        language = language or TRANSCRIPTION_LANGUAGE
         logger.info(f"=== 統合メディア処理開始 ===")
         logger.info(f"対象URL: {media_url}")
         logger.info(f"翻訳: {'有効' if translate else '無効'}")
         logger.info(f"Whisperモデル: {whisper_model}")
         logger.info(f"タイムスタンプ: {'有効' if use_timestamps else '無効'}")
-        logger.info(f"動画ダウンロード: {'有効（Whisper文字おこし）' if download_video else '無効（DOM字幕優先）'}")
+        logger.info(f"動画ダウンロード: {'有効（Whisper文字おこし）' if download_video else '無効（ページの字幕優先）'}")
+        logger.info(f"取得形式: {'動画（保存）' if keep_video else '音声のみ'}")
+        partial = is_partial(start, end, skim)
+        section = download_section(start, end)
+        if partial:
+            logger.info(f"文字おこし範囲: {describe_windows([(start or 0, end)])}{'（スキム）' if skim else ''}")
         
         try:
             # URL種別判定
@@ -39,73 +56,112 @@ class UniversalMediaTranscriptionWorkflow:
             # 出力ディレクトリ設定
             output_dir = self.video_processor.setup_output_directory(query)
 
-            # 先にYouTube DOM字幕/コメント取得を試みる（ダウンロード前）
+            # 先にYouTubeページの字幕/コメント取得を試みる（ダウンロード前）
             from lib.youtube_scraper import YouTubeScraper
-            dom_text = None
+            page_track = None
             comments = []
             if media_type == "youtube":
                 if self.chrome.connect():
-                    logger.info("YouTubeページを開いてDOM字幕/コメントを先行取得します")
+                    logger.info("YouTubeページを開いて字幕/コメントを先行取得します")
                     yt = YouTubeScraper(self.chrome)
                     if yt.navigate(media_url):
-                        dom_text = yt.extract_dom_subtitles()
+                        page_track = yt.extract_subtitles(None if is_auto(language) else language)
                         if comment_count and comment_count > 0:
-                            comments = yt.extract_comments(comment_count)
+                            comments = yt.extract_comments(
+                                comment_count, output_path=os.path.join(output_dir, "youtube_comments.jsonl")
+                            )
                 else:
-                    logger.warning("Chrome接続に失敗（DOM字幕/コメント取得はスキップ）")
+                    logger.warning("Chrome接続に失敗（ページの字幕/コメント取得はスキップ）")
 
-            # Whisperモデル初期化（DOMが無ければ後で使用）
+            # Whisperモデル初期化（ページの字幕が無ければ後で使用）
             whisper_ready = self.video_processor.initialize_whisper(whisper_model)
             if not whisper_ready:
-                logger.warning("Whisper初期化に失敗（DOM字幕に期待）")
+                logger.warning("Whisper初期化に失敗（ページの字幕に期待）")
 
             # 文字おこし処理の分岐（新ロジック）
             transcription_text = None
             segments_data = None
             video_path = None
             
-            # DOM字幕が利用可能かチェック
-            has_dom_subtitles = dom_text and len(dom_text) > 50
+            # ページの字幕が利用可能かチェック（時刻付きのため範囲指定時は対象区間のセグメントだけを使う）
+            has_page_captions = page_track is not None
+
+            def use_page_track():
+                return self.video_processor.use_caption_track(
+                    page_track, use_timestamps, start=start, end=end, skim=skim,
+                    source="captions" if is_auto(language) else "specified"
+                )
+            
+            # 同じメディア・モデル・言語の文字おこし済み結果があれば再利用（範囲指定時は全体の結果のため使わない）
+            if download_video and not partial and (force_whisper or not has_page_captions):
+                transcription_text, segments_data = self.video_processor.cached_transcription(
+                    media_url, language, use_timestamps
+                )
+            
+            # 字幕トラック（投稿者の字幕・自動生成字幕）があれば音声を取得せずに使用
+            if not transcription_text and not has_page_captions and not force_whisper:
+                transcription_text, segments_data = self.video_processor.fetch_captions(
+                    media_url, language, use_timestamps, start=start, end=end, skim=skim
+                )
+            
+            # ストリーミング方式（取得済み音声がなければダウンロードしながら文字おこし）
+            use_stream = (download_video and not keep_video and not partial
+                          and (transcription_mode or TRANSCRIPTION_MODE) == "streaming"
+                          and (force_whisper or not has_page_captions)
+                          and not self.video_processor.cached_audio(media_url))
             
             # 動画ダウンロード処理
-            if download_video:
+            if transcription_text:
+                logger.info("キャッシュ済み/字幕トラックの文字おこし結果を使用します（ダウンロード・文字おこしをスキップ）")
+            elif use_stream:
+                logger.info("ダウンロードと並行してWhisperで文字おこしを実行します")
+                basename = "youtube_audio" if media_type == "youtube" else "audio"
+                video_path, transcription_text, segments_data = self.video_processor.transcribe_stream(
+                    media_url, language=language, use_timestamps=use_timestamps, basename=basename
+                )
+                if not transcription_text and has_page_captions:
+                    logger.info("ストリーミング文字おこし失敗のため、ページの字幕を使用します")
+                    transcription_text, segments_data = use_page_track()
+            elif download_video:
                 logger.info("動画ダウンロードが有効のため動画を取得します")
-                # 動画ダウンロード（プラットフォーム別）
-                if media_type == "youtube":
-                    video_path = self._download_youtube_video(media_url, audio_quality)
+                # 動画ダウンロード（プラットフォーム別、保存不要なら音声のみ）
+                if not keep_video:
+                    basename = "youtube_audio" if media_type == "youtube" else "audio"
+                    video_path = (self.video_processor.cached_audio(media_url)
+                                  or self.video_processor.download_audio(media_url, basename, section=section))
+                elif media_type == "youtube":
+                    video_path = self._download_youtube_video(media_url, audio_quality, section)
                 else:
-                    video_path = self.video_processor.download_video_from_tweet(media_url)
+                    video_path = self.video_processor.download_video_from_tweet(media_url, section=section)
 
                 if not video_path:
                     logger.error("動画ダウンロードに失敗しました")
-                    # DOM字幕があればフォールバック
-                    if has_dom_subtitles:
-                        logger.info("動画ダウンロード失敗のため、DOM字幕を使用します")
-                        transcription_text = dom_text
-                        segments_data = None
+                    # ページの字幕があればフォールバック
+                    if has_page_captions:
+                        logger.info("動画ダウンロード失敗のため、ページの字幕を使用します")
+                        transcription_text, segments_data = use_page_track()
                     else:
                         return None, None, None, None
                 else:
                     # 文字おこし方法の選択
-                    if force_whisper or not has_dom_subtitles:
+                    if force_whisper or not has_page_captions:
                         logger.info("Whisperで文字おこしを実行します")
                         # 動画情報取得
                         video_info = self.video_processor.get_video_info(media_url)
-                        transcription_text, segments_data = self.video_processor.transcribe_video(
-                            video_path, language="ja", use_timestamps=use_timestamps
+                        transcription_text, segments_data = self.video_processor.transcribe_with_cache(
+                            video_path, media_url, language=language, use_timestamps=use_timestamps,
+                            transcription_mode=transcription_mode, start=start, end=end, skim=skim
                         )
                     else:
-                        logger.info("DOM字幕が利用可能のため、DOM字幕を使用します（Whisperスキップ）")
-                        transcription_text = dom_text
-                        segments_data = None
+                        logger.info("ページの字幕が利用可能のため、ページの字幕を使用します（Whisperスキップ）")
+                        transcription_text, segments_data = use_page_track()
             else:
                 # 動画ダウンロードなし
-                if has_dom_subtitles:
-                    logger.info("動画ダウンロード無効、DOM字幕を使用します")
-                    transcription_text = dom_text
-                    segments_data = None
+                if has_page_captions:
+                    logger.info("動画ダウンロード無効、ページの字幕を使用します")
+                    transcription_text, segments_data = use_page_track()
                 else:
-                    logger.warning("動画ダウンロードが無効でDOM字幕も利用できないため処理を終了します")
+                    logger.warning("動画ダウンロードが無効でページの字幕も利用できないため処理を終了します")
                     return None, None, None, None
             
             if not transcription_text:
@@ -115,16 +171,20 @@ class UniversalMediaTranscriptionWorkflow:
             # 翻訳（オプション）
             translation = None
             if translate and transcription_text:
-                # タイムスタンプ情報を除去してから翻訳
-                clean_text = self._remove_timestamps_for_translation(transcription_text)
-                translation = self.video_processor.translate_text(clean_text, target_language)
+                # セグメントがあれば時刻を保ったまま翻訳（翻訳字幕も作成）
+                if segments_data:
+                    translation = self.video_processor.translate_segments(segments_data, target_language)
+                if not translation:
+                    # タイムスタンプ情報を除去してから翻訳
+                    clean_text = self._remove_timestamps_for_translation(transcription_text)
+                    translation = self.video_processor.translate_text(clean_text, target_language)
             
-            # 動画情報取得（DOMのみで完結した場合でも可能なら取得）
+            # 動画情報取得（ページの字幕のみで完結した場合でも可能なら取得）
             video_info = self.video_processor.get_video_info(media_url)
 
             # 結果保存（拡張版）
             text_file = self.video_processor.save_transcription(
-                video_path if 'video_path' in locals() else '',
+                video_path or '',
                 transcription_text,
                 segments_data,
                 media_url,
@@ -133,17 +193,9 @@ class UniversalMediaTranscriptionWorkflow:
                 video_info
             )
 
-            # 追加: コメント保存（jsonl）
+            # コメントは取得しながら youtube_comments.jsonl へ保存済み
             if media_type == "youtube" and comments:
-                try:
-                    import os, json
-                    comments_path = os.path.join(self.video_processor.output_dir, "youtube_comments.jsonl")
-                    with open(comments_path, 'w', encoding='utf-8') as f:
-                        for item in comments:
-                            f.write(json.dumps(item, ensure_ascii=False) + "\n")
-                    logger.info(f"コメント保存: {comments_path} ({len(comments)})")
-                except Exception as e:
-                    logger.warning(f"コメント保存エラー: {e}")
+                logger.info(f"コメント保存: {os.path.join(output_dir, 'youtube_comments.jsonl')} ({len(comments)})")
             
             if text_file:
                 logger.info(f"=== 処理完了 ===")
@@ -162,8 +214,10 @@ class UniversalMediaTranscriptionWorkflow:
     def execute_with_callback(self, url, translate=False, target_language="en", 
                             whisper_model="base", audio_quality="best", 
                             use_timestamps=True, progress_callback=None, comment_count: int | None = None,
-                            download_video=True, force_whisper=False):
+                            download_video=True, force_whisper=False, keep_video=False,
+                            transcription_mode=None, start=None, end=None, skim=False, language=None):
         """統合メディア処理（コールバック付き）"""
+        language = language or TRANSCRIPTION_LANGUAGE
         video_path = None
         text_file = None
         transcription_text = None
@@ -175,6 +229,11 @@ class UniversalMediaTranscriptionWorkflow:
             logger.info(f"翻訳: {'有効' if translate else '無効'}")
             logger.info(f"Whisperモデル: {whisper_model}")
             logger.info(f"タイムスタンプ: {'有効' if use_timestamps else '無効'}")
+            logger.info(f"取得形式: {'動画（保存）' if keep_video else '音声のみ'}")
+            partial = is_partial(start, end, skim)
+            section = download_section(start, end)
+            if partial:
+                logger.info(f"文字おこし範囲: {describe_windows([(start or 0, end)])}{'（スキム）' if skim else ''}")
             
             # Chrome接続
             from lib.chrome_connector import ChromeConnector
@@ -183,111 +242,192 @@ class UniversalMediaTranscriptionWorkflow:
             # 動画処理器初期化
             from lib.video_processor import VideoProcessor
             processor = VideoProcessor()
+            processor.browser = self.chrome  # ツイート動画はブラウザの通信から直接取得
             processor.setup_output_directory(url)
             processor.initialize_whisper(whisper_model)
             
-            # YouTube vs Twitter判定（DOM字幕を先に試行するため、YouTubeはここでDLしない）
+            # 同じメディア・モデル・言語の文字おこし済み結果があれば再利用（範囲指定時は使わない）
+            segments_data = None
+            if download_video and not partial:
+                transcription_text, segments_data = processor.cached_transcription(url, language, use_timestamps)
+            
+            # ストリーミング方式（取得済み音声がなければダウンロードしながら文字おこし）
+            use_stream = (download_video and not keep_video and not partial
+                          and (transcription_mode or TRANSCRIPTION_MODE) == "streaming"
+                          and not processor.cached_audio(url))
+            
+            # YouTube vs Twitter判定（YouTubeは段階ごとに並行して処理するため、ここでDLしない）
             is_youtube = ('youtube.com' in url or 'youtu.be' in url)
             video_path = None
-            if not is_youtube:
+            # ツイートも字幕トラックがあればダウンロード不要
+            if not is_youtube and not transcription_text and not force_whisper:
+                transcription_text, segments_data = processor.fetch_captions(
+                    url, language, use_timestamps, start=start, end=end, skim=skim
+                )
+            if not is_youtube and not transcription_text and not use_stream:
                 logger.info("Twitter動画ダウンロード開始: " + url)
-                video_path = processor.download_video_from_tweet(url)
+                if keep_video:
+                    video_path = processor.download_video_from_tweet(url, section=section)
+                else:
+                    video_path = processor.cached_audio(url) or processor.download_audio(url, "audio", section=section)
                 if not video_path:
                     logger.error("動画ダウンロードに失敗しました")
                     return None, None, None, None
                 logger.info(f"動画ダウンロード完了: {video_path}")
             
-            # YouTube DOM字幕/コメントの先行取得（DL前に実施）
-            from lib.youtube_scraper import YouTubeScraper
-            import threading
-            import time
-            
-            dom_text = None
             comments = []
             video_info = None
-            
-            if is_youtube:
-                # 動画情報取得を並行処理で開始
-                def get_video_info_async():
-                    nonlocal video_info
-                    try:
-                        video_info = processor.get_video_info(url)
-                        if video_info:
-                            logger.info(f"動画情報: {video_info}")
-                    except Exception as e:
-                        logger.warning(f"動画情報取得エラー: {e}")
-                
-                # 並行処理で動画情報取得開始
-                info_thread = threading.Thread(target=get_video_info_async, daemon=True)
-                info_thread.start()
-                
-                # DOM字幕/コメント取得を並行実行
-                if self.chrome.connect():
-                    logger.info("YouTubeページを開いてDOM字幕/コメントを先行取得します")
-                    logger.info(f"コメント取得設定: comment_count={comment_count}")
-                    yt = YouTubeScraper(self.chrome)
-                    if yt.navigate(url):
-                        dom_text = yt.extract_dom_subtitles()
-                        logger.info(f"DOM字幕結果: {'取得成功' if dom_text and len(dom_text) > 50 else '取得失敗またはデータ不足'}")
-                        if comment_count and comment_count > 0:
-                            logger.info(f"コメント取得開始: 最大{comment_count}件")
-                            comments = yt.extract_comments(comment_count)
-                            logger.info(f"コメント取得完了: {len(comments)}件")
-                        else:
-                            logger.info("コメント取得はスキップ（comment_count=0または未設定）")
-                    else:
-                        logger.warning("YouTubeページナビゲーションに失敗")
-                else:
-                    logger.warning("Chrome接続に失敗（DOM字幕/コメント取得はスキップ）")
-                
-                # 動画情報取得完了を待機
-                info_thread.join(timeout=30)  # 最大30秒待機
-                if not video_info:
-                    logger.warning("動画情報取得がタイムアウトしました")
+            runner = None
 
-            # 文字おこし処理の分岐（賢い判定）
-            has_dom_subtitles = dom_text and len(dom_text) > 50
-            
-            if download_video:
-                logger.info("動画ダウンロードが有効のため動画を取得します")
-                # 必要に応じて動画をDL
-                if is_youtube:
-                    logger.info("YouTube動画ダウンロード開始: " + url)
-                    video_path = processor.download_youtube_video(url)
-                # ここまでで video_path が未設定ならエラー
-                if not video_path:
-                    logger.error("動画ダウンロードに失敗しました")
-                    # DOM字幕があればフォールバック
-                    if has_dom_subtitles:
-                        logger.info("動画ダウンロード失敗のため、DOM字幕を使用します")
-                        transcription_text = dom_text
-                        segments_data = None
-                    else:
-                        return None, None, None, None
-                else:
+            def choose_transcription(video_path, transcription_text, segments_data, page_track):
+                """文字おこし方法の選択（続行できない場合は None）
+
+                キャッシュ/字幕トラック → ストリーミング → Whisper/ページの字幕の順。
+                """
+                has_page_captions = page_track is not None
+
+                def page_result():
+                    # ページの字幕も時刻付きのため、範囲指定時は対象区間のセグメントだけを使う
+                    return (video_path,) + processor.use_caption_track(
+                        page_track, use_timestamps, start=start, end=end, skim=skim,
+                        source="captions" if is_auto(language) else "specified"
+                    )
+
+                if transcription_text:
+                    logger.info("キャッシュ済み/字幕トラックの文字おこし結果を使用します（ダウンロード・文字おこしをスキップ）")
+                    return video_path, transcription_text, segments_data
+                if use_stream:
+                    if has_page_captions and not force_whisper:
+                        logger.info("ページの字幕が利用可能のため、ページの字幕を使用します")
+                        return page_result()
+                    logger.info("ダウンロードと並行してWhisperで文字おこしを実行します")
+                    video_path, transcription_text, segments_data = processor.transcribe_stream(
+                        url,
+                        language=language,
+                        use_timestamps=use_timestamps,
+                        progress_callback=progress_callback,
+                        basename="youtube_audio" if is_youtube else "audio"
+                    )
+                    if not transcription_text and has_page_captions:
+                        logger.info("ストリーミング文字おこし失敗のため、ページの字幕を使用します")
+                        return page_result()
+                    return video_path, transcription_text, segments_data
+                if download_video:
+                    if not video_path:
+                        logger.error("動画ダウンロードに失敗しました")
+                        # ページの字幕があればフォールバック
+                        if has_page_captions:
+                            logger.info("動画ダウンロード失敗のため、ページの字幕を使用します")
+                            return page_result()
+                        return None
                     # 文字おこし方法の選択
-                    if force_whisper or not has_dom_subtitles:
+                    if force_whisper or not has_page_captions:
                         logger.info("Whisperで文字おこしを実行します")
                         logger.info(f"文字おこし開始: {video_path}")
-                        transcription_text, segments_data = processor.transcribe_video(
+                        transcription_text, segments_data = processor.transcribe_with_cache(
                             video_path, 
-                            language="ja", 
+                            url,
+                            language=language, 
                             use_timestamps=use_timestamps,
-                            progress_callback=progress_callback
+                            progress_callback=progress_callback,
+                            transcription_mode=transcription_mode,
+                            start=start,
+                            end=end,
+                            skim=skim
                         )
-                    else:
-                        logger.info("DOM字幕が利用可能のため、DOM字幕を使用します（動画は保存済み）")
-                        transcription_text = dom_text
-                        segments_data = None
-            else:
+                        return video_path, transcription_text, segments_data
+                    logger.info("ページの字幕が利用可能のため、ページの字幕を使用します（動画は保存済み）")
+                    return page_result()
                 # 動画ダウンロードなし
-                if has_dom_subtitles:
-                    logger.info("動画ダウンロード無効、DOM字幕を使用します")
-                    transcription_text = dom_text
-                    segments_data = None
-                else:
-                    logger.warning("動画ダウンロードが無効でDOM字幕も利用できないため処理を終了します")
-                    return None, None, None, None
+                if has_page_captions:
+                    logger.info("動画ダウンロード無効、ページの字幕を使用します")
+                    return page_result()
+                logger.warning("動画ダウンロードが無効でページの字幕も利用できないため処理を終了します")
+                return None
+
+            if is_youtube:
+                # 動画情報・字幕トラック・ページ（字幕→コメント）・ダウンロードを並行して進め、
+                # 文字おこしは必要な結果がそろい次第開始（所要時間は最も長い依存の連なりで決まる）
+                from lib.stage_runner import StageRunner
+                from lib.youtube_scraper import YouTubeScraper
+
+                def fetch_info():
+                    info = processor.get_video_info(url)
+                    if info:
+                        logger.info(f"動画情報: {info}")
+                    return info
+
+                def fetch_track():
+                    if transcription_text or force_whisper:
+                        return None
+                    text, segments = processor.fetch_captions(
+                        url, language, use_timestamps, start=start, end=end, skim=skim
+                    )
+                    return (text, segments) if text else None
+
+                def open_page():
+                    # ChromeConnector は1つのタブを操作するため、ページの字幕とコメントは同じ段階の連なりで順に取得
+                    if not self.chrome.connect():
+                        logger.warning("Chrome接続に失敗（ページの字幕/コメント取得はスキップ）")
+                        return None
+                    logger.info("YouTubeページを開いて字幕/コメントを取得します")
+                    yt = YouTubeScraper(self.chrome)
+                    if not yt.navigate(url):
+                        logger.warning("YouTubeページナビゲーションに失敗")
+                        return None
+                    page_track = yt.extract_subtitles(None if is_auto(language) else language)
+                    logger.info(f"ページの字幕: {'取得成功' if page_track else '取得失敗またはデータ不足'}")
+                    return yt, page_track
+
+                def harvest_comments(page):
+                    logger.info(f"コメント取得設定: comment_count={comment_count}")
+                    if not comment_count or comment_count <= 0:
+                        logger.info("コメント取得はスキップ（comment_count=0または未設定）")
+                        return []
+                    if not page:
+                        return []
+                    logger.info(f"コメント取得開始: 最大{comment_count}件")
+                    items = page[0].extract_comments(
+                        comment_count, output_path=os.path.join(processor.output_dir, "youtube_comments.jsonl")
+                    )
+                    logger.info(f"コメント取得完了: {len(items)}件")
+                    return items
+
+                def download(track):
+                    # キャッシュ済み・字幕トラックで足りる場合とストリーミング時はダウンロードしない
+                    if transcription_text or track or not download_video or use_stream:
+                        return None
+                    logger.info("YouTube動画ダウンロード開始: " + url)
+                    if keep_video:
+                        return processor.download_youtube_video(url, section=section)
+                    return (processor.cached_audio(url)
+                            or processor.download_audio(url, "youtube_audio", section=section))
+
+                def transcribe(track, downloaded):
+                    text, segments = track or (transcription_text, segments_data)
+                    # ページの字幕はキャッシュ・字幕トラックがない場合のみ必要なため、そのときだけページを待つ
+                    page = None if text else runner.wait("page")
+                    return choose_transcription(downloaded, text, segments, page[1] if page else None)
+
+                runner = StageRunner("youtube")
+                runner.add("metadata", fetch_info, timeout=STAGE_METADATA_TIMEOUT)
+                runner.add("captions", fetch_track, timeout=STAGE_CAPTIONS_TIMEOUT)
+                runner.add("page", open_page, timeout=STAGE_PAGE_TIMEOUT)
+                runner.add("comments", harvest_comments, depends_on=("page",), timeout=STAGE_COMMENTS_TIMEOUT)
+                runner.add("download", download, depends_on=("captions",))
+                runner.add("transcribe", transcribe, depends_on=("captions", "download"))
+                runner.start()
+
+                outcome = runner.wait("transcribe")
+                video_info = runner.wait("metadata")
+                if not video_info:
+                    logger.warning("動画情報を取得できませんでした")
+            else:
+                outcome = choose_transcription(video_path, transcription_text, segments_data, None)
+
+            if outcome is None:
+                return None, None, None, None
+            video_path, transcription_text, segments_data = outcome
             
             if not transcription_text:
                 logger.error("文字おこしに失敗しました")
@@ -296,10 +436,13 @@ class UniversalMediaTranscriptionWorkflow:
             # 翻訳（必要な場合）
             if translate and transcription_text:
                 logger.info("翻訳開始...")
-                translation = processor.translate_text(transcription_text, target_language)
+                if segments_data:
+                    translation = processor.translate_segments(segments_data, target_language)
+                if not translation:
+                    translation = processor.translate_text(transcription_text, target_language)
                 logger.info("翻訳完了")
             
-            # 結果保存（DOM字幕のみの場合はvideo_pathが空文字列）
+            # 結果保存（ページの字幕のみの場合はvideo_pathが空文字列）
             text_file = processor.save_transcription_advanced(
                 video_path=video_path if video_path else '',
                 transcription_text=transcription_text,
@@ -310,17 +453,12 @@ class UniversalMediaTranscriptionWorkflow:
                 use_timestamps=use_timestamps
             )
 
-            # コメント保存
+            # コメントは取得しながら youtube_comments.jsonl へ保存（文字おこし・保存は取得完了を待たない）
+            if runner:
+                comments = runner.wait("comments") or []
+                runner.join()
             if comments:
-                try:
-                    import os, json
-                    comments_path = os.path.join(processor.output_dir, "youtube_comments.jsonl")
-                    with open(comments_path, 'w', encoding='utf-8') as f:
-                        for item in comments:
-                            f.write(json.dumps(item, ensure_ascii=False) + "\n")
-                    logger.info(f"コメント保存: {comments_path} ({len(comments)})")
-                except Exception as e:
-                    logger.warning(f"コメント保存エラー: {e}")
+                logger.info(f"コメント保存: {os.path.join(processor.output_dir, 'youtube_comments.jsonl')} ({len(comments)})")
             
             logger.info("=== 処理完了 ===")
             logger.info(f"動画: {video_path}")
@@ -393,60 +531,7 @@ class UniversalMediaTranscriptionWorkflow:
         clean_text = re.sub(r'\[\d{2}:\d{2}-\d{2}:\d{2}\]\s*', '', text_with_timestamps)
         return clean_text.strip()
    
-    def _download_youtube_video(self, youtube_url, audio_quality="best"):
-        """YouTubeから動画をダウンロード（フォールバック付き）"""
-        try:
-            logger.info(f"YouTube動画ダウンロード開始: {youtube_url}")
-            
-            # 品質別フォーマット優先順位
-            quality_formats = {
-                "best": [
-                    "best[height<=720]/best[height<=480]/best",
-                    "best[ext=mp4]/mp4/best",
-                    "bestvideo+bestaudio/best"
-                ],
-                "good": [
-                    "best[height<=720]/best[height<=480]/best",
-                    "best[ext=mp4]/mp4/best"
-                ],
-                "medium": [
-                    "best[height<=480]/best",
-                    "worst[ext=mp4]/worst"
-                ]
-            }
-            
-            format_options = quality_formats.get(audio_quality, quality_formats["best"])
-            video_path = os.path.join(self.video_processor.output_dir, "youtube_video.%(ext)s")
-            
-            for i, format_option in enumerate(format_options):
-                logger.info(f"フォーマット試行 {i+1}/{len(format_options)}: {format_option}")
-                
-                cmd = [
-                    "yt-dlp",
-                    "--format", format_option,
-                    "--output", video_path,
-                    "--no-playlist",
-                    "--merge-output-format", "mp4",
-                    youtube_url
-                ]
-                
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
-                
-                if result.returncode == 0:
-                    for file in os.listdir(self.video_processor.output_dir):
-                        if file.startswith("youtube_video."):
-                            actual_path = os.path.join(self.video_processor.output_dir, file)
-                            logger.info(f"YouTube動画ダウンロード完了: {actual_path}")
-                            return actual_path
-                    
-                    logger.warning(f"フォーマット{i+1}でダウンロード成功したがファイルが見つかりません")
-                else:
-                    logger.warning(f"フォーマット{i+1}失敗: {result.stderr.strip()[:100]}...")
-                    continue
-            
-            logger.error("全てのフォーマットでYouTube動画ダウンロードに失敗しました")
-            return None
-                
-        except Exception as e:
-            logger.error(f"YouTube動画ダウンロードエラー: {e}")
-            return None
\ No newline at end of file
+    def _download_youtube_video(self, youtube_url, audio_quality="best", section=None):
+        """YouTubeから動画をダウンロード（VideoProcessorに委譲）"""
+        return self.video_processor.download_youtube_video(youtube_url, audio_quality, section=section)
+